@@ -10,10 +10,87 @@ import requests
 import time
 from lib.model.smartplugin import SmartPlugin
 
-EXPECTED_BROKER_VERSION = "1.1"
+EXPECTED_BROKER_VERSION = "1.2"
 sonos_speaker = {}
 
 
+# binary udp encoding of the Sonos Broker (version 1), see server.sonos/lib_sonos/udp_codec.py
+# the property keys must be kept in sync with the broker
+BINARY_MAGIC = b'SB'
+BINARY_VERSION = 1
+BINARY_PROPERTY_KEYS = (
+    'uid', 'ip', 'model', 'model_number', 'display_version', 'household_id', 'zone_name', 'zone_icon',
+    'is_coordinator', 'serial_number', 'software_version', 'hardware_version', 'mac_address', 'playlist_position',
+    'playlist_total_tracks', 'volume', 'mute', 'led', 'streamtype', 'stop', 'play', 'pause', 'track_title',
+    'track_artist', 'track_duration', 'track_position', 'track_album_art', 'track_album', 'track_uri',
+    'radio_station', 'radio_show', 'status', 'max_volume', 'additional_zone_members', 'bass', 'treble', 'loudness',
+    'playmode', 'nightmode', 'alarms', 'tts_local_mode', 'wifi_state', 'balance', 'sonos_playlists',
+    'transport_actions',
+)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_bytes(data, pos):
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length], pos + length
+
+
+def decode_broker_data(data):
+    """
+    Decodes an udp message of the Sonos Broker. Json and binary encoded messages are supported.
+    :param data: bytes received from the Sonos Broker
+    :return: dict with property names and values
+    """
+    if data[:2] != BINARY_MAGIC:
+        return json.loads(data.decode('utf-8').strip())
+    if data[2] != BINARY_VERSION:
+        raise Exception('Unsupported binary format version {version}.'.format(version=data[2]))
+
+    values = {}
+    pos = 3
+    while pos < len(data):
+        key_id = data[pos]
+        pos += 1
+        if key_id:
+            key = BINARY_PROPERTY_KEYS[key_id - 1]
+        else:
+            key, pos = _read_bytes(data, pos)
+            key = key.decode('utf-8')
+
+        value_type = data[pos]
+        pos += 1
+        if value_type == 0:
+            value = None
+        elif value_type == 1:
+            value = False
+        elif value_type == 2:
+            value = True
+        elif value_type == 3:
+            value, pos = _read_varint(data, pos)
+            value = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        elif value_type == 4:
+            value, pos = _read_bytes(data, pos)
+            value = value.decode('utf-8')
+        elif value_type == 5:
+            value, pos = _read_bytes(data, pos)
+            value = json.loads(value.decode('utf-8'))
+        else:
+            raise Exception('Unknown value type {type}.'.format(type=value_type))
+        values[key] = value
+    return values
+
+
 class UDPDispatcher(lib.connection.Server):
     def __init__(self, ip, port, sh):
         self._logger = logging.getLogger('sonos')
@@ -25,7 +102,7 @@ class UDPDispatcher(lib.connection.Server):
 
     def handle_connection(self):
         try:
-            data, address = self.socket.recvfrom(10000)
+            data, address = self.socket.recvfrom(65535)
             address = "{}:{}".format(address[0], address[1])
             self._logger.debug("{}: incoming connection from {}".format('sonos', address))
         except Exception as err:
@@ -33,7 +110,7 @@ class UDPDispatcher(lib.connection.Server):
             return
 
         try:
-            sonos = json.loads(data.decode('utf-8').strip())
+            sonos = decode_broker_data(data)
             uid = sonos['uid']
 
             if not uid:
@@ -503,16 +580,21 @@ class Sonos(SmartPlugin):
         try:
             self._logger.debug("Sending request: {0}".format(payload))
 
-            headers = {'Content-type': 'application/json', 'Accept': 'text/plain'}
+            headers = {'Content-type': 'application/json', 'Accept': 'application/json'}
             response = requests.post(self._broker_url, data=json.dumps(payload), headers=headers)
 
-            html_start = "<html><head><title>Sonos Broker</title></head><body>"
-            html_end = "</body></html>"
-
             if response.status_code == 200:
                 self._logger.info("Sonos: Message %s %s successfully sent - %s %s" %
                                   (self._broker_url, payload, response.status_code, response.reason))
-                return response.text.replace(html_start, "", 1).replace(html_end, "", 1)
+                if 'application/json' not in response.headers.get('Content-Type', ''):
+                    # brokers older than v1.2 ignore the Accept header and send their html response
+                    html_start = "<html><head><title>Sonos Broker</title></head><body>"
+                    html_end = "</body></html>"
+                    return response.text.replace(html_start, "", 1).replace(html_end, "", 1)
+                data = response.json()['response']
+                if data is None or isinstance(data, str):
+                    return data
+                return json.dumps(data)
 
             else:
                 self._logger.warning("Sonos: Could not send message %s %s - %s %s" %
@@ -522,6 +604,30 @@ class Sonos(SmartPlugin):
             self._logger.warning(
                 "Could not send sonos notification: {0}. Error: {1}".format(payload, e))
 
+    def send_commands(self, commands, deadline=None):
+        """
+        Sends several commands in one request. The Broker executes the commands of different speakers concurrently.
+        :param commands: list of commands, e.g. [SonosCommand.stop(uid, 1), SonosCommand.led(uid, 0)]
+        :param deadline: optional deadline for all commands in seconds
+        :return: list with the results of all commands or None
+        """
+        try:
+            payload = SonosCommand.batch(commands, deadline)
+            self._logger.debug("Sending request: {0}".format(payload))
+            headers = {'Content-type': 'application/json', 'Accept': 'application/json'}
+            response = requests.post(self._broker_url, data=json.dumps(payload), headers=headers)
+            if response.status_code != 200:
+                self._logger.warning("Sonos: Could not send commands %s - %s %s" %
+                                     (self._broker_url, response.status_code, response.text))
+                return None
+            results = response.json()['results']
+            for result in results:
+                if not result['status']:
+                    self._logger.warning("Sonos: command {command} for {uid} failed: {response}".format(**result))
+            return results
+        except Exception as e:
+            self._logger.warning("Could not send sonos commands: {0}. Error: {1}".format(commands, e))
+
     def _send_cmd_response(self, cmd):
         try:
             data = ''
@@ -556,7 +662,7 @@ class Sonos(SmartPlugin):
         return self._send_cmd(SonosCommand.refresh_media_library(display_option))
 
     def version(self):
-        return "v1.1\t2017-02-19"
+        return "v1.2\tunreleased"
 
     def discover(self):
         return self._send_cmd(SonosCommand.discover())
@@ -613,15 +719,25 @@ class SonosSpeaker():
 
 class SonosCommand:
     @staticmethod
-    def subscribe(ip, port):
+    def subscribe(ip, port, encoding='binary'):
         return {
             'command': 'client_subscribe',
             'parameter': {
                 'ip': ip,
                 'port': port,
+                'encoding': encoding,
             }
         }
 
+    @staticmethod
+    def batch(commands, deadline=None):
+        payload = {
+            'commands': commands
+        }
+        if deadline is not None:
+            payload['deadline'] = deadline
+        return payload
+
     @staticmethod
     def unsubscribe(ip, port):
         return {
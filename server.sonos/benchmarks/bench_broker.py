@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End to end benchmark of the Sonos Broker against a simulated Sonos household (see simulator.py).
+
+The broker is started as a separate process with a temporary configuration. Measured are:
+
+    discovery_s               time from the broker start until all speakers are subscribed for events
+    rss_kb / rss_per_speaker  resident memory of the broker (per speaker: compared to a household of 1 speaker)
+    command_rtt_ms            round-trip time of 'get_volume' / 'set_volume' commands
+    event_to_udp_ms           time from a NOTIFY sent by a speaker until the change arrives at a udp client
+    group_command_ms          duration of group volume / mute commands with all speakers joined to one group
+
+Run from the server.sonos directory:
+
+    python3 benchmarks/bench_broker.py --speakers 8 --samples 200 --event-rate 20 --output results.json
+
+Use --latency to simulate the processing time of real speakers (e.g. 0.05 seconds per SOAP request).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BROKER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BROKER_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import simulator
+from lib_sonos import definitions
+from lib_sonos import udp_codec
+
+CONFIG = """[sonos_broker]
+host = 127.0.0.1
+port = {port}
+discover_interface = 127.0.0.1
+
+[webservice]
+
+[logging]
+loglevel = warning
+logfile = {logfile}
+"""
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(p):
+        return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+    return {'count': len(values), 'min': values[0], 'p50': pick(50), 'p90': pick(90), 'p99': pick(99),
+            'max': values[-1], 'avg': sum(values) / len(values)}
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    sock = socket.socket(socket.AF_INET, kind)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def rss_kb(pid):
+    try:
+        with open('/proc/{pid}/status'.format(pid=pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class UdpClient:
+    """Receives the broker updates and remembers when a volume was seen for a speaker."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.5)
+        self.port = self.sock.getsockname()[1]
+        self.messages = 0
+        self.bytes = 0
+        self._seen = {}
+        self._cond = threading.Condition()
+        self._running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self._running:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            now = time.monotonic()
+            values = udp_codec.decode(data)
+            with self._cond:
+                self.messages += 1
+                self.bytes += len(data)
+                if 'volume' in values:
+                    self._seen[(values['uid'], values['volume'])] = now
+                    self._cond.notify_all()
+
+    def wait_volume(self, uid, volume, since, timeout):
+        """Returns the time the volume was received for the speaker after 'since', None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seen.get((uid, volume), since - 1) < since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._seen.pop((uid, volume))
+
+    def close(self):
+        self._running = False
+        self.thread.join()
+        self.sock.close()
+
+
+def measure_group_commands(household, url, samples, rand):
+    """Joins all speakers to one group and measures group volume and mute commands on the coordinator."""
+    coordinator = household.speakers[0]
+    household.group(coordinator, household.speakers)
+    # wait until the broker knows the new group
+    time.sleep(2)
+    uid = coordinator.uid.lower()
+    durations = []
+    errors = 0
+    for i in range(samples):
+        if i % 2:
+            command, parameter = 'set_mute', {'uid': uid, 'mute': (i // 2) % 2, 'group_command': 1}
+        else:
+            command, parameter = 'set_volume', {'uid': uid, 'volume': rand.randint(0, 100), 'group_command': 1}
+        t0 = time.perf_counter()
+        if not send_command(url, command, parameter):
+            errors += 1
+        durations.append((time.perf_counter() - t0) * 1000)
+    return durations, errors
+
+
+def send_command(url, command, parameter):
+    response = requests.post(url, data=json.dumps({'command': command, 'parameter': parameter}), timeout=10)
+    return response.status_code == definitions.HTTP_SUCCESS
+
+
+def run_scenario(speakers, samples=100, event_rate=0.0, timeout=60, seed=1, latency=0.0):
+    household = simulator.Household(speakers, seed=seed, latency=latency)
+    household.start()
+    workdir = tempfile.mkdtemp(prefix='sonos-bench-')
+    port = free_port()
+    url = 'http://127.0.0.1:{port}'.format(port=port)
+    config_path = os.path.join(workdir, 'sonos-broker.cfg')
+    with open(config_path, 'w') as config:
+        config.write(CONFIG.format(port=port, logfile=os.path.join(workdir, 'sonos-broker.log')))
+
+    results = {'speakers': speakers, 'samples': samples, 'event_rate': event_rate, 'latency': latency}
+    start = time.monotonic()
+    broker = subprocess.Popen([sys.executable, os.path.join(BROKER_DIR, 'sonos-broker'), 'start', '-c', config_path],
+                              cwd=BROKER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = None
+    try:
+        # discovery
+        while household.subscribed('AVTransport') < speakers:
+            if time.monotonic() - start > timeout or broker.poll() is not None:
+                raise RuntimeError('discovery failed: {n} of {total} speakers subscribed'.format(
+                    n=household.subscribed('AVTransport'), total=speakers))
+            time.sleep(0.01)
+        results['discovery_s'] = time.monotonic() - start
+        # let the initial events settle
+        time.sleep(1)
+        results['rss_kb'] = rss_kb(broker.pid)
+
+        client = UdpClient()
+        if not send_command(url, 'client_subscribe', {'ip': '127.0.0.1', 'port': client.port,
+                                                      'encoding': udp_codec.ENCODING_COMPACT}):
+            raise RuntimeError('client_subscribe failed')
+
+        household.start_event_load(event_rate)
+        rand = random.Random(seed)
+
+        # command round-trip
+        rtt = []
+        errors = 0
+        for i in range(samples):
+            speaker = rand.choice(household.speakers)
+            uid = speaker.uid.lower()
+            if i % 2:
+                command, parameter = 'set_volume', {'uid': uid, 'volume': rand.randint(0, 100)}
+            else:
+                command, parameter = 'get_volume', {'uid': uid}
+            t0 = time.perf_counter()
+            if not send_command(url, command, parameter):
+                errors += 1
+            rtt.append((time.perf_counter() - t0) * 1000)
+        results['command_rtt_ms'] = percentiles(rtt)
+        results['command_errors'] = errors
+
+        # event to udp latency, every sample uses a volume the speaker does not have yet
+        latency = []
+        lost = 0
+        for i in range(samples):
+            speaker = household.speakers[i % speakers]
+            volume = (speaker.volume + 1 + rand.randint(0, 98)) % 101
+            t0 = time.monotonic()
+            household.set_volume(speaker, volume)
+            received = client.wait_volume(speaker.uid.lower(), volume, t0, timeout=5)
+            if received is None:
+                lost += 1
+            else:
+                latency.append((received - t0) * 1000)
+        results['event_to_udp_ms'] = percentiles(latency)
+        results['event_to_udp_lost'] = lost
+
+        # group commands, must be the last measurement (all speakers are grouped afterwards)
+        if speakers > 1:
+            durations, errors = measure_group_commands(household, url, min(samples, 50), rand)
+            results['group_command_ms'] = percentiles(durations)
+            results['group_command_errors'] = errors
+        results['udp_messages'] = client.messages
+        results['udp_bytes'] = client.bytes
+        results['simulator_events'] = household.events_sent
+        results['simulator_notify_errors'] = household.notify_errors
+        results['rss_kb_end'] = rss_kb(broker.pid)
+    finally:
+        broker.terminate()
+        try:
+            broker.wait(15)
+        except subprocess.TimeoutExpired:
+            broker.kill()
+            broker.wait()
+        if client is not None:
+            client.close()
+        household.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sonos Broker end to end benchmark')
+    parser.add_argument('--speakers', type=int, default=8, help='number of simulated speakers')
+    parser.add_argument('--samples', type=int, default=100, help='samples per latency measurement')
+    parser.add_argument('--event-rate', type=float, default=0, help='background events per second')
+    parser.add_argument('--timeout', type=float, default=60, help='discovery timeout in seconds')
+    parser.add_argument('--latency', type=float, default=0, help='simulated processing time per SOAP request')
+    parser.add_argument('--no-baseline', action='store_true', help='skip the 1-speaker run for memory per speaker')
+    parser.add_argument('--output', help='write the results as json to this file')
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'broker_version': definitions.VERSION,
+        'python': sys.version.split()[0],
+        'scenario': run_scenario(args.speakers, args.samples, args.event_rate, args.timeout, latency=args.latency),
+    }
+    if not args.no_baseline and args.speakers > 1:
+        baseline = run_scenario(1, samples=1, timeout=args.timeout)
+        results['baseline_rss_kb'] = baseline['rss_kb']
+        if results['scenario']['rss_kb'] and baseline['rss_kb']:
+            results['rss_per_speaker_kb'] = \
+                (results['scenario']['rss_kb'] - baseline['rss_kb']) / float(args.speakers - 1)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for soco.events.parse_event_xml.
+
+Compares the current event parser with the former implementation (eager DIDL conversion, uncached tag conversion)
+on a typical AVTransport event sent on every track change. Run from the server.sonos directory:
+
+    python3 benchmarks/bench_event_parser.py [--number 2000] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from soco.events import parse_event_xml
+from soco.data_structures_entry import from_didl_string
+from soco.xml import XML
+
+DIDL_TRACK = (
+    '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+    'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+    '<item id="-1" parentID="-1" restricted="true">'
+    '<res protocolInfo="sonos.com-spotify:*:audio/x-spotify:*" duration="0:04:12">'
+    'x-sonos-spotify:spotify%3atrack%3a{track}?sid=12&amp;flags=8224&amp;sn=1</res>'
+    '<r:streamContent></r:streamContent>'
+    '<upnp:albumArtURI>/getaa?s=1&amp;u=x-sonos-spotify%3aspotify%253atrack%253a{track}</upnp:albumArtURI>'
+    '<dc:title>Some rather long track title number {track}</dc:title>'
+    '<upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+    '<dc:creator>An Artist With A Name</dc:creator>'
+    '<upnp:album>The Album Of The Year</upnp:album>'
+    '</item></DIDL-Lite>'
+)
+
+LAST_CHANGE = (
+    '<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/">'
+    '<InstanceID val="0">'
+    '<TransportState val="PLAYING"/>'
+    '<CurrentPlayMode val="NORMAL"/>'
+    '<CurrentCrossfadeMode val="0"/>'
+    '<NumberOfTracks val="42"/>'
+    '<CurrentTrack val="7"/>'
+    '<CurrentSection val="0"/>'
+    '<CurrentTrackURI val="x-sonos-spotify:spotify%3atrack%3a7?sid=12&amp;flags=8224&amp;sn=1"/>'
+    '<CurrentTrackDuration val="0:04:12"/>'
+    '<CurrentTrackMetaData val="{current}"/>'
+    '<r:NextTrackURI val="x-sonos-spotify:spotify%3atrack%3a8?sid=12&amp;flags=8224&amp;sn=1"/>'
+    '<r:NextTrackMetaData val="{next}"/>'
+    '<r:EnqueuedTransportURI val="x-rincon-cpcontainer:1006206cspotify%3aplaylist%3a1"/>'
+    '<r:EnqueuedTransportURIMetaData val="{enqueued}"/>'
+    '<AVTransportURI val="x-rincon-queue:RINCON_000E58000000001400#0"/>'
+    '<AVTransportURIMetaData val=""/>'
+    '<NextAVTransportURI val=""/>'
+    '<NextAVTransportURIMetaData val=""/>'
+    '<CurrentTransportActions val="Set, Stop, Pause, Seek, Next, Previous"/>'
+    '<r:CurrentValidPlayModes val="SHUFFLE,REPEAT,CROSSFADE"/>'
+    '<r:SleepTimerGeneration val="0"/>'
+    '<r:AlarmRunning val="0"/>'
+    '<r:SnoozeRunning val="0"/>'
+    '<r:RestartPending val="0"/>'
+    '<TransportStatus val="OK"/>'
+    '</InstanceID></Event>'
+)
+
+
+def avtransport_event():
+    attr = {'"': '&quot;'}
+    last_change = LAST_CHANGE.format(current=escape(DIDL_TRACK.format(track=7), attr),
+                                     next=escape(DIDL_TRACK.format(track=8), attr),
+                                     enqueued=escape(DIDL_TRACK.format(track=1), attr))
+    return ('<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0"><e:property>'
+            '<LastChange>{last_change}</LastChange>'
+            '</e:property></e:propertyset>').format(last_change=escape(last_change)).encode('utf-8')
+
+
+FIRST_CAP_RE = re.compile('(.)([A-Z][a-z]+)')
+ALL_CAP_RE = re.compile('([a-z0-9])([A-Z])')
+
+
+def legacy_camel_to_underscore(string):
+    string = FIRST_CAP_RE.sub(r'\1_\2', string)
+    return ALL_CAP_RE.sub(r'\1_\2', string).lower()
+
+
+def legacy_parse_event_xml(xml_event):
+    """The former implementation of parse_event_xml."""
+    result = {}
+    tree = XML.fromstring(xml_event)
+    properties = tree.findall('{urn:schemas-upnp-org:event-1-0}property')
+    for prop in properties:
+        for variable in prop:
+            if variable.tag == "LastChange":
+                last_change_tree = XML.fromstring(variable.text.encode('utf-8'))
+                instance = last_change_tree.find("{urn:schemas-upnp-org:metadata-1-0/AVT/}InstanceID")
+                if instance is None:
+                    instance = last_change_tree.find("{urn:schemas-upnp-org:metadata-1-0/RCS/}InstanceID")
+                for last_change_var in instance:
+                    tag = last_change_var.tag
+                    if tag.startswith('{'):
+                        tag = tag.split('}', 1)[1]
+                    tag = legacy_camel_to_underscore(tag)
+                    value = last_change_var.get('val')
+                    if value is None:
+                        value = last_change_var.text
+                    if value.startswith('<DIDL-Lite'):
+                        value = from_didl_string(value)[0]
+                    channel = last_change_var.get('channel')
+                    if channel is not None:
+                        if result.get(tag) is None:
+                            result[tag] = {}
+                        result[tag][channel] = value
+                    else:
+                        result[tag] = value
+            else:
+                result[legacy_camel_to_underscore(variable.tag)] = variable.text
+    return result
+
+
+def consume(variables):
+    """Touches the variables like the AVTransport handler of the broker does."""
+    for key in ('transport_state', 'current_track_uri', 'current_track', 'number_of_tracks', 'current_playmode',
+                'current_transport_actions', 'current_track_duration', 'current_track_meta_data'):
+        variables.get(key)
+
+
+def run(number):
+    event = avtransport_event()
+
+    # the output has to stay compatible
+    legacy = legacy_parse_event_xml(event)
+    current = parse_event_xml(event)
+    assert sorted(legacy.keys()) == sorted(current.keys())
+    for key, value in legacy.items():
+        assert current[key] == value, key
+
+    results = {'event_bytes': len(event), 'number': number}
+    for name, parser in (('legacy', legacy_parse_event_xml), ('current', parse_event_xml)):
+        parse = min(timeit.repeat(lambda: parser(event), number=number, repeat=3)) / number
+        parse_consume = min(timeit.repeat(lambda: consume(parser(event)), number=number, repeat=3)) / number
+        results[name] = {'parse_us': parse * 1e6, 'parse_and_consume_us': parse_consume * 1e6}
+    results['speedup_parse'] = results['legacy']['parse_us'] / results['current']['parse_us']
+    results['speedup_parse_and_consume'] = \
+        results['legacy']['parse_and_consume_us'] / results['current']['parse_and_consume_us']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='parse_event_xml benchmark')
+    parser.add_argument('--number', type=int, default=2000, help='iterations per measurement')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+
+    print("AVTransport event: {size} bytes".format(size=results['event_bytes']))
+    for name in ('legacy', 'current'):
+        print("{name:>8}: parse {parse:8.1f} us   parse + handler access {consume:8.1f} us".format(
+            name=name, parse=results[name]['parse_us'], consume=results[name]['parse_and_consume_us']))
+    print("speedup: parse {parse:.1f}x   parse + handler access {consume:.1f}x".format(
+        parse=results['speedup_parse'], consume=results['speedup_parse_and_consume']))
+
+
+if __name__ == '__main__':
+    main()
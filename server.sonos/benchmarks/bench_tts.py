@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the Google TTS fetcher (lib_sonos.tts) against a local stand-in for translate.google.com.
+
+The stand-in answers the token page and every 'translate_tts' request after a simulated latency. Compared are the
+former behaviour (a token download per text, the parts fetched one after another, each with a new connection) and
+the current fetcher (shared token key, parts fetched concurrently over a keep-alive session). Run from the
+server.sonos directory:
+
+    python3 benchmarks/bench_tts.py [--latency 0.15] [--repeat 5] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib_sonos import tts
+
+TEXT = ("Weather report for today. In the morning it will be cloudy with some rain showers in the north, "
+        "temperatures between eight and eleven degrees. In the afternoon the clouds will break up and the sun "
+        "comes through, with temperatures rising up to sixteen degrees in the south. The wind blows moderately "
+        "from south west, with strong gusts on the hills. In the evening new clouds will arrive from the west, "
+        "bringing rain during the night. Tomorrow will be sunny and dry, with temperatures up to nineteen degrees.")
+
+TOKEN_PAGE = ("<html>\n"
+              "TKK=eval('((function(){var a\\x3d4264492758;var b\\x3d-1857761125;return 406375+\\x27.\\x27+(a+b)})"
+              "())');WIZ_global_data")
+
+
+class StandIn(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.latency = latency
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/translate_tts':
+            time.sleep(self.server.latency)
+            query = parse_qs(url.query)
+            body = 'ID3-part-{idx}|'.format(idx=query['idx'][0]).encode('utf-8')
+            content_type = 'audio/mpeg'
+        else:
+            time.sleep(self.server.latency)
+            body = TOKEN_PAGE.encode('utf-8')
+            content_type = 'text/html'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def legacy_fetch(text, lang):
+    """The former fetcher: a token download per text, all parts sequentially with a new connection each."""
+    tts.Token._token_key = None
+    engine = tts.gTTS(text, lang)
+    data = b''
+    for idx in range(len(engine.text_parts)):
+        request = engine._prepare_request(idx)
+        response = requests.Session().send(request.prepare())
+        response.raise_for_status()
+        data += response.content
+    return data
+
+
+def current_fetch(text, lang):
+    engine = tts.gTTS(text, lang)
+    data = []
+
+    class Collect:
+        def write(self, chunk):
+            data.append(chunk)
+
+    engine._write_to_fp(Collect())
+    return b''.join(data)
+
+
+def run(latency, repeat):
+    server = StandIn(latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = 'http://127.0.0.1:{port}'.format(port=server.server_address[1])
+    tts.Token.TOKEN_URL = base + '/'
+    tts.gTTS.GOOGLE_TTS_URL = base + '/translate_tts'
+
+    parts = len(tts.gTTS(TEXT, 'en').text_parts)
+    results = {'latency_s': latency, 'parts': parts, 'repeat': repeat}
+    try:
+        timings = []
+        expected = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            expected = legacy_fetch(TEXT, 'en')
+            timings.append(time.perf_counter() - t0)
+        results['legacy_s'] = min(timings)
+
+        tts.Token._token_key = None
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            data = current_fetch(TEXT, 'en')
+            timings.append(time.perf_counter() - t0)
+            # the parts have to be concatenated in order
+            assert data == expected, data
+        results['current_first_s'] = timings[0]
+        results['current_s'] = min(timings)
+        results['speedup'] = results['legacy_s'] / results['current_s']
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Google TTS fetch benchmark')
+    parser.add_argument('--latency', type=float, default=0.15, help='simulated latency per request in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='texts fetched per measurement')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    results = run(args.latency, args.repeat)
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+    print("{parts} parts, {latency:.0f} ms latency per request".format(parts=results['parts'],
+                                                                     latency=results['latency_s'] * 1000))
+    print("  legacy: {legacy:.3f} s   current: {current:.3f} s (first text incl. token: {first:.3f} s)   "
+          "speedup {speedup:.1f}x".format(legacy=results['legacy_s'], current=results['current_s'],
+                                          first=results['current_first_s'], speedup=results['speedup']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A simulated Sonos household for offline benchmarks.
+
+Every virtual speaker serves the UPnP endpoints used by SoCo and the Sonos Broker (device description, control urls
+of AVTransport, RenderingControl, ZoneGroupTopology, ContentDirectory, AlarmClock, DeviceProperties and
+SystemProperties, SUBSCRIBE / UNSUBSCRIBE of the event urls) and answers SSDP discovery requests.
+
+SoCo always talks to port 1400 of a speaker, so the virtual speakers are bound to the loopback addresses 127.0.0.2,
+127.0.0.3, ... instead of different ports (Linux routes the whole 127.0.0.0/8 network to the loopback interface).
+The SSDP responder only sees discovery requests sent via the loopback interface, so the broker has to be started
+with 'discover_interface = 127.0.0.1'.
+
+Standalone usage (Ctrl-C to stop):
+
+    python3 benchmarks/simulator.py --speakers 4 --event-rate 10
+"""
+import argparse
+import collections
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from xml.sax.saxutils import escape
+
+import requests
+
+MCAST_GRP = '239.255.255.250'
+MCAST_PORT = 1900
+SPEAKER_PORT = 1400
+
+SOAP_ENVELOPE = ('<?xml version="1.0"?><s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" '
+                 's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"><s:Body>'
+                 '<u:{action}Response xmlns:u="{service_type}">{args}</u:{action}Response>'
+                 '</s:Body></s:Envelope>')
+
+PROPERTY_SET = ('<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">{properties}</e:propertyset>')
+
+DEVICE_DESCRIPTION = (
+    '<?xml version="1.0" encoding="utf-8" ?><root xmlns="urn:schemas-upnp-org:device-1-0">'
+    '<specVersion><major>1</major><minor>0</minor></specVersion><device>'
+    '<deviceType>urn:schemas-upnp-org:device:ZonePlayer:1</deviceType>'
+    '<friendlyName>{ip} - Sonos PLAY:1</friendlyName><manufacturer>Sonos, Inc.</manufacturer>'
+    '<modelNumber>S1</modelNumber><modelDescription>Sonos PLAY:1</modelDescription>'
+    '<modelName>Sonos PLAY:1</modelName><softwareVersion>34.7-34220</softwareVersion>'
+    '<hardwareVersion>1.8.3.7-2</hardwareVersion><serialNum>{mac}:E</serialNum><UDN>uuid:{uid}</UDN>'
+    '<iconList><icon><id>0</id><mimetype>image/png</mimetype><width>48</width><height>48</height><depth>24</depth>'
+    '<url>/img/icon-S1.png</url></icon></iconList><displayVersion>7.1</displayVersion>'
+    '<roomName>{name}</roomName></device></root>'
+)
+
+DIDL_TRACK = (
+    '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+    'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+    '<item id="-1" parentID="-1" restricted="true">'
+    '<res protocolInfo="http-get:*:audio/mpeg:*" duration="0:03:{sec:02d}">'
+    'http://127.0.0.1/track{track}.mp3</res><upnp:albumArtURI>/getaa?u=track{track}</upnp:albumArtURI>'
+    '<dc:title>Track {track}</dc:title><upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+    '<dc:creator>Artist {track}</dc:creator><upnp:album>Album {track}</upnp:album></item></DIDL-Lite>'
+)
+
+AVT_NS = 'urn:schemas-upnp-org:metadata-1-0/AVT/'
+RCS_NS = 'urn:schemas-upnp-org:metadata-1-0/RCS/'
+
+
+class VirtualSpeaker:
+    """State of one simulated speaker."""
+
+    def __init__(self, index, household):
+        self.index = index
+        self.household = household
+        self.ip = '127.0.0.{n}'.format(n=index + 2)
+        self.mac = '00-0E-58-00-00-{n:02X}'.format(n=index)
+        self.uid = 'RINCON_000E580000{n:02X}01400'.format(n=index)
+        self.name = 'Room {n}'.format(n=index)
+        self.lock = threading.Lock()
+        self.volume = 20
+        self.mute = 0
+        self.bass = 0
+        self.treble = 0
+        self.loudness = 1
+        self.night_mode = 0
+        self.play_mode = 'NORMAL'
+        self.transport_state = 'STOPPED'
+        self.track = 1
+        self.uri = ''
+        self.restart_pending = 0
+        self.coordinator = self
+        # service type (e.g. 'AVTransport') -> sid -> (callback url, seq)
+        self.subscriptions = {}
+
+    @property
+    def track_meta_data(self):
+        return DIDL_TRACK.format(track=self.track, sec=self.track % 60)
+
+    @property
+    def media_uri(self):
+        return self.uri or 'x-rincon-queue:{uid}#0'.format(uid=self.uid)
+
+    def last_change(self, namespace, values):
+        variables = ''.join('<{name} {attrs}/>'.format(
+            name=name, attrs=' '.join('{k}="{v}"'.format(k=k, v=escape(str(v), {'"': '&quot;'}))
+                                      for k, v in attrs.items()))
+            for name, attrs in values)
+        return '<Event xmlns="{ns}"><InstanceID val="0">{variables}</InstanceID></Event>'.format(
+            ns=namespace, variables=variables)
+
+    def rendering_control_state(self):
+        return self.last_change(RCS_NS, [
+            ('Volume', {'channel': 'Master', 'val': self.volume}),
+            ('Volume', {'channel': 'LF', 'val': 100}),
+            ('Volume', {'channel': 'RF', 'val': 100}),
+            ('Mute', {'channel': 'Master', 'val': self.mute}),
+            ('Bass', {'val': self.bass}),
+            ('Treble', {'val': self.treble}),
+            ('Loudness', {'channel': 'Master', 'val': self.loudness}),
+            ('OutputFixed', {'val': 0}),
+            ('NightMode', {'val': self.night_mode}),
+            ('DialogLevel', {'val': 0}),
+        ])
+
+    def av_transport_state(self):
+        return self.last_change(AVT_NS, [
+            ('TransportState', {'val': self.transport_state}),
+            ('TransportStatus', {'val': 'OK'}),
+            ('TransportPlaySpeed', {'val': 1}),
+            ('CurrentPlayMode', {'val': self.play_mode}),
+            ('CurrentCrossfadeMode', {'val': 0}),
+            ('CurrentRecordQualityMode', {'val': 'NOT_IMPLEMENTED'}),
+            ('NumberOfTracks', {'val': 50}),
+            ('CurrentTrack', {'val': self.track}),
+            ('CurrentTrackURI', {'val': 'http://127.0.0.1/track{n}.mp3'.format(n=self.track)}),
+            ('CurrentTrackDuration', {'val': '0:03:{sec:02d}'.format(sec=self.track % 60)}),
+            ('CurrentTrackMetaData', {'val': self.track_meta_data}),
+            ('EnqueuedTransportURIMetaData', {'val': ''}),
+            ('AVTransportURI', {'val': self.media_uri}),
+            ('AVTransportURIMetaData', {'val': ''}),
+            ('NextAVTransportURI', {'val': ''}),
+            ('NextAVTransportURIMetaData', {'val': ''}),
+            ('CurrentMediaDuration', {'val': 'NOT_IMPLEMENTED'}),
+            ('PlaybackStorageMedium', {'val': 'NETWORK'}),
+            ('RecordStorageMedium', {'val': 'NOT_IMPLEMENTED'}),
+            ('RecordMediumWriteStatus', {'val': 'NOT_IMPLEMENTED'}),
+            ('CurrentTransportActions', {'val': 'Set, Stop, Pause, Seek, Next, Previous'}),
+            ('RestartPending', {'val': self.restart_pending}),
+        ])
+
+    def event_properties(self, service):
+        """Returns the evented variables of a service as {name: value}."""
+        if service == 'RenderingControl':
+            return {'LastChange': self.rendering_control_state()}
+        if service == 'AVTransport':
+            return {'LastChange': self.av_transport_state()}
+        if service == 'ZoneGroupTopology':
+            return {'ZoneGroupState': self.household.zone_group_state()}
+        if service == 'ContentDirectory':
+            return {'SavedQueuesUpdateID': 'RINCON_1,{n}'.format(n=self.household.playlist_update_id)}
+        if service == 'AlarmClock':
+            return {'AlarmListVersion': 'RINCON_1:{n}'.format(n=self.household.alarm_list_version)}
+        return {}
+
+
+class Household:
+    """A simulated Sonos household with speakers and the HTTP / SSDP servers."""
+
+    def __init__(self, speakers=4, seed=None, latency=0.0):
+        self.id = 'Sonos_Simulated_Household'
+        # processing time of every SOAP request in seconds
+        self.latency = latency
+        # playing time of a snippet (any uri other than the queue) in seconds
+        self.snippet_duration = 0.2
+        self.speakers = [VirtualSpeaker(index, self) for index in range(speakers)]
+        self.by_ip = {speaker.ip: speaker for speaker in self.speakers}
+        self.playlist_update_id = 1
+        self.alarm_list_version = 1
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=32))
+        self._servers = []
+        self._threads = []
+        self._stop = threading.Event()
+        self.events_sent = 0
+        self.notify_errors = 0
+        self.requests = 0
+        self.actions = collections.Counter()
+        self.subscribe_times = {}
+
+    # -- state --------------------------------------------------------------------------------------------------------
+
+    def zone_group_state(self):
+        groups = ''
+        for coordinator in self.speakers:
+            if coordinator.coordinator is not coordinator:
+                continue
+            members = ''.join(
+                '<ZoneGroupMember UUID="{uid}" Location="http://{ip}:{port}/xml/device_description.xml" '
+                'ZoneName="{name}" Icon="x-rincon-roomicon:living" Configuration="1" SoftwareVersion="34.7-34220" '
+                'MinCompatibleVersion="33.0-00000" LegacyCompatibleVersion="25.0-00000" BootSeq="10" '
+                'WirelessMode="0" HasConfiguredSSID="0" ChannelFreq="2412" BehindWifiExtender="0" WifiEnabled="1" '
+                'Orientation="0" RoomCalibrationState="4" SecureRegState="3"/>'.format(
+                    uid=speaker.uid, ip=speaker.ip, port=SPEAKER_PORT, name=speaker.name)
+                for speaker in self.group_members(coordinator))
+            groups += '<ZoneGroup Coordinator="{uid}" ID="{uid}:1">{members}</ZoneGroup>'.format(
+                uid=coordinator.uid, members=members)
+        return '<ZoneGroups>{groups}</ZoneGroups>'.format(groups=groups)
+
+    def group_members(self, coordinator):
+        return [speaker for speaker in self.speakers if speaker.coordinator is coordinator]
+
+    def group(self, coordinator, members):
+        """Joins the members to the group of the coordinator and notifies the ZoneGroupTopology subscribers."""
+        for speaker in members:
+            speaker.coordinator = coordinator
+        for speaker in self.speakers:
+            self.notify(speaker, 'ZoneGroupTopology')
+
+    def alarm_list(self):
+        return ('<Alarms><Alarm ID="1" StartTime="07:00:00" Duration="02:00:00" Recurrence="DAILY" Enabled="0" '
+                'RoomUUID="{uid}" ProgramURI="x-rincon-buzzer:0" ProgramMetaData="" PlayMode="SHUFFLE_NOREPEAT" '
+                'Volume="25" IncludeLinkedZones="0"/></Alarms>').format(uid=self.speakers[0].uid)
+
+    # -- events -------------------------------------------------------------------------------------------------------
+
+    def notify(self, speaker, service, sids=None):
+        """Sends the current state of a service to the subscribers."""
+        properties = ''.join('<e:property><{name}>{value}</{name}></e:property>'.format(name=name, value=escape(value))
+                             for name, value in speaker.event_properties(service).items())
+        body = PROPERTY_SET.format(properties=properties).encode('utf-8')
+        with speaker.lock:
+            subscriptions = speaker.subscriptions.get(service, {})
+            targets = []
+            for sid, (callback, seq) in list(subscriptions.items()):
+                if sids is not None and sid not in sids:
+                    continue
+                subscriptions[sid] = (callback, seq + 1)
+                targets.append((sid, callback, seq))
+        for sid, callback, seq in targets:
+            try:
+                self.session.request('NOTIFY', callback, data=body, timeout=5, headers={
+                    'NT': 'upnp:event', 'NTS': 'upnp:propchange', 'SID': sid, 'SEQ': str(seq),
+                    'Content-Type': 'text/xml; charset="utf-8"'})
+                self.events_sent += 1
+            except requests.RequestException:
+                self.notify_errors += 1
+
+    def set_volume(self, speaker, volume):
+        speaker.volume = volume
+        self.notify(speaker, 'RenderingControl')
+
+    def next_track(self, speaker):
+        speaker.track += 1
+        speaker.transport_state = 'PLAYING'
+        self.notify(speaker, 'AVTransport')
+
+    def end_snippet(self, speaker):
+        """The snippet has been played: the speaker stops and reports a pending restart."""
+        speaker.transport_state = 'STOPPED'
+        speaker.restart_pending = 1
+        self.notify(speaker, 'AVTransport')
+        speaker.restart_pending = 0
+
+    def change_alarms(self):
+        """Increases the alarm list version and notifies the AlarmClock subscribers of all speakers."""
+        self.alarm_list_version += 1
+        for speaker in self.speakers:
+            self.notify(speaker, 'AlarmClock')
+
+    def subscribed(self, service='AVTransport'):
+        """Returns the number of speakers with an active subscription for the given service."""
+        return sum(1 for speaker in self.speakers if speaker.subscriptions.get(service))
+
+    def start_event_load(self, rate):
+        """Pushes track change events (AVTransport with DIDL metadata) to random speakers with the given rate
+        (events per second)."""
+        if rate <= 0:
+            return
+
+        def load():
+            interval = 1.0 / rate
+            deadline = time.monotonic()
+            while not self._stop.is_set():
+                self.next_track(self.random.choice(self.speakers))
+                deadline += interval
+                self._stop.wait(max(0.0, deadline - time.monotonic()))
+
+        thread = threading.Thread(target=load, name='SimulatorLoad', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # -- servers ------------------------------------------------------------------------------------------------------
+
+    def start(self):
+        for speaker in self.speakers:
+            server = _SpeakerServer((speaker.ip, SPEAKER_PORT), _SpeakerHandler)
+            server.household = self
+            server.speaker = speaker
+            self._servers.append(server)
+            thread = threading.Thread(target=server.serve_forever, name='Speaker-' + speaker.ip, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._ssdp_responder, name='SimulatorSSDP', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def _ssdp_responder(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(('', MCAST_PORT))
+        mreq = struct.pack('4s4s', socket.inet_aton(MCAST_GRP), socket.inet_aton('127.0.0.1'))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        sock.settimeout(0.5)
+        # the answer has to come from the address of a speaker
+        speaker = self.speakers[0]
+        reply_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        reply_sock.bind((speaker.ip, 0))
+        while not self._stop.is_set():
+            try:
+                data, address = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            if not data.startswith(b'M-SEARCH') or b'ZonePlayer' not in data:
+                continue
+            response = ('HTTP/1.1 200 OK\r\nCACHE-CONTROL: max-age = 1800\r\nEXT:\r\n'
+                        'LOCATION: http://{ip}:{port}/xml/device_description.xml\r\n'
+                        'SERVER: Linux UPnP/1.0 Sonos/34.7-34220 (ZPS1)\r\n'
+                        'ST: urn:schemas-upnp-org:device:ZonePlayer:1\r\n'
+                        'USN: uuid:{uid}::urn:schemas-upnp-org:device:ZonePlayer:1\r\n'
+                        'X-RINCON-HOUSEHOLD: {household}\r\n\r\n').format(ip=speaker.ip, port=SPEAKER_PORT,
+                                                                          uid=speaker.uid, household=self.id)
+            reply_sock.sendto(response.encode('utf-8'), address)
+        sock.close()
+        reply_sock.close()
+
+
+class _SpeakerServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _SpeakerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def household(self):
+        return self.server.household
+
+    @property
+    def speaker(self):
+        return self.server.speaker
+
+    def _reply(self, status=200, body=b'', content_type='text/xml; charset="utf-8"', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def do_GET(self):
+        self.household.requests += 1
+        speaker = self.speaker
+        if self.path.startswith('/xml/device_description.xml'):
+            body = DEVICE_DESCRIPTION.format(ip=speaker.ip, mac=speaker.mac, uid=speaker.uid, name=speaker.name)
+            self._reply(body=body.encode('utf-8'))
+        elif self.path.startswith('/status/ifconfig'):
+            self._reply(body=b'<ifconfig>ath0 Link encap:Ethernet</ifconfig>', content_type='text/plain')
+        elif self.path.startswith('/wifictrl'):
+            self._reply(body=b'wifictrl done', content_type='text/plain')
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        self.household.requests += 1
+        soap_action = self.headers.get('SOAPACTION', '').strip('"')
+        service_type, _, action = soap_action.partition('#')
+        self.household.actions[action] += 1
+        if self.household.latency:
+            time.sleep(self.household.latency)
+        body = self._body()
+        args = _soap_arguments(body)
+        result = _soap_action(self.household, self.speaker, action, args)
+        if result is None:
+            fault = ('<?xml version="1.0"?><s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+                     '<s:Fault><faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring><detail>'
+                     '<UPnPError xmlns="urn:schemas-upnp-org:control-1-0"><errorCode>401</errorCode></UPnPError>'
+                     '</detail></s:Fault></s:Body></s:Envelope>')
+            self._reply(500, fault.encode('utf-8'))
+            return
+        out = ''.join('<{name}>{value}</{name}>'.format(name=name, value=escape(str(value)))
+                      for name, value in result)
+        self._reply(body=SOAP_ENVELOPE.format(action=action, service_type=service_type, args=out).encode('utf-8'))
+
+    def do_SUBSCRIBE(self):
+        self.household.requests += 1
+        service = _event_service(self.path)
+        speaker = self.speaker
+        timeout = self.headers.get('TIMEOUT', 'Second-300')
+        sid = self.headers.get('SID')
+        with speaker.lock:
+            subscriptions = speaker.subscriptions.setdefault(service, {})
+            if sid:
+                # renewal
+                if sid not in subscriptions:
+                    self._reply(412)
+                    return
+                initial = False
+            else:
+                callback = self.headers.get('CALLBACK', '').strip('<>')
+                sid = 'uuid:{uid}_sub{id}'.format(uid=speaker.uid, id=uuid.uuid4().hex[:10])
+                subscriptions[sid] = (callback, 0)
+                initial = True
+        self._reply(headers={'SID': sid, 'TIMEOUT': timeout, 'Server': 'Linux UPnP/1.0 Sonos/34.7-34220 (ZPS1)'})
+        if initial:
+            self.household.subscribe_times.setdefault((speaker.uid, service), time.monotonic())
+            # like real speakers, send the initial state after the subscription
+            threading.Thread(target=self.household.notify, args=(speaker, service, {sid}), daemon=True).start()
+
+    def do_UNSUBSCRIBE(self):
+        self.household.requests += 1
+        service = _event_service(self.path)
+        sid = self.headers.get('SID')
+        with self.speaker.lock:
+            self.speaker.subscriptions.get(service, {}).pop(sid, None)
+        self._reply()
+
+
+def _event_service(path):
+    """'/MediaRenderer/AVTransport/Event' -> 'AVTransport'"""
+    return path.rstrip('/').split('/')[-2]
+
+
+def _soap_arguments(body):
+    from xml.etree import ElementTree
+    try:
+        tree = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return {}
+    action = tree.find('{http://schemas.xmlsoap.org/soap/envelope/}Body')[0]
+    return {child.tag: child.text or '' for child in action}
+
+
+def _soap_action(household, speaker, action, args):
+    """Returns the out arguments of an action as list of (name, value), None for unknown actions."""
+    if action == 'GetVolume':
+        return [('CurrentVolume', speaker.volume)]
+    if action == 'SetVolume':
+        household.set_volume(speaker, int(args.get('DesiredVolume', 0)))
+        return []
+    if action == 'GetMute':
+        return [('CurrentMute', speaker.mute)]
+    if action == 'SetMute':
+        speaker.mute = int(args.get('DesiredMute', 0))
+        household.notify(speaker, 'RenderingControl')
+        return []
+    if action == 'SetGroupMute':
+        for member in household.group_members(speaker):
+            member.mute = int(args.get('DesiredMute', 0))
+            household.notify(member, 'RenderingControl')
+        return []
+    if action == 'GetBass':
+        return [('CurrentBass', speaker.bass)]
+    if action == 'GetTreble':
+        return [('CurrentTreble', speaker.treble)]
+    if action == 'GetLoudness':
+        return [('CurrentLoudness', speaker.loudness)]
+    if action == 'GetEQ':
+        return [('CurrentValue', speaker.night_mode)]
+    if action == 'GetTransportSettings':
+        return [('PlayMode', speaker.play_mode), ('RecQualityMode', 'NOT_IMPLEMENTED')]
+    if action == 'GetTransportInfo':
+        return [('CurrentTransportState', speaker.transport_state), ('CurrentTransportStatus', 'OK'),
+                ('CurrentSpeed', 1)]
+    if action == 'GetPositionInfo':
+        return [('Track', speaker.track), ('TrackDuration', '0:03:{sec:02d}'.format(sec=speaker.track % 60)),
+                ('TrackMetaData', speaker.track_meta_data),
+                ('TrackURI', 'http://127.0.0.1/track{n}.mp3'.format(n=speaker.track)),
+                ('RelTime', '0:00:10'), ('AbsTime', 'NOT_IMPLEMENTED'), ('RelCount', 2147483647),
+                ('AbsCount', 2147483647)]
+    if action == 'GetMediaInfo':
+        return [('NrTracks', 50), ('MediaDuration', 'NOT_IMPLEMENTED'),
+                ('CurrentURI', speaker.media_uri), ('CurrentURIMetaData', ''),
+                ('NextURI', ''), ('NextURIMetaData', ''), ('PlayMedium', 'NETWORK'),
+                ('RecordMedium', 'NOT_IMPLEMENTED'), ('WriteStatus', 'NOT_IMPLEMENTED')]
+    if action == 'GetCrossfadeMode':
+        return [('CrossfadeMode', 0)]
+    if action == 'GetCurrentTransportActions':
+        return [('Actions', 'Set, Stop, Pause, Seek, Next, Previous')]
+    if action == 'SetAVTransportURI':
+        speaker.uri = args.get('CurrentURI', '')
+        household.notify(speaker, 'AVTransport')
+        return []
+    if action == 'Play' and speaker.uri and not speaker.uri.startswith('x-rincon-queue:'):
+        timer = threading.Timer(household.snippet_duration, household.end_snippet, [speaker])
+        timer.daemon = True
+        timer.start()
+    if action in ('Play', 'Pause', 'Stop', 'Next', 'Previous', 'Seek'):
+        speaker.transport_state = {'Play': 'PLAYING', 'Pause': 'PAUSED_PLAYBACK', 'Stop': 'STOPPED'}.get(
+            action, speaker.transport_state)
+        if action == 'Next':
+            speaker.track += 1
+        elif action == 'Previous':
+            speaker.track = max(1, speaker.track - 1)
+        household.notify(speaker, 'AVTransport')
+        return []
+    if action == 'GetHouseholdID':
+        return [('CurrentHouseholdID', household.id)]
+    if action == 'GetLEDState':
+        return [('CurrentLEDState', 'On')]
+    if action == 'GetZoneAttributes':
+        return [('CurrentZoneName', speaker.name), ('CurrentIcon', 'x-rincon-roomicon:living'),
+                ('CurrentConfiguration', '1')]
+    if action == 'GetZoneGroupState':
+        return [('ZoneGroupState', household.zone_group_state())]
+    if action == 'GetZoneGroupAttributes':
+        return [('CurrentZoneGroupName', speaker.name), ('CurrentZoneGroupID', speaker.uid + ':1'),
+                ('CurrentZonePlayerUUIDsInGroup', speaker.uid)]
+    if action == 'ListAlarms':
+        return [('CurrentAlarmList', household.alarm_list()),
+                ('CurrentAlarmListVersion', 'RINCON_1:{n}'.format(n=household.alarm_list_version))]
+    if action == 'Browse':
+        return [('Result', '<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"></DIDL-Lite>'),
+                ('NumberReturned', 0), ('TotalMatches', 0), ('UpdateID', household.playlist_update_id)]
+    if action.startswith('Set') or action in ('AddURIToQueue', 'RemoveAllTracksFromQueue',
+                                              'BecomeCoordinatorOfStandaloneGroup'):
+        return []
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated Sonos household')
+    parser.add_argument('--speakers', type=int, default=4, help='number of virtual speakers')
+    parser.add_argument('--event-rate', type=float, default=0, help='events per second pushed to subscribers')
+    args = parser.parse_args()
+
+    household = Household(args.speakers)
+    household.start()
+    household.start_event_load(args.event_rate)
+    print("Simulating {n} speakers on {first} - {last}:{port}".format(
+        n=args.speakers, first=household.speakers[0].ip, last=household.speakers[-1].ip, port=SPEAKER_PORT))
+    try:
+        while True:
+            time.sleep(5)
+            print("requests: {requests}  events sent: {events}  notify errors: {errors}".format(
+                requests=household.requests, events=household.events_sent, errors=household.notify_errors))
+    except KeyboardInterrupt:
+        household.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from lib_sonos import definitions
+from lib_sonos import sonos_speaker
+
+logger = logging.getLogger('sonos_broker')
+
+
+class AnnouncementJob(object):
+    """
+    A snippet or TTS announcement queued for a zone coordinator.
+    """
+
+    QUEUED = 'queued'
+    PLAYING = 'playing'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, job_id, uid, uri=None, resolve=None, volume=-1, group_command=False, fade_in=False):
+        """
+        :param job_id: unique id of the job
+        :param uid: uid of the zone coordinator
+        :param uri: uri to be played
+        :param resolve: callable returning the uri, called by the scheduler right before the announcement is played
+        (e.g. to fetch a TTS file without blocking the command)
+        """
+        self.id = job_id
+        self.uid = uid
+        self.uri = uri
+        self.resolve = resolve
+        self.volume = volume
+        self.group_command = group_command
+        self.fade_in = fade_in
+        self.state = AnnouncementJob.QUEUED
+        self.error = None
+        self.cancelled = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def is_finished(self):
+        return self.state in (AnnouncementJob.DONE, AnnouncementJob.FAILED, AnnouncementJob.CANCELLED)
+
+    def to_dict(self):
+        return {'id': self.id, 'uid': self.uid, 'uri': self.uri, 'state': self.state, 'error': self.error,
+                'created': self.created, 'started': self.started, 'finished': self.finished}
+
+
+class AnnouncementScheduler:
+    """
+    Plays snippets and TTS announcements asynchronously. Every zone coordinator has its own queue, the jobs of a
+    coordinator are played one after another by a worker of a bounded thread pool, different coordinators are served
+    concurrently.
+
+    The state of the coordinator is saved once before the first job and restored after the last queued job, so
+    back-to-back announcements are played without a snapshot / restore per announcement.
+    """
+
+    # number of jobs (including finished ones) kept for status requests
+    MAX_JOBS = 100
+
+    def __init__(self, workers=definitions.ANNOUNCEMENT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Announcement')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._queues = {}
+        self._active = {}
+        self._jobs = OrderedDict()
+        self._running = True
+
+    def enqueue(self, speaker, **kwargs):
+        """
+        Queues an announcement for the zone coordinator of the speaker. Returns immediately.
+        :param speaker: SonosSpeaker instance
+        :param kwargs: arguments of the AnnouncementJob
+        :return: the queued AnnouncementJob
+        """
+        coordinator = speaker if speaker.is_coordinator else speaker.zone_coordinator
+        if coordinator is None:
+            raise Exception('No zone coordinator found for speaker with uid \'{uid}\'!'.format(uid=speaker.uid))
+
+        with self._lock:
+            if not self._running:
+                raise Exception('Announcement scheduler is not running!')
+            job = AnnouncementJob(str(next(self._ids)), coordinator.uid, **kwargs)
+            self._jobs[job.id] = job
+            self._prune()
+            queue = self._queues.get(job.uid)
+            start = queue is None
+            if start:
+                queue = self._queues[job.uid] = deque()
+            queue.append(job)
+        if start:
+            self._executor.submit(self._drain, coordinator)
+        logger.debug('Announcement {id} queued for coordinator {uid}'.format(id=job.id, uid=job.uid))
+        return job
+
+    def _prune(self):
+        # has to be called with the lock held
+        if len(self._jobs) <= AnnouncementScheduler.MAX_JOBS:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.is_finished]:
+            del self._jobs[job_id]
+            if len(self._jobs) <= AnnouncementScheduler.MAX_JOBS:
+                break
+
+    def _next(self, uid):
+        with self._lock:
+            queue = self._queues[uid]
+            if not queue or not self._running:
+                return None
+            job = queue.popleft()
+            job.state = AnnouncementJob.PLAYING
+            job.started = time.time()
+            self._active[uid] = job
+            return job
+
+    def _drain(self, coordinator):
+        uid = coordinator.uid
+        state = None
+        fade_in = False
+        while True:
+            job = self._next(uid)
+            if job is None:
+                if state is not None:
+                    try:
+                        coordinator.restore_announcement(state, fade_in)
+                    except Exception as err:
+                        logger.exception(err)
+                    state = None
+                with self._lock:
+                    # new jobs may have been queued during the restore
+                    if self._queues[uid] and self._running:
+                        continue
+                    for job in self._queues.pop(uid):
+                        job.state = AnnouncementJob.CANCELLED
+                    return
+
+            try:
+                uri = job.uri
+                if uri is None:
+                    uri = job.uri = job.resolve()
+                if not job.cancelled:
+                    if state is None:
+                        state = coordinator.snapshot_announcement()
+                    fade_in = job.fade_in
+                    coordinator.play_announcement(uri, job.volume, job.group_command, job)
+                job.state = AnnouncementJob.CANCELLED if job.cancelled else AnnouncementJob.DONE
+            except Exception as err:
+                logger.error('Announcement {id} failed: {err}'.format(id=job.id, err=err))
+                job.state = AnnouncementJob.FAILED
+                job.error = str(err)
+            finally:
+                job.finished = time.time()
+                with self._lock:
+                    self._active.pop(uid, None)
+
+    def status(self, job_id):
+        """
+        :param job_id: id of the job
+        :return: dict with the job status, None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. A queued job is removed from the queue, a playing announcement is stopped.
+        :param job_id: id of the job
+        :return: the job, None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return job
+            job.cancelled = True
+            queue = self._queues.get(job.uid)
+            if queue is not None and job in queue:
+                queue.remove(job)
+                job.state = AnnouncementJob.CANCELLED
+                job.finished = time.time()
+                return job
+            active = self._active.get(job.uid) is job
+        if active:
+            coordinator = sonos_speaker.sonos_speakers.get(job.uid)
+            if coordinator is not None:
+                coordinator.stop_tts.set()
+        return job
+
+    def queue_depth(self, uid=None):
+        """
+        :param uid: uid of a zone coordinator, None for all coordinators
+        :return: number of queued jobs (without the playing ones)
+        """
+        with self._lock:
+            if uid is not None:
+                return len(self._queues.get(uid, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': sum(len(queue) for queue in self._queues.values()),
+                'playing': len(self._active),
+                'coordinators': {uid: {'queued': len(queue),
+                                       'playing': self._active[uid].id if uid in self._active else None}
+                                 for uid, queue in self._queues.items()},
+                'jobs': [job.to_dict() for job in self._jobs.values()],
+            }
+
+    def terminate(self):
+        with self._lock:
+            self._running = False
+            active = list(self._active)
+        for uid in active:
+            coordinator = sonos_speaker.sonos_speakers.get(uid)
+            if coordinator is not None:
+                coordinator.stop_tts.set()
+        self._executor.shutdown(wait=False)
+        logger.debug("AnnouncementScheduler terminated")
@@ -15,8 +15,8 @@ NS = {'dc': '{http://purl.org/dc/elements/1.1/}',
 # regular expressions to find sonos meta info through udp stream
 ip_pattern = '^(([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])$'
 
-VERSION_BUILDSTRING = "v1.1 (2017-02-19)"
-VERSION = "1.1"
+VERSION_BUILDSTRING = "v1.2 (unreleased)"
+VERSION = "1.2"
 
 DEFAULT_HOST = '0.0.0.0'
 DEFAULT_PORT = 12900
@@ -26,6 +26,24 @@ DEFAULT_LOG = os.path.join(tempfile.gettempdir(), 'sonos-broker.log')
 HTTP_SUCCESS = 200
 HTTP_ERROR = 400
 SCAN_TIMEOUT = 180
+DEFAULT_EVENT_WORKERS = 8
+DEFAULT_FLUSH_MAX_DELAY = 0.5
+DEFAULT_FLUSH_BATCH_WINDOW = 0.05
+UDP_MAX_CLIENT_ERRORS = 10
+DEFAULT_DISCOVER_WORKERS = 8
+DEFAULT_DISCOVER_TIMEOUT = 10
+DEFAULT_SSDP_LISTENER = True
+DEFAULT_DISCOVER_INTERFACE = None
+BATCH_WORKERS = 8
+GROUP_COMMAND_WORKERS = 8
+WEBSERVICE_KEEP_ALIVE = 30
+ANNOUNCEMENT_WORKERS = 4
+ANNOUNCEMENT_MAX_DURATION = 120
+TTS_MAX_LENGTH = 1000
+TTS_STREAM_MAX_LENGTH = 100
+METRICS_PATH = '/metrics'
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_DISCOVERY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)
 TIMESTAMP_PATTERN = "([0-5]?[0-9]):([0-5]?[0-9]):([0-5][0-9])"
 MB_PLAYLIST = "#so_pl#"
 SUBSCRIPTION_TIMEOUT = 240
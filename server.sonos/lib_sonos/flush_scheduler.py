@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from lib_sonos import definitions
+
+logger = logging.getLogger('sonos_broker')
+
+
+class FlushScheduler:
+    """
+    Sends the dirty properties of Sonos speakers to the subscribed clients with a bounded latency.
+
+    A speaker is flushed as soon as no further property was made dirty within the batching window, but never later
+    than 'max_delay' seconds after its first property became dirty. This way a steady stream of events can not postpone
+    the udp updates indefinitely, while bursts of changes are still merged into a single delta.
+    """
+
+    def __init__(self, max_delay=definitions.DEFAULT_FLUSH_MAX_DELAY,
+                 batch_window=definitions.DEFAULT_FLUSH_BATCH_WINDOW):
+        self.max_delay = max_delay
+        self.batch_window = batch_window
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._running = True
+        self._flushes = 0
+        self._flushed_properties = 0
+        self._max_flush_size = 0
+        self._total_delay = 0.0
+        self._max_flush_delay = 0.0
+        self.thread = threading.Thread(target=self._run, name='FlushScheduler')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, speaker, dirty_since, now):
+        """
+        Schedules a flush for the given speaker.
+        :param speaker: SonosSpeaker instance with dirty properties
+        :param dirty_since: monotonic timestamp of the oldest unsent change of the speaker
+        :param now: monotonic timestamp of the latest change
+        """
+        deadline = min(dirty_since + self.max_delay, now + self.batch_window)
+        with self._cond:
+            current = self._pending.get(speaker)
+            self._pending[speaker] = deadline
+            if current is None or deadline < current:
+                self._cond.notify()
+
+    def record(self, size, delay):
+        """
+        Records a flush. Called by the speaker for every delta sent to the clients.
+        :param size: number of properties in the delta
+        :param delay: seconds between the first change and the flush
+        """
+        with self._stats_lock:
+            self._flushes += 1
+            self._flushed_properties += size
+            self._total_delay += delay
+            if size > self._max_flush_size:
+                self._max_flush_size = size
+            if delay > self._max_flush_delay:
+                self._max_flush_delay = delay
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'flushes': self._flushes,
+                'flushed_properties': self._flushed_properties,
+                'max_flush_size': self._max_flush_size,
+                'avg_flush_size': self._flushed_properties / self._flushes if self._flushes else 0,
+                'max_flush_delay': self._max_flush_delay,
+                'avg_flush_delay': self._total_delay / self._flushes if self._flushes else 0,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                due = [speaker for speaker, deadline in self._pending.items() if deadline <= now]
+                if not due:
+                    timeout = min(self._pending.values()) - now if self._pending else None
+                    self._cond.wait(timeout)
+                    continue
+                for speaker in due:
+                    del self._pending[speaker]
+
+            for speaker in due:
+                try:
+                    speaker.send()
+                except Exception as err:
+                    logger.warning("Could not flush speaker data: {err}".format(err=err))
+
+    def terminate(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        logger.debug("FlushScheduler terminated")
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import bisect
+import os
+import threading
+import time
+from lib_sonos import definitions
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _sample(name, labels, values, value):
+    if labels:
+        name = '{name}{{{labels}}}'.format(name=name, labels=','.join(
+            '{label}="{value}"'.format(label=label, value=_escape(label_value))
+            for label, label_value in zip(labels, values)))
+    return '{name} {value}'.format(name=name, value=_format(value))
+
+
+def _header(name, documentation, metric_type):
+    return ['# HELP {name} {doc}'.format(name=name, doc=documentation),
+            '# TYPE {name} {type}'.format(name=name, type=metric_type)]
+
+
+class Counter(object):
+    """
+    A Prometheus counter with labels, incremented by the broker.
+    """
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = _header(self.name, self.documentation, 'counter')
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(_sample(self.name, self.labels, label_values, value))
+        return lines
+
+
+class Histogram(object):
+    """
+    A Prometheus histogram with labels. Only the count of every bucket is recorded, the counts are cumulated when the
+    histogram is rendered.
+    """
+
+    def __init__(self, name, documentation, labels=(), buckets=definitions.METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts (the last one is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        :param value: observed value, e.g. a duration in seconds
+        :param label_values: one value for every label
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = _header(self.name, self.documentation, 'histogram')
+        with self._lock:
+            values = sorted((label_values, list(entry[0]), entry[1])
+                            for label_values, entry in self._values.items())
+        bucket_labels = self.labels + ('le',)
+        for label_values, counts, total in values:
+            cumulated = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulated += count
+                lines.append(_sample(self.name + '_bucket', bucket_labels, label_values + (_format(bound),),
+                                     cumulated))
+            lines.append(_sample(self.name + '_sum', self.labels, label_values, total))
+            lines.append(_sample(self.name + '_count', self.labels, label_values, cumulated))
+        return lines
+
+
+soap_request_duration = Histogram('sonos_soap_request_duration_seconds',
+                                  'Duration of the SOAP requests to the speakers.', ('action', 'speaker'))
+command_duration = Histogram('sonos_command_duration_seconds',
+                             'Duration of the broker commands.', ('command',))
+event_queue_delay = Histogram('sonos_event_queue_delay_seconds',
+                              'Time an event waited in the event engine until it was dispatched.')
+event_to_udp = Histogram('sonos_event_to_udp_seconds',
+                         'Time from the receipt of an event (NOTIFY) until the resulting changes were sent to the '
+                         'udp clients.')
+discovery_duration = Histogram('sonos_discovery_duration_seconds',
+                               'Duration of the speaker discovery scans.', buckets=definitions.METRICS_DISCOVERY_BUCKETS)
+events = Counter('sonos_events_total', 'Events dispatched by the event engine.', ('service',))
+
+_histograms = (soap_request_duration, command_duration, event_queue_delay, event_to_udp, discovery_duration)
+_counters = (events,)
+
+
+def observe_soap_request(service, action, duration):
+    """
+    Callback for the SoCo SOAP requests, see soco.config.SOAP_REQUEST_CALLBACK.
+    """
+    soap_request_duration.observe(duration, action, service.soco.ip_address)
+
+
+def _rss():
+    """
+    :return: resident memory of the broker process in bytes, None if unknown
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _gauges(lines, metric_type, name, documentation, samples, labels=()):
+    """
+    Adds a metric whose values are taken from the broker components at scrape time.
+    :param samples: list of (label values, value) tuples
+    """
+    lines.extend(_header(name, documentation, metric_type))
+    for label_values, value in samples:
+        lines.append(_sample(name, labels, label_values, value))
+
+
+def render():
+    """
+    Collects the metrics of all broker components.
+    :return: the metrics in the Prometheus text format
+    """
+    # imported here, the broker components depend on this module
+    from lib_sonos import sonos_speaker
+    from lib_sonos.sonos_speaker import SonosSpeaker
+    from lib_sonos.udp_broker import UdpBroker
+    from soco import cache
+    from soco.events import event_decoder, event_listener, renewal_scheduler
+
+    lines = []
+    for metric in _counters + _histograms:
+        lines.extend(metric.render())
+
+    engine = SonosSpeaker.event_queue
+    if engine is not None:
+        _gauges(lines, 'gauge', 'sonos_event_queue_depth', 'Events waiting in the event engine.',
+                [((), engine.queue_depth)])
+        _gauges(lines, 'gauge', 'sonos_event_queue_oldest_age_seconds',
+                'Age of the oldest event waiting in the event engine.', [((), engine.oldest_event_age)])
+
+    decoder = event_decoder.stats
+    _gauges(lines, 'counter', 'sonos_notify_received_total', 'Events (NOTIFY requests) received.',
+            [((), decoder['received'])])
+    _gauges(lines, 'counter', 'sonos_notify_decoded_total', 'Events decoded.', [((), decoder['decoded'])])
+    _gauges(lines, 'counter', 'sonos_notify_gaps_total', 'Event sequence numbers given up as lost.',
+            [((), decoder['gaps'])])
+    _gauges(lines, 'counter', 'sonos_notify_stale_total', 'Events dropped, they arrived behind their sequence number.',
+            [((), decoder['stale'])])
+    _gauges(lines, 'gauge', 'sonos_notify_decoder_queue_depth', 'Events waiting for the event decoder.',
+            [((), decoder['queued'])])
+    listener = event_listener.stats
+    if listener:
+        _gauges(lines, 'counter', 'sonos_notify_connections_total', 'Connections accepted by the event listener.',
+                [((), listener['connections'])])
+        _gauges(lines, 'gauge', 'sonos_notify_open_connections', 'Open connections of the event listener.',
+                [((), listener['open_connections'])])
+        _gauges(lines, 'counter', 'sonos_notify_requests_total', 'Requests served by the event listener.',
+                [((), listener['requests'])])
+        _gauges(lines, 'gauge', 'sonos_notify_busy_workers', 'Workers of the event listener serving a request.',
+                [((), listener['busy'])])
+        _gauges(lines, 'counter', 'sonos_notify_queue_delay_seconds_total',
+                'Time the requests of the event listener waited for a worker.', [((), listener['queue_delay'])])
+        _gauges(lines, 'gauge', 'sonos_notify_queue_delay_max_seconds',
+                'Longest time a request of the event listener waited for a worker.',
+                [((), listener['max_queue_delay'])])
+        _gauges(lines, 'counter', 'sonos_notify_handler_seconds_total',
+                'Time the workers of the event listener spent serving requests.', [((), listener['handler_time'])])
+        _gauges(lines, 'gauge', 'sonos_notify_handler_max_seconds',
+                'Longest time a worker of the event listener spent serving a request.',
+                [((), listener['max_handler_time'])])
+
+    renewals = renewal_scheduler.stats
+    _gauges(lines, 'counter', 'sonos_subscription_renewals_total', 'Successful renewals of event subscriptions.',
+            [((), renewals['renewals'])])
+    _gauges(lines, 'counter', 'sonos_subscription_renew_failures_total', 'Failed renewals of event subscriptions.',
+            [((), renewals['failures'])])
+    failing = []
+    speakers = sonos_speaker.sonos_speakers
+    for uid, speaker in sorted(speakers.items()):
+        for service, health in sorted(speaker.subscription_health.items()):
+            if health is not None:
+                failing.append(((uid, service), health['renew_failures']))
+    _gauges(lines, 'gauge', 'sonos_subscription_consecutive_renew_failures',
+            'Failed renewals of an event subscription since its last successful renewal.', failing,
+            ('speaker', 'service'))
+    _gauges(lines, 'gauge', 'sonos_speakers', 'Speakers known to the broker.', [((), len(speakers))])
+
+    clients = UdpBroker.client_stats()
+    udp_labels = ('client', 'encoding')
+    _gauges(lines, 'counter', 'sonos_udp_messages_total', 'Udp messages sent to a client.',
+            [((client['client'], client['encoding']), client['messages']) for client in clients], udp_labels)
+    _gauges(lines, 'counter', 'sonos_udp_bytes_total', 'Udp bytes sent to a client.',
+            [((client['client'], client['encoding']), client['bytes']) for client in clients], udp_labels)
+    _gauges(lines, 'counter', 'sonos_udp_errors_total', 'Udp messages which could not be sent to a client.',
+            [((client['client'], client['encoding']), client['errors']) for client in clients], udp_labels)
+    if SonosSpeaker.flush_scheduler is not None:
+        flushes = SonosSpeaker.flush_scheduler.stats
+        _gauges(lines, 'counter', 'sonos_udp_flushes_total', 'Changes of a speaker sent to the udp clients.',
+                [((), flushes['flushes'])])
+        _gauges(lines, 'counter', 'sonos_udp_flushed_properties_total', 'Properties sent to the udp clients.',
+                [((), flushes['flushed_properties'])])
+
+    if SonosSpeaker.announcement_scheduler is not None:
+        announcements = SonosSpeaker.announcement_scheduler.stats
+        _gauges(lines, 'gauge', 'sonos_announcements_queued', 'Queued snippet and TTS announcements.',
+                [((), announcements['queued'])])
+        _gauges(lines, 'gauge', 'sonos_announcements_playing', 'Snippet and TTS announcements being played.',
+                [((), announcements['playing'])])
+
+    if SonosSpeaker.tts_cache is not None:
+        tts = SonosSpeaker.tts_cache.stats()
+        _gauges(lines, 'gauge', 'sonos_tts_cache_bytes', 'Size of the local TTS cache.', [((), tts['size'])])
+        _gauges(lines, 'counter', 'sonos_tts_cache_hits_total', 'TTS requests served from the local cache.',
+                [((), tts['hits'])])
+        _gauges(lines, 'counter', 'sonos_tts_cache_misses_total', 'TTS requests fetched from Google.',
+                [((), tts['misses'])])
+
+    soco_cache = cache.stats()
+    _gauges(lines, 'gauge', 'sonos_soco_cache_entries', 'Entries of the SoCo response caches.',
+            [((), soco_cache.get('entries', 0))])
+    _gauges(lines, 'counter', 'sonos_soco_cache_hits_total', 'SoCo requests served from the response caches.',
+            [((), soco_cache.get('hits', 0))])
+    _gauges(lines, 'counter', 'sonos_soco_cache_misses_total', 'SoCo requests not found in the response caches.',
+            [((), soco_cache.get('misses', 0))])
+
+    _gauges(lines, 'gauge', 'process_threads', 'Threads of the broker process.', [((), threading.active_count())])
+    _gauges(lines, 'counter', 'process_cpu_seconds_total', 'CPU time of the broker process.',
+            [((), time.process_time())])
+    rss = _rss()
+    if rss is not None:
+        _gauges(lines, 'gauge', 'process_resident_memory_bytes', 'Resident memory of the broker process.',
+                [((), rss)])
+    lines.append('')
+    return '\n'.join(lines)
@@ -1,43 +1,169 @@
 import json
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
 import re
+import threading
+import time
 import requests
 from lib_sonos.sonos_service import SonosServerService
 import soco
 from lib_sonos.sonos_library import SonosLibrary
 from lib_sonos.definitions import TIMESTAMP_PATTERN, SCAN_TIMEOUT
 from lib_sonos.udp_broker import UdpBroker
+from lib_sonos import udp_codec
 from soco.exceptions import SoCoUPnPException
+from soco.events import renewal_scheduler
 from lib_sonos import sonos_speaker
 from lib_sonos import utils
 from lib_sonos.utils import underscore_to_camel
+from soco.utils import camel_to_underscore
 from lib_sonos import definitions
 
 logger = logging.getLogger('sonos_broker')
 
 
+class CommandError(Exception):
+    """
+    Raised if a command request can not be dispatched. The code is returned to clients requesting json responses.
+    """
+    UNKNOWN_COMMAND = 'unknown_command'
+    MISSING_PARAMETER = 'missing_parameter'
+    INVALID_PARAMETER = 'invalid_parameter'
+    INVALID_REQUEST = 'invalid_request'
+    COMMAND_FAILED = 'command_failed'
+    DEADLINE_EXCEEDED = 'deadline_exceeded'
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class IntParameter():
+    """
+    An integer parameter (or a string of an integer) within an optional range.
+    """
+
+    def __init__(self, minimum=None, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def check(self, value):
+        if not isinstance(value, (int, str)) or value == '' or not utils.check_int(value):
+            return 'has to be an Integer'
+        value = int(value)
+        if self.maximum is None:
+            if self.minimum is not None and value < self.minimum:
+                return 'has to be at least {minimum}'.format(minimum=self.minimum)
+        elif value < self.minimum or value > self.maximum:
+            return 'has to be between {minimum} and {maximum}'.format(minimum=self.minimum, maximum=self.maximum)
+        return None
+
+
+class FlagParameter():
+    """
+    A boolean parameter: 0|1, True|False or yes|no.
+    """
+    VALUES = [1, True, '1', 'True', 'yes', 0, False, '0', 'False', 'no']
+
+    def check(self, value):
+        if isinstance(value, (int, str)) and value in FlagParameter.VALUES:
+            return None
+        return 'has to be 0|1 or True|False'
+
+
+class StrParameter():
+    """
+    A string parameter with an optional maximum length and an optional list of allowed values.
+    """
+
+    def __init__(self, max_length=None, choices=None):
+        self.max_length = max_length
+        self.choices = choices
+
+    def check(self, value):
+        if not isinstance(value, str):
+            return 'has to be a String'
+        if self.max_length is not None and len(value) > self.max_length:
+            return 'must not be longer than {length} characters'.format(length=self.max_length)
+        if self.choices is not None and value.lower() not in self.choices:
+            return 'has to be one of {choices}'.format(choices='|'.join(self.choices))
+        return None
+
+
+UID = StrParameter()
+GROUP_COMMAND = FlagParameter()
+BINARY = IntParameter(0, 1)
+
+
+def json_response(status, response, code=None):
+    """
+    Builds the body of a json response. Responses already formatted as json by a command are embedded as objects,
+    failed commands get an error object with an error code.
+    :param status: True if the command was successful
+    :param response: response of the command
+    :param code: error code, defaults to CommandError.COMMAND_FAILED for failed commands
+    """
+    if isinstance(response, str) and response[:1] in ('{', '['):
+        try:
+            response = json.loads(response)
+        except ValueError:
+            pass
+    elif response is not None and not isinstance(response, (str, int, float, bool, list, dict)):
+        response = str(response)
+
+    body = {'status': bool(status), 'response': response}
+    if not status:
+        body['error'] = {'code': code or CommandError.COMMAND_FAILED, 'message': str(response)}
+    return body
+
+
 class MyDecoder(json.JSONDecoder):
     def decode(self, json_string):
-        obj = json.loads(json_string)
-        module = __import__(__name__, fromlist=['sonos.json_commands'])
-
-        '''
-         class name must be camel case, convert it
-        '''
-        class_name = underscore_to_camel(obj['command'])
-        class_ = getattr(module, class_name)
+        return MyDecoder.build(json.loads(json_string))
 
-        if 'parameter' in obj:
-            instance = class_(obj['parameter'])
-        else:
-            instance = class_(obj)
-        return instance
+    @staticmethod
+    def build(obj):
+        """
+        Creates the command instance for an already decoded json command. The command class is looked up in the
+        command registry, the required parameters of the command are validated before the instance is created.
+        :param obj: dict with 'command' and (optional) 'parameter'
+        """
+        if not isinstance(obj, dict) or not isinstance(obj.get('command'), str):
+            raise CommandError(CommandError.INVALID_REQUEST, 'Invalid command format!')
+
+        class_ = COMMANDS.get(obj['command'].lower())
+        if class_ is None:
+            raise CommandError(CommandError.UNKNOWN_COMMAND,
+                               "No command '{command}' found!".format(command=underscore_to_camel(obj['command'])))
+
+        parameter = obj.get('parameter', obj)
+        if not isinstance(parameter, dict):
+            raise CommandError(CommandError.INVALID_REQUEST, "The 'parameter' of a command has to be an object!")
+
+        for name in class_.required_parameters:
+            if name not in parameter:
+                raise CommandError(CommandError.MISSING_PARAMETER, "Missing parameter '{parameter}'!".format(
+                    parameter=name))
+        for name, parameter_type in class_.parameter_types.items():
+            if name in parameter:
+                error = parameter_type.check(parameter[name])
+                if error is not None:
+                    raise CommandError(CommandError.INVALID_PARAMETER, "The parameter '{parameter}' {error}!".format(
+                        parameter=name, error=error))
+        return class_(parameter)
 
 
 class JsonCommandBase():
     __metaclass__ = ABCMeta
 
+    # parameters validated by MyDecoder.build before the command is created
+    required_parameters = ()
+    # parameters evaluated by the command if present, for documentation only
+    optional_parameters = ()
+    # parameter name -> IntParameter|FlagParameter|StrParameter, validated by MyDecoder.build if present
+    parameter_types = {}
+
     def __init__(self, parameter=None):
         self._status = False
         self._response = ''
@@ -46,6 +172,11 @@ class JsonCommandBase():
             for key, value in parameter.items():
                 setattr(self, key, value)
 
+    def log_command(self):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(
+                classname=self.__class__.__name__, attributes=utils.dump_attributes(self)))
+
     @abstractmethod
     def run(self):
         raise NotImplementedError("Method 'run' must be implemented!")
@@ -59,14 +190,17 @@ class JsonCommandBase():
 # CLIENT SUBSCRIBE / UNSUBSCRIE ########################################################################################
 
 class ClientSubscribe(JsonCommandBase):
+    required_parameters = ('ip', 'port')
+    optional_parameters = ('encoding',)
+    parameter_types = {'ip': StrParameter(), 'port': IntParameter(1, 65535),
+                       'encoding': StrParameter(choices=udp_codec.ENCODINGS)}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if not utils.check_int(self.port):
                 raise Exception('Port \'{port}\' is not an Integer!'.format(port=self.port))
             port = int(self.port)
@@ -77,7 +211,14 @@ class ClientSubscribe(JsonCommandBase):
             if not utils.ip_address_is_valid(self.ip):
                 raise Exception('IP address \'{ip}\' is not valid.'.format(ip=self.ip))
 
-            UdpBroker.subscribe_client(self.ip, self.port)
+            encoding = udp_codec.ENCODING_JSON
+            if hasattr(self, 'encoding'):
+                if self.encoding not in udp_codec.ENCODINGS:
+                    raise Exception('The parameter \'encoding\' has to be one of {encodings}!'.format(
+                        encodings='|'.join(udp_codec.ENCODINGS)))
+                encoding = self.encoding
+
+            UdpBroker.subscribe_client(self.ip, port, encoding)
             self._status = True
         except AttributeError as err:
             self._response = JsonCommandBase.missing_param_error(err)
@@ -88,14 +229,15 @@ class ClientSubscribe(JsonCommandBase):
 
 
 class ClientUnsubscribe(JsonCommandBase):
+    required_parameters = ('ip', 'port')
+    parameter_types = {'ip': StrParameter(), 'port': IntParameter(1, 65535)}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if not utils.check_int(self.port):
                 raise Exception('Port \'{port}\' is not an Integer!'.format(port=self.port))
             port = int(self.port)
@@ -119,14 +261,15 @@ class ClientUnsubscribe(JsonCommandBase):
 # CURRENT STATE ########################################################################################################
 
 class CurrentState(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('group_command',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
             self._status = True
@@ -151,14 +294,14 @@ class CurrentState(JsonCommandBase):
 # BALANCE ##############################################################################################################
 
 class GetBalance(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -177,14 +320,16 @@ class GetBalance(JsonCommandBase):
 
 
 class SetBalance(JsonCommandBase):
+    required_parameters = ('uid', 'balance')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'balance': IntParameter(-100, 100), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -220,14 +365,14 @@ class SetBalance(JsonCommandBase):
 # VOLUME ###############################################################################################################
 
 class GetVolume(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -246,14 +391,16 @@ class GetVolume(JsonCommandBase):
 
 
 class SetVolume(JsonCommandBase):
+    required_parameters = ('uid', 'volume')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'volume': IntParameter(0, 100), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -289,14 +436,15 @@ class SetVolume(JsonCommandBase):
 # VOLUME UP ############################################################################################################
 
 class VolumeUp(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('group_command',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -325,14 +473,15 @@ class VolumeUp(JsonCommandBase):
 # VOLUME DOWN ##########################################################################################################
 
 class VolumeDown(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('group_command',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -361,14 +510,14 @@ class VolumeDown(JsonCommandBase):
 # MAX VOLUME ###########################################################################################################
 
 class GetMaxVolume(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -387,14 +536,16 @@ class GetMaxVolume(JsonCommandBase):
 
 
 class SetMaxVolume(JsonCommandBase):
+    required_parameters = ('uid', 'max_volume')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'max_volume': IntParameter(-1, 100), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -435,14 +586,14 @@ class SetMaxVolume(JsonCommandBase):
 # MUTE #################################################################################################################
 
 class GetMute(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -461,14 +612,16 @@ class GetMute(JsonCommandBase):
 
 
 class SetMute(JsonCommandBase):
+    required_parameters = ('uid', 'mute')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'mute': BINARY, 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -497,14 +650,14 @@ class SetMute(JsonCommandBase):
 # BASS #################################################################################################################
 
 class GetBass(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -523,14 +676,16 @@ class GetBass(JsonCommandBase):
 
 
 class SetBass(JsonCommandBase):
+    required_parameters = ('uid', 'bass')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'bass': IntParameter(-10, 10), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -562,14 +717,14 @@ class SetBass(JsonCommandBase):
 # TREBLE ###############################################################################################################
 
 class GetTreble(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -588,14 +743,16 @@ class GetTreble(JsonCommandBase):
 
 
 class SetTreble(JsonCommandBase):
+    required_parameters = ('uid', 'treble')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'treble': IntParameter(-10, 10), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -629,14 +786,14 @@ class SetTreble(JsonCommandBase):
 # LOUDNESS #############################################################################################################
 
 class GetLoudness(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -655,14 +812,16 @@ class GetLoudness(JsonCommandBase):
 
 
 class SetLoudness(JsonCommandBase):
+    required_parameters = ('uid', 'loudness')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'loudness': FlagParameter(), 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -699,14 +858,14 @@ class SetLoudness(JsonCommandBase):
 # STOP #################################################################################################################
 
 class GetStop(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -725,14 +884,15 @@ class GetStop(JsonCommandBase):
 
 
 class SetStop(JsonCommandBase):
+    required_parameters = ('uid', 'stop')
+    parameter_types = {'uid': UID, 'stop': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -757,14 +917,14 @@ class SetStop(JsonCommandBase):
 # PLAYLIST POSITION ####################################################################################################
 
 class GetPlaylistPosition(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -785,14 +945,14 @@ class GetPlaylistPosition(JsonCommandBase):
 # PLAYLIST TOTAL TRACKS ################################################################################################
 
 class GetPlaylistTotalTracks(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -813,14 +973,14 @@ class GetPlaylistTotalTracks(JsonCommandBase):
 # PLAY #################################################################################################################
 
 class GetPlay(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -839,14 +999,15 @@ class GetPlay(JsonCommandBase):
 
 
 class SetPlay(JsonCommandBase):
+    required_parameters = ('uid', 'play')
+    parameter_types = {'uid': UID, 'play': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -871,14 +1032,14 @@ class SetPlay(JsonCommandBase):
 # PAUSE ################################################################################################################
 
 class GetPause(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -897,14 +1058,15 @@ class GetPause(JsonCommandBase):
 
 
 class SetPause(JsonCommandBase):
+    required_parameters = ('uid', 'pause')
+    parameter_types = {'uid': UID, 'pause': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -929,14 +1091,14 @@ class SetPause(JsonCommandBase):
 # RADIO STATION ########################################################################################################
 
 class GetRadioStation(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -957,14 +1119,14 @@ class GetRadioStation(JsonCommandBase):
 # RADIO SHOW ###########################################################################################################
 
 class GetRadioShow(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -985,14 +1147,14 @@ class GetRadioShow(JsonCommandBase):
 # PLAYMODE #############################################################################################################
 
 class GetPlaymode(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1011,14 +1173,16 @@ class GetPlaymode(JsonCommandBase):
 
 
 class SetPlaymode(JsonCommandBase):
+    required_parameters = ('uid', 'playmode')
+    parameter_types = {'uid': UID,
+                       'playmode': StrParameter(choices=('normal', 'shuffle_norepeat', 'shuffle', 'repeat_all'))}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1049,14 +1213,14 @@ class SetPlaymode(JsonCommandBase):
 # ALARMS ###############################################################################################################
 
 class GetAlarms(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1077,14 +1241,14 @@ class GetAlarms(JsonCommandBase):
 # TRACK ARTIST #########################################################################################################
 
 class GetTrackArtist(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1105,14 +1269,14 @@ class GetTrackArtist(JsonCommandBase):
 # TRACK TITLE ##########################################################################################################
 
 class GetTrackTitle(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1132,15 +1296,14 @@ class GetTrackTitle(JsonCommandBase):
 # TRANSPORT ACTIONS ####################################################################################################
 
 class GetTransportActions(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug(
-                'COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                         attributes=utils.dump_attributes(
-                                                                             self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1160,14 +1323,14 @@ class GetTransportActions(JsonCommandBase):
 # TRACK ALBUM ##########################################################################################################
 
 class GetTrackAlbum(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1187,14 +1350,14 @@ class GetTrackAlbum(JsonCommandBase):
 # TRACK ALBUM COVER ####################################################################################################
 
 class GetTrackAlbumArt(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1215,14 +1378,14 @@ class GetTrackAlbumArt(JsonCommandBase):
 # TRACK URI ############################################################################################################
 
 class GetTrackUri(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1242,15 +1405,15 @@ class GetTrackUri(JsonCommandBase):
 # NIGHTMODE ############################################################################################################
 
 class SetNightmode(JsonCommandBase):
+    required_parameters = ('uid', 'nightmode')
+    parameter_types = {'uid': UID, 'nightmode': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug(
-                'COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                         attributes=utils.dump_attributes(
-                                                                             self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1272,15 +1435,14 @@ class SetNightmode(JsonCommandBase):
             return self._status, self._response
 
 class GetNightmode(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug(
-                'COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                         attributes=utils.dump_attributes(
-                                                                             self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1300,14 +1462,16 @@ class GetNightmode(JsonCommandBase):
 # LED #################################################################################################################
 
 class SetLed(JsonCommandBase):
+    required_parameters = ('uid', 'led')
+    optional_parameters = ('group_command',)
+    parameter_types = {'uid': UID, 'led': BINARY, 'group_command': GROUP_COMMAND}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1343,14 +1507,14 @@ class SetLed(JsonCommandBase):
 
 
 class GetLed(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1371,14 +1535,14 @@ class GetLed(JsonCommandBase):
 # NEXT #################################################################################################################
 
 class Next(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1406,14 +1570,14 @@ class Next(JsonCommandBase):
 # PREVIOUS #############################################################################################################
 
 class Previous(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1442,14 +1606,16 @@ class Previous(JsonCommandBase):
 # TRACK POSITION #######################################################################################################
 
 class GetTrackPosition(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('force_refresh',)
+    parameter_types = {'uid': UID, 'force_refresh': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             force_refresh = 0
             if hasattr(self, 'force_refresh'):
                 if self.force_refresh not in [0, 1, True, False, '0', '1']:
@@ -1478,14 +1644,15 @@ class GetTrackPosition(JsonCommandBase):
 
 
 class SetTrackPosition(JsonCommandBase):
+    required_parameters = ('uid', 'timestamp')
+    parameter_types = {'uid': UID, 'timestamp': StrParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1510,14 +1677,14 @@ class SetTrackPosition(JsonCommandBase):
 # PARTYMODE ############################################################################################################
 
 class Partymode(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1538,14 +1705,15 @@ class Partymode(JsonCommandBase):
 # JOIN #################################################################################################################
 
 class Join(JsonCommandBase):
+    required_parameters = ('uid', 'join_uid')
+    parameter_types = {'uid': UID, 'join_uid': UID}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1566,14 +1734,16 @@ class Join(JsonCommandBase):
 # UNJOIN ###############################################################################################################
 
 class Unjoin(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('play',)
+    parameter_types = {'uid': UID, 'play': FlagParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1608,9 +1778,7 @@ class ClientList(JsonCommandBase):
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             data = ''
             for uid, speaker in sonos_speaker.sonos_speakers.items():
                 data += "{uid}\n".format(uid=speaker.uid)
@@ -1635,14 +1803,15 @@ class ClientList(JsonCommandBase):
 # PLAY URI #############################################################################################################
 
 class PlayUri(JsonCommandBase):
+    required_parameters = ('uid', 'uri')
+    parameter_types = {'uid': UID, 'uri': StrParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1662,14 +1831,15 @@ class PlayUri(JsonCommandBase):
 # PLAY TUNEIN RADIO ####################################################################################################
 
 class PlayTunein(JsonCommandBase):
+    required_parameters = ('uid', 'station_name')
+    parameter_types = {'uid': UID, 'station_name': StrParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1689,14 +1859,17 @@ class PlayTunein(JsonCommandBase):
 # PLAY SNIPPET #########################################################################################################
 
 class PlaySnippet(JsonCommandBase):
+    required_parameters = ('uid', 'uri')
+    optional_parameters = ('fade_in', 'group_command', 'volume')
+    parameter_types = {'uid': UID, 'uri': StrParameter(), 'fade_in': FlagParameter(), 'group_command': GROUP_COMMAND,
+                       'volume': IntParameter(-1, 100)}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
@@ -1726,9 +1899,9 @@ class PlaySnippet(JsonCommandBase):
                 else:
                     raise Exception('The parameter \'fade_in\' has to be 0|1 or True|False !')
 
-            sonos_speaker.sonos_speakers[self.uid].play_snippet(self.uri, volume, group_command=group_command, fade_in=
-            fade_in)
-
+            job = sonos_speaker.sonos_speakers[self.uid].play_snippet(self.uri, volume, group_command=group_command,
+                                                                      fade_in=fade_in)
+            self._response = job.id
             self._status = True
         except requests.ConnectionError:
             self._response = 'Unable to process command. Speaker with uid \'{uid}\'seems to be offline.'. \
@@ -1744,20 +1917,21 @@ class PlaySnippet(JsonCommandBase):
 # PLAY TTS #############################################################################################################
 
 class PlayTts(JsonCommandBase):
+    required_parameters = ('uid', 'tts')
+    optional_parameters = ('fade_in', 'force_stream_mode', 'group_command', 'language', 'volume')
+    parameter_types = {'uid': UID, 'tts': StrParameter(max_length=definitions.TTS_MAX_LENGTH), 'fade_in': FlagParameter(),
+                       'group_command': GROUP_COMMAND, 'force_stream_mode': FlagParameter(),
+                       'language': StrParameter(), 'volume': IntParameter(-1, 100)}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if self.uid not in sonos_speaker.sonos_speakers:
                 raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
 
-            if len(self.tts) > 100:
-                raise Exception('Text-to-Speech string must not be greater than 100 characters.')
-
             group_command = 0
             if hasattr(self, 'group_command'):
                 if self.group_command in [1, True, '1', 'True', 'yes']:
@@ -1797,8 +1971,16 @@ class PlayTts(JsonCommandBase):
             if hasattr(self, 'language'):
                 language = self.language
 
-            sonos_speaker.sonos_speakers[self.uid].play_tts(self.tts, volume, language, group_command=group_command,
-                                                            fade_in=fade_in, force_stream_mode=force_stream_mode)
+            # longer texts are fetched in several parts, only the first part can be streamed
+            if (force_stream_mode or not sonos_speaker.SonosSpeaker.tts_local_mode) and \
+                    len(self.tts) > definitions.TTS_STREAM_MAX_LENGTH:
+                raise Exception('Text-to-Speech strings longer than {length} characters require the local TTS '
+                                'mode.'.format(length=definitions.TTS_STREAM_MAX_LENGTH))
+
+            job = sonos_speaker.sonos_speakers[self.uid].play_tts(self.tts, volume, language,
+                                                                  group_command=group_command, fade_in=fade_in,
+                                                                  force_stream_mode=force_stream_mode)
+            self._response = job.id
             self._status = True
         except requests.ConnectionError:
             self._response = 'Unable to process command. Speaker with uid \'{uid}\'seems to be offline.'. \
@@ -1814,14 +1996,15 @@ class PlayTts(JsonCommandBase):
 # GET FAVORITE RADIO STATIONS ##########################################################################################
 
 class GetFavoriteRadioStations(JsonCommandBase):
+    optional_parameters = ('max_items', 'start_item')
+    parameter_types = {'start_item': IntParameter(0), 'max_items': IntParameter(0)}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             start_item = 0
             if hasattr(self, 'start_item'):
                 if not utils.check_int(self.start_item):
@@ -1855,9 +2038,7 @@ class SonosBrokerVersion(JsonCommandBase):
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             self._response = definitions.VERSION
             self._status = True
         except AttributeError as err:
@@ -1867,17 +2048,115 @@ class SonosBrokerVersion(JsonCommandBase):
         finally:
             return self._status, self._response
 
+# TTS CACHE STATS ######################################################################################################
+
+class TtsCacheStats(JsonCommandBase):
+    def __init__(self, parameter):
+        super().__init__(parameter)
+
+    def run(self):
+        try:
+            self.log_command()
+            if sonos_speaker.SonosSpeaker.tts_cache is None:
+                raise Exception('Local TTS mode is not enabled!')
+            self._response = utils.to_json(sonos_speaker.SonosSpeaker.tts_cache.stats())
+            self._status = True
+        except AttributeError as err:
+            self._response = JsonCommandBase.missing_param_error(err)
+        except Exception as err:
+            self._response = err
+        finally:
+            return self._status, self._response
+
+# ANNOUNCEMENTS ########################################################################################################
+
+class AnnouncementStatus(JsonCommandBase):
+    optional_parameters = ('job_id',)
+
+    def __init__(self, parameter):
+        super().__init__(parameter)
+
+    def run(self):
+        try:
+            self.log_command()
+            scheduler = sonos_speaker.SonosSpeaker.announcement_scheduler
+            if hasattr(self, 'job_id'):
+                status = scheduler.status(str(self.job_id))
+                if status is None:
+                    raise Exception('No announcement found with job id \'{id}\'!'.format(id=self.job_id))
+                self._response = utils.to_json(status)
+            else:
+                self._response = utils.to_json(scheduler.stats)
+            self._status = True
+        except AttributeError as err:
+            self._response = JsonCommandBase.missing_param_error(err)
+        except Exception as err:
+            self._response = err
+        finally:
+            return self._status, self._response
+
+
+class CancelAnnouncement(JsonCommandBase):
+    required_parameters = ('job_id',)
+
+    def __init__(self, parameter):
+        super().__init__(parameter)
+
+    def run(self):
+        try:
+            self.log_command()
+            job = sonos_speaker.SonosSpeaker.announcement_scheduler.cancel(str(self.job_id))
+            if job is None:
+                raise Exception('No announcement found with job id \'{id}\'!'.format(id=self.job_id))
+            self._response = utils.to_json(job.to_dict())
+            self._status = True
+        except AttributeError as err:
+            self._response = JsonCommandBase.missing_param_error(err)
+        except Exception as err:
+            self._response = err
+        finally:
+            return self._status, self._response
+
+# SUBSCRIPTION HEALTH ##################################################################################################
+
+class SubscriptionHealth(JsonCommandBase):
+    optional_parameters = ('uid',)
+
+    def __init__(self, parameter):
+        super().__init__(parameter)
+
+    def run(self):
+        try:
+            self.log_command()
+            if hasattr(self, 'uid'):
+                if self.uid not in sonos_speaker.sonos_speakers:
+                    raise Exception('No speaker found with uid \'{uid}\'!'.format(uid=self.uid))
+                speakers = [sonos_speaker.sonos_speakers[self.uid]]
+            else:
+                speakers = list(sonos_speaker.sonos_speakers.values())
+            self._response = utils.to_json({
+                'renewal_scheduler': renewal_scheduler.stats,
+                'speakers': {speaker.uid: speaker.subscription_health for speaker in speakers}
+            })
+            self._status = True
+        except AttributeError as err:
+            self._response = JsonCommandBase.missing_param_error(err)
+        except Exception as err:
+            self._response = err
+        finally:
+            return self._status, self._response
+
 # ZoneMembers ##########################################################################################################
 
 class ZoneMembers(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             sonos_speaker.sonos_speakers[self.uid].dirty_property('zone_members')
             sonos_speaker.sonos_speakers[self.uid].send()
             self._status = True
@@ -1896,14 +2175,14 @@ class ZoneMembers(JsonCommandBase):
 # IsCoordiantor ########################################################################################################
 
 class IsCoordinator(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             sonos_speaker.sonos_speakers[self.uid].dirty_property('is_coordinator')
             sonos_speaker.sonos_speakers[self.uid].send()
             self._status = True
@@ -1922,14 +2201,17 @@ class IsCoordinator(JsonCommandBase):
 # PLAYLIST #############################################################################################################
 
 class LoadSonosPlaylist(JsonCommandBase):
+    required_parameters = ('uid', 'sonos_playlist')
+    optional_parameters = ('clear_queue', 'play_after_insert')
+    parameter_types = {'uid': UID, 'sonos_playlist': StrParameter(), 'clear_queue': FlagParameter(),
+                       'play_after_insert': FlagParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             play_after_insert = 0
             if hasattr(self, 'play_after_insert'):
                 if self.play_after_insert in [1, True, '1', 'True', 'yes']:
@@ -1965,14 +2247,14 @@ class LoadSonosPlaylist(JsonCommandBase):
 # QUEUE ################################################################################################################
 
 class ClearQueue(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             sonos_speaker.sonos_speakers[self.uid].clear_queue()
             self._status = True
         except requests.ConnectionError:
@@ -1989,14 +2271,17 @@ class ClearQueue(JsonCommandBase):
 # PLAYLIST #############################################################################################################
 
 class LoadSonosPlaylist(JsonCommandBase):
+    required_parameters = ('uid', 'sonos_playlist')
+    optional_parameters = ('clear_queue', 'play_after_insert')
+    parameter_types = {'uid': UID, 'sonos_playlist': StrParameter(), 'clear_queue': FlagParameter(),
+                       'play_after_insert': FlagParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             play_after_insert = 0
             if hasattr(self, 'play_after_insert'):
                 if self.play_after_insert in [1, True, '1', 'True', 'yes']:
@@ -2031,14 +2316,14 @@ class LoadSonosPlaylist(JsonCommandBase):
 
 
 class GetSonosPlaylists(JsonCommandBase):
+    required_parameters = ('uid',)
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             sonos_speaker.sonos_speakers[self.uid].dirty_property('sonos_playlists')
             sonos_speaker.sonos_speakers[self.uid].send()
             self._status = True
@@ -2057,14 +2342,15 @@ class GetSonosPlaylists(JsonCommandBase):
 # MEDIA LIBRARY ########################################################################################################
 
 class RefreshMediaLibrary(JsonCommandBase):
+    optional_parameters = ('display_option',)
+    parameter_types = {'display_option': StrParameter()}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
 
             if hasattr(self, 'display_option'):
                 if self.display_option not in ['WMP', 'ITUNES', 'NONE']:
@@ -2087,14 +2373,16 @@ class RefreshMediaLibrary(JsonCommandBase):
 # Wifi State ###########################################################################################################
 
 class GetWifiState(JsonCommandBase):
+    required_parameters = ('uid',)
+    optional_parameters = ('force_refresh',)
+    parameter_types = {'uid': UID, 'force_refresh': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             force_refresh = 0
             if hasattr(self, 'force_refresh'):
                 if self.force_refresh in [0, 1, True, False, '0', '1']:
@@ -2119,14 +2407,16 @@ class GetWifiState(JsonCommandBase):
 
 
 class SetWifiState(JsonCommandBase):
+    required_parameters = ('uid', 'wifi_state')
+    optional_parameters = ('persistent',)
+    parameter_types = {'uid': UID, 'wifi_state': BINARY, 'persistent': BINARY}
+
     def __init__(self, parameter):
         super().__init__(parameter)
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             if hasattr(self, 'wifi_state'):
                 if self.wifi_state not in [0, 1, True, False, '0', '1']:
                     raise Exception("The parameter 'wifi_state' has to be 0|1 or True|False !")
@@ -2163,9 +2453,7 @@ class Discover(JsonCommandBase):
 
     def run(self):
         try:
-            logger.debug('COMMAND {classname} -- attributes: {attributes}'.format(classname=self.__class__.__name__,
-                                                                                  attributes=utils.dump_attributes(
-                                                                                      self)))
+            self.log_command()
             SonosServerService.discover()
             for uuid, speaker in sonos_speaker.sonos_speakers.items():
                 speaker.dirty_all()
@@ -2177,4 +2465,103 @@ class Discover(JsonCommandBase):
         except Exception as err:
             self._response = err
         finally:
-            return self._status, self._response
\ No newline at end of file
+            return self._status, self._response
+
+
+# Batch ################################################################################################################
+
+class BatchCommand():
+    """
+    Runs a list of commands in one request. The commands of different speakers are executed concurrently, the
+    commands of a single speaker (and all commands without a speaker uid) in the given order.
+
+    Accepted formats:
+
+        [{"command": ..., "parameter": {...}}, ...]
+        {"commands": [{"command": ..., "parameter": {...}}, ...], "deadline": 5}
+
+    If the optional deadline (in seconds) is exceeded, all commands which have not been finished are reported as
+    failed.
+    """
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, request):
+        self._deadline = None
+        if isinstance(request, dict):
+            self._commands = request['commands']
+            if request.get('deadline') is not None:
+                try:
+                    self._deadline = float(request['deadline'])
+                except (TypeError, ValueError):
+                    self._deadline = 0
+                if self._deadline <= 0:
+                    raise Exception('The parameter \'deadline\' has to be a positive number!')
+        else:
+            self._commands = request
+        if not isinstance(self._commands, list):
+            raise Exception('The parameter \'commands\' has to be a list!')
+
+    @staticmethod
+    def is_batch(request):
+        return isinstance(request, list) or (isinstance(request, dict) and 'commands' in request)
+
+    @staticmethod
+    def executor():
+        with BatchCommand._executor_lock:
+            if BatchCommand._executor is None:
+                BatchCommand._executor = ThreadPoolExecutor(max_workers=definitions.BATCH_WORKERS,
+                                                            thread_name_prefix='SonosBatch')
+        return BatchCommand._executor
+
+    @staticmethod
+    def _run_command(item):
+        try:
+            cmd_obj = MyDecoder.build(item)
+        except CommandError as err:
+            return json_response(False, str(err), err.code)
+        return json_response(*cmd_obj.run())
+
+    def _run_sequence(self, indexes, results, end):
+        for index in indexes:
+            if end is not None and time.monotonic() > end:
+                return
+            result = self._run_command(self._commands[index])
+            result.update(command=results[index]['command'], uid=results[index]['uid'])
+            results[index] = result
+
+    def run(self):
+        start = time.monotonic()
+        end = start + self._deadline if self._deadline else None
+        results = []
+        sequences = {}
+        for index, item in enumerate(self._commands):
+            command = item.get('command') if isinstance(item, dict) else None
+            parameter = item.get('parameter') if isinstance(item, dict) else None
+            uid = parameter.get('uid') if isinstance(parameter, dict) else None
+            results.append({'command': command, 'uid': uid, 'status': False, 'response': 'Deadline exceeded!',
+                            'error': {'code': CommandError.DEADLINE_EXCEEDED, 'message': 'Deadline exceeded!'}})
+            sequences.setdefault(uid, []).append(index)
+
+        futures = [BatchCommand.executor().submit(self._run_sequence, indexes, results, end)
+                   for indexes in sequences.values()]
+        wait(futures, timeout=self._deadline)
+        # copy the results, commands still running after the deadline must not change the response
+        results = [dict(result) for result in results]
+
+        status = all(result['status'] for result in results)
+        return status, {'status': status, 'results': results, 'elapsed': time.monotonic() - start}
+
+
+def _command_registry():
+    """
+    Maps the command names (e.g. 'set_volume') to the command classes, built once at import.
+    """
+    registry = {}
+    for name, value in globals().items():
+        if isinstance(value, type) and issubclass(value, JsonCommandBase) and value is not JsonCommandBase:
+            registry[camel_to_underscore(name)] = value
+    return registry
+
+
+COMMANDS = _command_registry()
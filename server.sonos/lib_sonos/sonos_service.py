@@ -1,28 +1,36 @@
 from __future__ import unicode_literals
 
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 import os
-import queue
 import socketserver
-import weakref
-from collections import namedtuple
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import threading
 from http.server import BaseHTTPRequestHandler, HTTPServer
 
-import sys
 from lib_sonos import definitions
+from lib_sonos import metrics
 from lib_sonos import sonos_speaker
 from lib_sonos.sonos_speaker import SonosSpeaker
+from lib_sonos.flush_scheduler import FlushScheduler
+from lib_sonos.announcement_scheduler import AnnouncementScheduler
 from lib_sonos.definitions import SCAN_TIMEOUT
 from lib_sonos.radio_parser import title_artist_parser
 import socket
+import struct
 import logging
-from time import sleep
-from soco import discover
+from urllib.parse import urlparse, unquote
+from email.utils import formatdate, parsedate_to_datetime
+from stat import S_ISREG
+from time import sleep, monotonic
+from soco import discover, SoCo
+from soco import config as soco_config
 from threading import Lock
 from soco.data_structures import DidlAudioBroadcast, DidlMusicTrack
 from soco.services import zone_group_state_shared_cache
+from soco import topology
 from lib_sonos import utils
 
 try:
@@ -50,22 +58,56 @@ event_lock = Lock()
 
 
 class WebserviceHttpHandler(BaseHTTPRequestHandler):
+    """
+    Serves the audio files of the webservice folder and the Sonos Broker commands. Connections are kept alive
+    (HTTP/1.1), files are sent with sendfile() and support byte ranges and conditional requests.
+    """
     webroot = None
+    protocol_version = 'HTTP/1.1'
+    # idle keep-alive connections are closed after this time
+    timeout = definitions.WEBSERVICE_KEEP_ALIVE
 
     def do_GET(self):
+        if urlparse(self.path).path == definitions.METRICS_PATH:
+            self.send_metrics()
+            return
+        self.send_file()
 
-        file_handler = None
+    def do_HEAD(self):
+        self.send_file(head=True)
 
+    def send_metrics(self):
+        """
+        Sends the broker metrics in the Prometheus text format.
+        """
+        try:
+            body = metrics.render().encode('utf-8')
+        except Exception as err:
+            logger.exception(err)
+            self.send_error(500)
+            return
+        self.send_response(definitions.HTTP_SUCCESS, 'OK')
+        self.send_header("Content-type", metrics.CONTENT_TYPE)
+        self.send_header("Content-Length", len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, head=False):
+        file_path = self.path
         try:
             if WebserviceHttpHandler.webroot is None:
                 self.send_error(404, 'Service Not Enabled')
                 return
 
             # prevent path traversal
-            file_path = os.path.normpath('/' + self.path).lstrip('/')
+            file_path = os.path.normpath('/' + unquote(urlparse(self.path).path)).lstrip('/')
             file_path = os.path.join(WebserviceHttpHandler.webroot, file_path)
 
-            if not os.path.exists(file_path):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                stat = None
+            if stat is None or not S_ISREG(stat.st_mode):
                 self.send_error(404, 'File Not Found: %s' % self.path)
                 return
 
@@ -76,54 +118,190 @@ class WebserviceHttpHandler(BaseHTTPRequestHandler):
                 self.send_error(406, 'File With Unsupported Media-Type : %s' % self.path)
                 return
 
-            client = "{ip}:{port}".format(ip=self.client_address[0], port=self.client_address[1])
-            logger.debug("Webservice: delivering file '{path}' to client ip {client}.".format(path=file_path,
-                                                                                              client=client))
-            file = open(file_path, 'rb').read()
-            self.send_response(200)
-            self.send_header('Content-Type', mime_type)
-            self.send_header('Content-Length', sys.getsizeof(file))
-            self.end_headers()
-            self.wfile.write(file)
+            size = stat.st_size
+            etag = '"{mtime:x}-{size:x}"'.format(mtime=stat.st_mtime_ns, size=size)
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+            if self.not_modified(etag, int(stat.st_mtime)):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return
+
+            byte_range = None
+            if_range = self.headers.get('If-Range')
+            if if_range is None or if_range in (etag, last_modified):
+                byte_range = self.parse_range(self.headers.get('Range'), size)
+
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{size}'.format(size=size))
+                self.send_header('Content-Length', 0)
+                self.end_headers()
+                return
+
+            with open(file_path, 'rb') as file:
+                if byte_range is None:
+                    offset, count = 0, size
+                    self.send_response(200)
+                else:
+                    offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+                    self.send_response(206)
+                    self.send_header('Content-Range', 'bytes {first}-{last}/{size}'.format(
+                        first=byte_range[0], last=byte_range[1], size=size))
+                self.send_header('Content-Type', mime_type)
+                self.send_header('Content-Length', count)
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+
+                if head or not count:
+                    return
+                client = "{ip}:{port}".format(ip=self.client_address[0], port=self.client_address[1])
+                logger.debug("Webservice: delivering file '{path}' [{offset}-{last}] to client ip {client}.".format(
+                    path=file_path, offset=offset, last=offset + count - 1, client=client))
+                # zero-copy, falls back to send() if os.sendfile is not available
+                self.connection.sendfile(file, offset, count)
+        except (BrokenPipeError, ConnectionResetError) as ex:
+            # speakers often abort a transfer after they got enough data
+            logger.debug("Webservice: client aborted delivery of file {file}: {err}".format(file=file_path, err=ex))
+            self.close_connection = True
         except Exception as ex:
             logger.error("Error delivering file {file}".format(file=file_path))
             logger.error(ex)
-        finally:
-            self.connection.close()
+            self.close_connection = True
+
+    def not_modified(self, etag, mtime):
+        """
+        Evaluates the conditional request headers. 'If-None-Match' takes precedence over 'If-Modified-Since'.
+        :param etag: current entity tag of the file
+        :param mtime: modification time of the file in seconds
+        :return: True, if the client's copy is up to date
+        """
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError):
+                pass
+        return False
+
+    @staticmethod
+    def parse_range(header, size):
+        """
+        Parses a 'Range' header with a single byte range. Multiple ranges are not supported, the whole file is served
+        in this case.
+        :param header: value of the 'Range' header or None
+        :param size: file size
+        :return: tuple (first byte, last byte), None to serve the whole file, False if the range is not satisfiable
+        """
+        if not header:
+            return None
+        unit, _, ranges = header.partition('=')
+        if unit.strip().lower() != 'bytes' or ',' in ranges:
+            return None
+        first, sep, last = ranges.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if not first:
+                # suffix range: the last n bytes
+                suffix = int(last)
+                if suffix <= 0:
+                    return False
+                return max(0, size - suffix), size - 1
+            first = int(first)
+            last = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if first >= size:
+            return False
+        if last < first:
+            return None
+        return first, min(last, size - 1)
 
     def do_POST(self):
         try:
             size = int(self.headers["Content-length"])
             command = self.rfile.read(size).decode('utf-8')
 
+            from lib_sonos.sonos_commands import MyDecoder, BatchCommand, CommandError
             try:
-                from lib_sonos.sonos_commands import MyDecoder
-                cmd_obj = json.loads(command, cls=MyDecoder)
-            except AttributeError as err:
-                err_command = list(filter(None, err.args[0].split("'")))[-1]
-                self.make_response(False, "No command '{command}' found!".format(command=err_command))
+                request = json.loads(command)
+                if BatchCommand.is_batch(request):
+                    start = monotonic()
+                    self.make_batch_response(request)
+                    metrics.command_duration.observe(monotonic() - start, BatchCommand.__name__)
+                    return
+                cmd_obj = MyDecoder.build(request)
+            except ValueError:
+                self.make_response(False, 'Invalid command format!', CommandError.INVALID_REQUEST)
+                return
+            except CommandError as err:
+                self.make_response(False, str(err), err.code)
                 return
+            start = monotonic()
             status, response = cmd_obj.run()
+            metrics.command_duration.observe(monotonic() - start, cmd_obj.__class__.__name__)
             self.make_response(status, response)
             logger.debug('Server response -- status: {status} -- response: {response}'.format(status=status,
                                                                                               response=response))
-        finally:
-            self.connection.close()
+        except Exception:
+            self.close_connection = True
+            raise
+
+    def accepts_json(self):
+        return 'application/json' in self.headers.get('Accept', '')
+
+    def make_batch_response(self, request):
+        try:
+            from lib_sonos.sonos_commands import BatchCommand
+            status, response = BatchCommand(request).run()
+            body = json.dumps(response).encode('utf-8')
+            self.send_response(definitions.HTTP_SUCCESS, 'OK')
+        except Exception as err:
+            body = json.dumps({'status': False, 'error': str(err)}).encode('utf-8')
+            self.send_response(definitions.HTTP_ERROR, 'Bad request')
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def make_response(self, status, response, code=None):
+        """
+        Sends the command response. Clients accepting 'application/json' get a json object with the status, the
+        response and (if the command failed) an error code, all other clients the html response.
+        """
+        if self.accepts_json():
+            from lib_sonos.sonos_commands import json_response
+            body = json.dumps(json_response(status, response, code)).encode('utf-8')
+            content_type = "application/json"
+        else:
+            body = "<html><head><title>Sonos Broker</title></head><body>{response}</body></html>".format(
+                response=response).encode('utf-8')
+            content_type = "text/html"
 
-    def make_response(self, status, response):
         if status:
             self.send_response(definitions.HTTP_SUCCESS, 'OK')
         else:
             self.send_response(definitions.HTTP_ERROR, 'Bad request')
-        self.send_header("Content-type", "text/html")
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", len(body))
         self.end_headers()
-        self.wfile.write("<html><head><title>Sonos Broker</title></head>".encode('utf-8'))
-        self.wfile.write("<body>{response}".format(response=response).encode('utf-8'))
-        self.wfile.write("</body></html>".encode('utf-8'))
+        self.wfile.write(body)
 
 
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
     allow_reuse_address = True
+    # keep-alive connections must not block the shutdown
+    daemon_threads = True
 
     def shutdown(self):
         self.socket.close()
@@ -163,6 +341,7 @@ class GetSonosSpeakerThread:
                 logger.debug('active threads: {}'.format(len(threading.enumerate())))
                 logger.info('scan devices ...')
                 zone_group_state_shared_cache.clear()
+                topology.clear()
                 SonosServerService.discover()
                 logger.debug('Start wait')
                 self.stop.wait(SCAN_TIMEOUT)
@@ -177,73 +356,214 @@ class GetSonosSpeakerThread:
         logger.debug("GetSonosSpeakerThread terminated")
 
 
-class SonosEventThread:
+class SsdpListener:
+    """
+    Listens passively for SSDP notifications of Sonos ZonePlayers. A speaker announcing itself with 'ssdp:alive' is
+    added immediately, a speaker leaving the network with 'ssdp:byebye' is removed. Only the affected speaker is
+    touched, the periodic scan of the GetSonosSpeakerThread remains as a safety net.
+    """
+
+    ZONE_PLAYER = 'urn:schemas-upnp-org:device:ZonePlayer:1'
+
     def __init__(self):
-        self._running_flag = False
         self.stop = threading.Event()
-        self.thread = threading.Thread(target=self.process_events)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self._sock.bind(('', definitions.MCAST_PORT))
+        mreq = struct.pack('4sl', socket.inet_aton(definitions.MCAST_GRP), socket.INADDR_ANY)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        self._sock.settimeout(1)
+        # speakers are added / removed one after another, independent from the periodic scan
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='SsdpListener')
+        # uids with a queued or running add, speakers repeat their 'ssdp:alive' notifications
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.listen, name='SsdpListener')
         self.thread.daemon = True
         self.thread.start()
 
-    def process_events(self):
-        speakers = []
-        while not self.stop.wait(1):
+    @staticmethod
+    def parse(data):
+        """
+        Parses a SSDP NOTIFY message.
+        :param data: raw udp data
+        :return: dict with upper case header names, None if the message is not a NOTIFY
+        """
+        lines = data.decode('utf-8', 'ignore').splitlines()
+        if not lines or not lines[0].upper().startswith('NOTIFY'):
+            return None
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().upper()] = value.strip()
+        return headers
+
+    def listen(self):
+        while not self.stop.is_set():
             try:
-                event = SonosSpeaker.event_queue.get()
-                if event is None:
-                    return
-
-                uid = event.sid.lower().rsplit('_sub', 1)
-
-                if not uid:
-                    print("No a valid event subscription id: {}".format(event.sid.lower()))
-                    return
-
-                uid = uid[0]
-                uid = uid.rsplit('uuid:', 1)
-
-                if not uid:
-                    print("No a valid event subscription id: {}".format(event.sid.lower()))
-                    return
-
-                uid = uid[1]
+                data, address = self._sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError as err:
+                if not self.stop.is_set():
+                    logger.warning("SsdpListener: {err}".format(err=err))
+                continue
 
-                if uid not in sonos_speaker.sonos_speakers:
-                    print("No sonos speaker found for subscription {}".format(event.sid.lower()))
+            try:
+                headers = SsdpListener.parse(data)
+                if not headers or headers.get('NT') != SsdpListener.ZONE_PLAYER:
                     continue
+                usn = headers.get('USN', '')
+                if not usn.startswith('uuid:'):
+                    continue
+                uid = usn[5:].split('::')[0].lower()
+                nts = headers.get('NTS', '').lower()
 
-                try:
-                    speaker = weakref.proxy(sonos_speaker.sonos_speakers[uid])
-                    if speaker not in speakers:
-                        speakers.append(speaker)
-                except KeyError:
-                    pass  # speaker maybe removed from another thread
-
-                if event.service.service_type == 'ZoneGroupTopology':
-                    speaker.set_zone_coordinator()
-                    speaker.set_group_members()
-                    speaker.dirty_music_metadata()
-
-                if event.service.service_type == 'AVTransport':
-                    self.handle_AVTransport_event(speaker, event.variables)
-
-                if event.service.service_type == 'RenderingControl':
-                    self.handle_RenderingControl_event(speaker, event.variables)
+                if nts == 'ssdp:alive':
+                    if uid not in sonos_speaker.sonos_speakers:
+                        with self._pending_lock:
+                            if uid in self._pending:
+                                continue
+                            self._pending.add(uid)
+                        ip = urlparse(headers.get('LOCATION', '')).hostname or address[0]
+                        logger.info("ssdp:alive from new speaker {uid} [{ip}]".format(uid=uid, ip=ip))
+                        self._executor.submit(self._add_speaker, uid, ip)
+                elif nts == 'ssdp:byebye':
+                    if uid in sonos_speaker.sonos_speakers:
+                        logger.info("ssdp:byebye from speaker {uid}".format(uid=uid))
+                        self._executor.submit(SonosServerService.remove_speaker, uid)
+            except Exception as err:
+                logger.warning("Could not handle SSDP message: {err}".format(err=err))
+
+    def _add_speaker(self, uid, ip):
+        try:
+            SonosServerService.add_speaker(ip, uid)
+        finally:
+            with self._pending_lock:
+                self._pending.discard(uid)
 
-                if event.service.service_type == 'AlarmClock':
-                    self.handle_AlarmClock_event(speaker, event.variables)
+    def terminate(self):
+        self.stop.set()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        self._executor.shutdown(wait=False)
+        logger.debug("SsdpListener terminated")
+
+
+class SonosEventEngine:
+    """
+    Asyncio based event engine. Sonos events are ingested from the SoCo event listener threads and dispatched per
+    service type. Every speaker has its own event queue which is processed in order, while different speakers are
+    processed concurrently on a bounded thread pool (the handlers do blocking SoCo calls). The resulting property
+    changes are flushed per speaker by the FlushScheduler.
+    """
+
+    def __init__(self, workers=definitions.DEFAULT_EVENT_WORKERS):
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='SonosEvent')
+        self._queues = {}
+        self._running = True
+        self._handlers = {
+            'AVTransport': self.handle_AVTransport_event,
+            'RenderingControl': self.handle_RenderingControl_event,
+            'ZoneGroupTopology': self.handle_ZoneGroupTopology_event,
+            'AlarmClock': self.handle_AlarmClock_event,
+            'ContentDirectory': self.handle_ContentDirectory_event,
+        }
+        self.thread = threading.Thread(target=self._run, name='SonosEventEngine')
+        self.thread.daemon = True
+        self.thread.start()
 
-                SonosSpeaker.event_queue.task_done()
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
 
-            except queue.Empty:
-                pass
-            finally:
-                if not SonosSpeaker.event_queue.unfinished_tasks:
-                    for speaker in speakers:
-                        speaker.send()
-                    del speakers[:]
+    def put(self, event):
+        """
+        Entry point for the SoCo event listener. This method is thread-safe and mimics queue.Queue.put(), so the
+        engine can be passed to the SoCo subscriptions as their event queue.
+        :param event: SoCo event
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._ingest, event)
+        except RuntimeError:
+            pass  # engine already stopped
 
-        self._running_flag = False
+    def _ingest(self, event):
+        try:
+            uid = event.service.soco.uid.lower()
+        except Exception:
+            logger.warning("No valid speaker found for event subscription {sid}".format(sid=event.sid))
+            return
+
+        queue = self._queues.get(uid)
+        if queue is None:
+            queue = deque()
+            self._queues[uid] = queue
+            self._loop.create_task(self._process_speaker_events(uid, queue))
+        queue.append((event, monotonic()))
+
+    async def _process_speaker_events(self, uid, queue):
+        """
+        Processes all events of a single speaker in order. The worker ends if the speaker queue is drained.
+        """
+        while queue:
+            event, queued = queue.popleft()
+            metrics.event_queue_delay.observe(monotonic() - queued)
+            try:
+                await self._loop.run_in_executor(self._executor, self.dispatch, uid, event)
+            except Exception as err:
+                if not self._running:
+                    break  # engine terminated
+                logger.exception(err)
+        del self._queues[uid]
+
+    def dispatch(self, uid, event):
+        speaker = sonos_speaker.sonos_speakers.get(uid)
+        if speaker is None:
+            logger.debug("No sonos speaker found for subscription {sid}".format(sid=event.sid))
+            return
+        service_type = event.service.service_type
+        metrics.events.inc(service_type)
+        handler = self._handlers.get(service_type)
+        if handler is not None:
+            handler(speaker, event.variables)
+            speaker.event_received(event.timestamp)
+
+    @property
+    def queue_depth(self):
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    @property
+    def oldest_event_age(self):
+        """
+        :return: seconds the oldest queued event is waiting for its dispatch, 0 if no event is queued
+        """
+        oldest = None
+        for queue in list(self._queues.values()):
+            try:
+                queued = queue[0][1]
+            except IndexError:
+                continue
+            if oldest is None or queued < oldest:
+                oldest = queued
+        return monotonic() - oldest if oldest is not None else 0
+
+    def handle_ZoneGroupTopology_event(self, speaker, variables):
+        # the event carries the complete zone group state, no need to request it again
+        if variables.get('zone_group_state'):
+            topology.update(variables['zone_group_state'])
+        speaker.set_zone_coordinator()
+        speaker.set_group_members()
+        speaker.dirty_music_metadata()
 
     def handle_AVTransport_event(self, speaker, variables):
 
@@ -299,10 +619,17 @@ class SonosEventThread:
 
     def handle_AlarmClock_event(self, speaker, variables):
         """
-        There seems no additional info in variables. The event only gives us the event subscription id.
-        So we call the get_alarms routine.
+        The 'AlarmListVersion' changes if an alarm of the household was created, changed or deleted. The alarm list
+        is only downloaded once per version for all speakers of the household.
         """
-        speaker.get_alarms()
+        speaker.get_alarms(variables.get('alarm_list_version'))
+
+    def handle_ContentDirectory_event(self, speaker, variables):
+        """
+        The 'SavedQueuesUpdateID' changes if a Sonos playlist was created, changed or deleted.
+        """
+        if 'saved_queues_update_id' in variables:
+            speaker.sonos_playlists_changed(variables['saved_queues_update_id'])
 
     def handle_RenderingControl_event(self, speaker, variables):
 
@@ -341,8 +668,13 @@ class SonosEventThread:
             speaker.loudness = int(variables['loudness']['Master'])
 
     def terminate(self):
-        self.stop.set()
-        logger.debug("SonosEventThread terminated")
+        self._running = False
+        try:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        except RuntimeError:
+            pass  # loop already closed
+        self._executor.shutdown(wait=False)
+        logger.debug("SonosEventEngine terminated")
 
 
 # noinspection PyProtectedMember
@@ -350,18 +682,43 @@ class SonosServerService(object):
 
     _sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
     _sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
-
-    def __init__(self, host, port, server_url, webservice_path, quota, tts_local_mode):
+    _discover_executor = None
+    _discover_executor_lock = Lock()
+    discover_workers = definitions.DEFAULT_DISCOVER_WORKERS
+    discover_timeout = definitions.DEFAULT_DISCOVER_TIMEOUT
+    discover_interface = definitions.DEFAULT_DISCOVER_INTERFACE
+
+    def __init__(self, host, port, server_url, webservice_path, quota, tts_local_mode,
+                 event_workers=definitions.DEFAULT_EVENT_WORKERS,
+                 flush_max_delay=definitions.DEFAULT_FLUSH_MAX_DELAY,
+                 flush_batch_window=definitions.DEFAULT_FLUSH_BATCH_WINDOW,
+                 discover_workers=definitions.DEFAULT_DISCOVER_WORKERS,
+                 discover_timeout=definitions.DEFAULT_DISCOVER_TIMEOUT,
+                 ssdp_listener=definitions.DEFAULT_SSDP_LISTENER,
+                 discover_interface=definitions.DEFAULT_DISCOVER_INTERFACE):
         self.lock = Lock()
         self.host = host
         self.port = port
 
         self.webservice = SimpleHttpServer(self.host, self.port, webservice_path)
-        SonosSpeaker.event_queue = queue.Queue()
+        self.sonos_event_engine = SonosEventEngine(event_workers)
+        SonosSpeaker.event_queue = self.sonos_event_engine
+        SonosSpeaker.flush_scheduler = FlushScheduler(flush_max_delay, flush_batch_window)
+        SonosSpeaker.announcement_scheduler = AnnouncementScheduler()
         SonosSpeaker.set_tts(webservice_path, server_url, quota, tts_local_mode)
+        soco_config.SOAP_REQUEST_CALLBACK = metrics.observe_soap_request
+        SonosServerService.discover_workers = discover_workers
+        SonosServerService.discover_timeout = discover_timeout
+        SonosServerService.discover_interface = discover_interface
 
-        self.sonos_events_thread = SonosEventThread()
         self.sonos_speakers_thread = GetSonosSpeakerThread()
+        self.ssdp_listener = None
+        if ssdp_listener:
+            try:
+                self.ssdp_listener = SsdpListener()
+            except OSError as err:
+                logger.warning("Could not start SSDP listener on port {port}: {err}".format(
+                    port=definitions.MCAST_PORT, err=err))
 
         'HTTP Server Running...........'
         self.webservice.start()
@@ -370,7 +727,13 @@ class SonosServerService(object):
     def terminate_threads(self):
         self.webservice.stop()
         self.sonos_speakers_thread.terminate()
-        self.sonos_events_thread.terminate()
+        if self.ssdp_listener is not None:
+            self.ssdp_listener.terminate()
+        self.sonos_event_engine.terminate()
+        SonosSpeaker.flush_scheduler.terminate()
+        SonosSpeaker.announcement_scheduler.terminate()
+        if SonosServerService._discover_executor is not None:
+            SonosServerService._discover_executor.shutdown(wait=False)
 
     def unsubscribe_speaker_events(self):
         for speaker in sonos_speaker.sonos_speakers.values():
@@ -378,84 +741,236 @@ class SonosServerService(object):
 
     @staticmethod
     def _discover():
-        return discover(timeout=10, include_invisible=False)
+        return discover(timeout=10, include_invisible=False, interface_addr=SonosServerService.discover_interface)
+
+    @staticmethod
+    def _probe(soco_speaker, speakers, timeout, started=None):
+        """
+        Checks whether a discovered speaker is reachable and returns an initialised SonosSpeaker. Existing speakers
+        are re-used.
+        :param soco_speaker: SoCo instance found by the discover function
+        :param speakers: the current speaker registry
+        :param timeout: http timeout for the speaker info request
+        :param started: optional dict, the start time of the probe is stored by SoCo instance
+        :return: tuple (uid, SonosSpeaker)
+        """
+        if started is not None:
+            started[soco_speaker] = monotonic()
+        uid = soco_speaker.uid.lower()
+        speaker = speakers.get(uid)
+        if speaker is not None:
+            speaker.soco.get_speaker_info(refresh=True, timeout=timeout)
+            return uid, speaker
+        # !! sometimes an offline speaker is cached and will be found by the discover function
+        soco_speaker.get_speaker_info(refresh=True, timeout=timeout)
+        return uid, SonosSpeaker(soco_speaker)
 
     @classmethod
-    def discover(cls):
+    def _wait_probes(cls, futures, started, timeout):
+        """
+        Waits for the speaker probes. Every probe has 'timeout' seconds from its own start, probes queued behind
+        others on the worker pool are not charged for the waiting time.
+        :param futures: dict future -> SoCo instance
+        :param started: dict SoCo instance -> start time of its probe (filled by _probe)
+        :param timeout: seconds per probe
+        :return: tuple (done, late) of futures
+        """
+        pending = set(futures)
+        late = set()
+        # a probe which never starts (all workers blocked) must not stall the scan forever
+        rounds = -(-len(futures) // max(1, cls.discover_workers))
+        last_deadline = monotonic() + (rounds + 1) * timeout
+        while pending:
+            now = monotonic()
+            for future in list(pending):
+                start = started.get(futures[future])
+                if (start is not None and now >= start + timeout) or now >= last_deadline:
+                    pending.discard(future)
+                    late.add(future)
+            if not pending:
+                break
+            deadlines = [started[futures[future]] + timeout for future in pending if futures[future] in started]
+            deadline = min(deadlines + [last_deadline])
+            # probes may start in the meantime, look again at least once a second
+            _, pending = wait(pending, timeout=max(0, min(deadline - now, 1)), return_when=FIRST_COMPLETED)
+        return set(futures) - late, late
+
+    @staticmethod
+    def _discard_late_speaker(future):
+        """
+        Done callback for probes which exceeded the discover timeout. Newly created speakers are not part of the
+        registry and have to be terminated.
+        """
+        try:
+            uid, speaker = future.result()
+        except Exception:
+            return
+        if sonos_speaker.sonos_speakers.get(uid) is not speaker:
+            logger.debug("discarding late speaker {uid}".format(uid=uid))
+            SonosServerService._discard_speaker(uid, speaker)
+
+    @staticmethod
+    def _discard_speaker(uid, speaker):
+        """
+        Terminates a speaker which is not part of the registry. SoCo instances are shared per ip address, the http
+        session is kept open if a registered speaker uses the same SoCo instance.
+        """
+        registered = sonos_speaker.sonos_speakers.get(uid)
         try:
+            speaker.terminate(close_session=registered is None or registered.soco is not speaker.soco)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _subscribe_speaker(speaker):
+        speaker.set_zone_coordinator()
+        speaker.set_group_members()
+        speaker.event_subscription()
+
+    @classmethod
+    def submit(cls, fn, *args):
+        """
+        Runs a discovery task on the discover worker pool.
+        """
+        with cls._discover_executor_lock:
+            if cls._discover_executor is None:
+                cls._discover_executor = ThreadPoolExecutor(max_workers=cls.discover_workers,
+                                                            thread_name_prefix='SonosDiscover')
+        return cls._discover_executor.submit(fn, *args)
+
+    @classmethod
+    def add_speaker(cls, ip, uid=None):
+        """
+        Adds a single speaker to the registry, e.g. after a SSDP alive notification. Invisible zone players (e.g.
+        the slave of a stereo pair, a SUB or a Bridge) are skipped like in the periodic scan.
+        :param ip: ip address of the speaker
+        :param uid: optional uid of the speaker (from the SSDP USN header), a registered speaker is not probed again
+        """
+        try:
+            if uid is not None and uid in sonos_speaker.sonos_speakers:
+                return
+            soco_speaker = SoCo(ip)
+            if not soco_speaker.is_visible:
+                logger.debug("ignoring invisible zone player [{ip}]".format(ip=ip))
+                return
+            # the speaker is initialised without the registry lock, a slow speaker must not block the periodic
+            # scan or other adds / removes
+            uid, speaker = cls._probe(soco_speaker, sonos_speaker.sonos_speakers, cls.discover_timeout)
             with sonos_speaker._sonos_lock:
+                registered = sonos_speaker.sonos_speakers.get(uid)
+                if registered is None:
+                    speakers = dict(sonos_speaker.sonos_speakers)
+                    speakers[uid] = speaker
+                    sonos_speaker.sonos_speakers = speakers
+            if registered is not None:
+                if registered is not speaker:
+                    # added by a concurrent scan
+                    cls._discard_speaker(uid, speaker)
+                return
+            try:
+                cls._subscribe_speaker(speaker)
+            except KeyError:
+                pass  # group member not (yet) available
+            logger.info("speaker {uid} [{ip}] added".format(uid=uid, ip=ip))
+        except Exception as err:
+            logger.warning("Could not add speaker {ip}: {err}".format(ip=ip, err=err))
+
+    @classmethod
+    def remove_speaker(cls, uid):
+        """
+        Removes a single speaker from the registry, e.g. after a SSDP byebye notification.
+        :param uid: uid of the speaker
+        """
+        with sonos_speaker._sonos_lock:
+            speakers = dict(sonos_speaker.sonos_speakers)
+            speaker = speakers.pop(uid, None)
+            if speaker is None:
+                return
+            sonos_speaker.sonos_speakers = speakers
+        logger.info("offline speaker: {uid} -- removing from list".format(uid=uid))
+        try:
+            speaker.status = False
+            speaker.send()
+            speaker.terminate()
+        except Exception as err:
+            logger.debug(err)
 
-                active_uids = []
+    @classmethod
+    def discover(cls):
+        """
+        Discovers all Sonos speakers in the network. The speakers are probed and initialised concurrently on a bounded
+        worker pool, every speaker has to answer within 'discover_timeout' seconds. The speaker registry is replaced
+        at once, so that commands never see a half updated registry.
+        """
+        start = monotonic()
+        try:
+            with sonos_speaker._sonos_lock:
                 soco_speakers = SonosServerService._discover()
 
                 if soco_speakers is None:
                     return
 
-                speaker_to_remove = []
+                current_speakers = sonos_speaker.sonos_speakers
+                timeout = cls.discover_timeout
+                started = {}
+                futures = {cls.submit(cls._probe, soco_speaker, current_speakers, timeout, started): soco_speaker
+                           for soco_speaker in soco_speakers}
+                done, late = cls._wait_probes(futures, started, timeout)
 
-                for soco_speaker in soco_speakers:
-                    uid = soco_speaker.uid.lower()
-
-                    # new speaker found, update it
-                    if uid not in sonos_speaker.sonos_speakers:
-                        try:
-                            soco_speaker.get_speaker_info(refresh=True)
-                            active_uids.append(uid)
-                        except Exception:
-                            # !! sometimes an offline speaker is cached and will be found by the discover function
-                            speaker_to_remove.append(uid)
-                            continue
-                        try:
-                            _sp = SonosSpeaker(soco_speaker)
-                            sonos_speaker.sonos_speakers[uid] = _sp
-                        except Exception as ex:
-                            speaker_to_remove.append(uid)
-                            continue  # speaker maybe deleted by another thread
-                    else:
-                        try:
-                            sonos_speaker.sonos_speakers[uid].soco.get_speaker_info(refresh=True)
-                            active_uids.append(uid)
-                        except Exception:
-                            speaker_to_remove.append(uid)
-                            continue  # speaker maybe deleted by another thread
-                try:
-                    offline_uids = set(list(sonos_speaker.sonos_speakers.keys())) - set(active_uids)
-                    offline_uids = set(list(offline_uids) + speaker_to_remove)
-                except KeyError as err:
-                    print(err)
-                    pass  # speaker maybe deleted by another thread
-
-                for uid in offline_uids:
+                speakers = {}
+                for future in done:
+                    try:
+                        uid, speaker = future.result()
+                        speakers[uid] = speaker
+                    except Exception as err:
+                        logger.debug("speaker probe failed: {err}".format(err=err))
+                registered = {speaker.soco.ip_address: uid for uid, speaker in current_speakers.items()}
+                for future in late:
+                    ip = futures[future].ip_address
+                    logger.warning("speaker probe {ip} exceeded {timeout} seconds".format(ip=ip, timeout=timeout))
+                    uid = registered.get(ip)
+                    if uid is not None:
+                        # a registered speaker is kept, its re-probe is just late
+                        speakers[uid] = current_speakers[uid]
+                    future.add_done_callback(cls._discard_late_speaker)
+
+                # the new registry is swapped in at once
+                sonos_speaker.sonos_speakers = speakers
+
+                for uid in set(current_speakers.keys()) - set(speakers.keys()):
                     logger.info("offline speaker: {uid} -- removing from list (maybe cached)".format(uid=uid))
+                    speaker = current_speakers[uid]
                     try:
-                        sonos_speaker.sonos_speakers[uid].status = False
-                        sonos_speaker.sonos_speakers[uid].send()
-                        sonos_speaker.sonos_speakers[uid].terminate()
-                    except KeyError:
-                        continue  # speaker maybe deleted by another thread
-                    finally:
-                        try:
-                            del sonos_speaker.sonos_speakers[uid]
-                        except:
-                            pass
+                        speaker.status = False
+                        speaker.send()
+                        speaker.terminate()
+                    except Exception as err:
+                        logger.debug(err)
 
                 # register events for all speaker, this has to be the last step due to some logics in the event
                 # handling routine
 
-                for speaker in sonos_speaker.sonos_speakers.values():
+                futures = {cls.submit(cls._subscribe_speaker, speaker): uid
+                           for uid, speaker in speakers.items()}
+                done, not_done = wait(futures, timeout=timeout)
+                for future in done:
                     try:
-                        speaker.set_zone_coordinator()
-                        speaker.set_group_members()
-                        speaker.event_subscription()
+                        future.result()
                     except KeyError:
-                        pass  # speaker maybe deleted by another thread
+                        pass  # group member not (yet) available
+                    except Exception as err:
+                        logger.warning("could not subscribe speaker {uid}: {err}".format(uid=futures[future],
+                                                                                          err=err))
+                for future in not_done:
+                    logger.warning("event subscription of speaker {uid} exceeded {timeout} seconds".format(
+                        uid=futures[future], timeout=timeout))
 
         except ReferenceError:
             pass
         except Exception as err:
             logger.exception('Error in method discover()!\nError: {err}'.format(err=err))
         finally:
-            pass
+            metrics.discovery_duration.observe(monotonic() - start)
 
     @staticmethod
     def set_music_data(speaker, variables):
@@ -4,16 +4,18 @@ from soco.compat import quote_url
 import queue
 from soco.data_structures import DidlItem, to_didl_string
 import logging
-import requests
 from lib_sonos.utils import NotifyList
-from soco.alarms import get_alarms
 import threading
 import time
-import json
+from concurrent.futures import ThreadPoolExecutor
 from lib_sonos import udp_broker
+from lib_sonos import metrics
 from soco.snapshot import Snapshot
+from soco.events import renewal_scheduler
+from soco.exceptions import SoCoUPnPException
 from soco.music_services import MusicService
 from lib_sonos import definitions
+from lib_sonos.tts_cache import TtsCache
 
 try:
     import xml.etree.cElementTree as XML
@@ -26,11 +28,120 @@ sonos_speakers = {}
 _sonos_lock = threading.Lock()
 event_queue = queue.Queue()
 
+
+class SonosPlaylistCache(object):
+    """
+    Household-wide cache of the Sonos playlist titles. The playlists are browsed once per household and shared by all
+    speakers. The cache is invalidated only if the 'SavedQueuesUpdateID' of the ContentDirectory service changes.
+    """
+
+    _playlists = {}
+    _update_ids = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, speaker):
+        """
+        Returns all Sonos playlist titles of the speaker's household as string, delimited by ','
+        :param speaker: SonosSpeaker instance used to browse the playlists on a cache miss
+        """
+        household_id = speaker.household_id
+        with cls._lock:
+            playlists = cls._playlists.get(household_id)
+            if playlists is None:
+                playlists = ','.join(str(playlist.title) for playlist in speaker.soco.get_sonos_playlists())
+                cls._playlists[household_id] = playlists
+            return playlists
+
+    @classmethod
+    def update(cls, household_id, update_id):
+        """
+        Invalidates the cache if the ContentDirectory update id of the household has changed.
+        :param household_id: household id
+        :param update_id: the current 'SavedQueuesUpdateID'
+        :return: True, if the cached playlists were invalidated
+        """
+        with cls._lock:
+            last_update_id = cls._update_ids.get(household_id)
+            cls._update_ids[household_id] = update_id
+            if last_update_id is None or last_update_id == update_id:
+                return False
+            cls._playlists.pop(household_id, None)
+            return True
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._playlists.clear()
+            cls._update_ids.clear()
+
+class SonosAlarmCache(object):
+    """
+    Household-wide index of all alarms, grouped by speaker uid. The alarm list is downloaded and parsed once per
+    'AlarmListVersion' of a household; every speaker takes its slice from the index.
+    """
+
+    _alarms = {}
+    _versions = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, speaker, version=None):
+        """
+        Returns the alarms of the speaker as dict {alarm id: alarm}.
+        :param speaker: SonosSpeaker instance used to list the alarms if the index is outdated
+        :param version: the current 'AlarmListVersion', None to use the cached index if available
+        """
+        household_id = speaker.household_id
+        with cls._lock:
+            alarms = cls._alarms.get(household_id)
+            if alarms is None or (version is not None and version != cls._versions.get(household_id)):
+                response = speaker.soco.alarmClock.ListAlarms()
+                alarms = cls.parse(response['CurrentAlarmList'])
+                cls._alarms[household_id] = alarms
+                cls._versions[household_id] = response.get('CurrentAlarmListVersion', version)
+                logger.debug('alarm index updated for household {household}: version {version}'.format(
+                    household=household_id, version=cls._versions[household_id]))
+            return alarms.get(speaker.uid.lower(), {})
+
+    @staticmethod
+    def parse(alarm_list):
+        """
+        Parses the 'CurrentAlarmList' of the AlarmClock service.
+        :return: dict {speaker uid: {alarm id: alarm}}
+        """
+        alarms = {}
+        for alarm in XML.fromstring(alarm_list.encode('utf-8')).findall('Alarm'):
+            values = alarm.attrib
+            alarms.setdefault(values['RoomUUID'].lower(), {})[values['ID']] = {
+                'Enabled': values['Enabled'] == '1',
+                'Duration': values['Duration'] or 'None',
+                'PlayMode': values['PlayMode'],
+                'Volume': int(values['Volume']),
+                'Recurrence': values['Recurrence'],
+                'StartTime': values['StartTime'],
+                'IncludedLinkZones': values['IncludeLinkedZones'] == '1'
+            }
+        return alarms
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._alarms.clear()
+            cls._versions.clear()
+
+
 class SonosSpeaker(object):
     tts_local_mode = False
     local_folder = ''
     local_url = ''
     quota = 0
+    tts_cache = None
+    event_queue = None
+    flush_scheduler = None
+    announcement_scheduler = None
+    _group_executor = None
+    _group_executor_lock = threading.Lock()
 
     @classmethod
     def set_tts(self, local_folder, local_url, quota, tts_local_mode):
@@ -38,21 +149,26 @@ class SonosSpeaker(object):
         SonosSpeaker.local_url = local_url
         SonosSpeaker.quota = quota
         SonosSpeaker.tts_local_mode = tts_local_mode
+        if tts_local_mode:
+            SonosSpeaker.tts_cache = TtsCache(local_folder, quota)
 
     def __init__(self, soco):
         info = soco.get_speaker_info(timeout=5)
-        self._snippet_queue_lock = threading.Lock()
         self.stop_tts = threading.Event()
         self._fade_in = False
         self._balance = 0
         self._saved_music_item = None
         self._zone_members = NotifyList()
         self._zone_members.register_callback(utils.WeakMethod(self, 'zone_member_changed'))
-        self._dirty_properties = []
+        self._dirty_properties = set()
+        self._dirty_lock = threading.Lock()
+        self._dirty_since = None
+        self._event_time = None
         self._soco = soco
         self._uid = self.soco.uid.lower()
         self._alarms = ''
         self._mute = 0
+        self._group_rendering_control = True
         self._track_uri = ''
         self._track_album = ''
         self._transport_actions = ''
@@ -78,6 +194,7 @@ class SonosSpeaker(object):
         self._sub_rendering_control = None
         self._sub_zone_group = None
         self._sub_alarm = None
+        self._sub_content_directory = None
         self._sub_system_prop = None
         self._sub_device_prop = None
         self._properties_hash = None
@@ -101,7 +218,6 @@ class SonosSpeaker(object):
         self._hardware_version = info['hardware_version']
         self._mac_address = info['mac_address']
         self._wifi_state = self.get_wifi_state(force_refresh=True)
-        self._sonos_playlists = self.soco.get_sonos_playlists()
 
         self.dirty_all()
 
@@ -184,6 +300,10 @@ class SonosSpeaker(object):
     def sub_alarm(self):
         return self._sub_alarm
 
+    @property
+    def sub_content_directory(self):
+        return self._sub_content_directory
+
     # SERIAL ###########################################################################################################
 
     @property
@@ -222,8 +342,8 @@ class SonosSpeaker(object):
     def set_led(self, value, trigger_action=False, group_command=False):
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_led(value, trigger_action=True, group_command=False)
+                self.run_group_command(lambda speaker: speaker.set_led(value, trigger_action=True))
+                return
             self.soco.status_light = value
         if value == self._led:
             return
@@ -239,8 +359,8 @@ class SonosSpeaker(object):
         bass = int(value)
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_bass(bass, trigger_action=True, group_command=False)
+                self.run_group_command(lambda speaker: speaker.set_bass(bass, trigger_action=True))
+                return
             self.soco.bass = bass
         if self._bass == bass:
             return
@@ -256,8 +376,8 @@ class SonosSpeaker(object):
         treble = int(value)
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_treble(treble, trigger_action=True, group_command=False)
+                self.run_group_command(lambda speaker: speaker.set_treble(treble, trigger_action=True))
+                return
             self.soco.treble = treble
         if self._treble == treble:
             return
@@ -273,8 +393,8 @@ class SonosSpeaker(object):
         loudness = int(value)
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_loudness(loudness, trigger_action=True, group_command=False)
+                self.run_group_command(lambda speaker: speaker.set_loudness(loudness, trigger_action=True))
+                return
             self.soco.loudness = loudness
         if self._loudness == loudness:
             return
@@ -366,10 +486,9 @@ class SonosSpeaker(object):
             return
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_volume(balance, trigger_action=True, group_command=False)
-            if utils.check_balance_range(balance):
-                self.soco.balance = balance
+                self.run_group_command(lambda speaker: speaker.set_balance(balance, trigger_action=True))
+                return
+            self.soco.balance = balance
         if self._balance == balance:
             return
         self._balance = balance
@@ -386,8 +505,8 @@ class SonosSpeaker(object):
             return
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_volume(volume, trigger_action=True, group_command=False)
+                self.run_group_command(lambda speaker: speaker.set_volume(volume, trigger_action=True))
+                return
             if utils.check_volume_range(volume):
                 if utils.check_max_volume_exceeded(volume, self.max_volume):
                     volume = self.max_volume
@@ -404,10 +523,10 @@ class SonosSpeaker(object):
         volume + 2 is the default sonos speaker behaviour, if the volume-up button was pressed
         :param group_command: if True, the volume for all group members is increased by 2
         """
-        self._volume_up()
         if group_command:
-            for speaker in self.zone_members:
-                speaker._volume_up()
+            self.run_group_command(lambda speaker: speaker._volume_up())
+        else:
+            self._volume_up()
 
     def _volume_up(self):
         vol = self.volume
@@ -425,10 +544,10 @@ class SonosSpeaker(object):
         :param group_command: if True, the volume for all group members is decreased by 2
         """
 
-        self._volume_down()
         if group_command:
-            for speaker in self.zone_members:
-                speaker._volume_down()
+            self.run_group_command(lambda speaker: speaker._volume_down())
+        else:
+            self._volume_down()
 
     def _volume_down(self):
         vol = self.volume
@@ -456,10 +575,10 @@ class SonosSpeaker(object):
         :param group_command: If True, the maximum volume for all group members is set.
         """
 
-        self._set_maxvolume(value)
         if group_command:
-            for speaker in self.zone_members:
-                speaker._set_maxvolume(value)
+            self.run_group_command(lambda speaker: speaker._set_maxvolume(value))
+        else:
+            self._set_maxvolume(value)
 
     def _set_maxvolume(self, value):
 
@@ -473,6 +592,59 @@ class SonosSpeaker(object):
             self._max_volume = m_volume
         self.dirty_property('max_volume')
 
+    # GROUP COMMANDS ###################################################################################################
+
+    @staticmethod
+    def group_executor():
+        with SonosSpeaker._group_executor_lock:
+            if SonosSpeaker._group_executor is None:
+                SonosSpeaker._group_executor = ThreadPoolExecutor(max_workers=definitions.GROUP_COMMAND_WORKERS,
+                                                                  thread_name_prefix='SonosGroup')
+        return SonosSpeaker._group_executor
+
+    def run_group_command(self, action):
+        """
+        Runs an action for the speaker and all zone members concurrently. The action of the speaker itself runs in the
+        calling thread. All errors are logged, the first one is raised after all actions have finished.
+        :param action: function with the speaker as its only parameter
+        """
+        executor = SonosSpeaker.group_executor()
+        futures = [(speaker, executor.submit(action, speaker)) for speaker in list(self._zone_members)]
+        errors = []
+        try:
+            action(self)
+        except Exception as err:
+            errors.append((self, err))
+        for speaker, future in futures:
+            try:
+                future.result()
+            except Exception as err:
+                errors.append((speaker, err))
+        for speaker, err in errors:
+            logger.warning('group command failed for speaker {uid}: {err}'.format(uid=speaker.uid, err=err))
+        if errors:
+            raise errors[0][1]
+
+    def set_group_mute(self, mute):
+        """
+        Mutes / un-mutes the whole group with a single GroupRenderingControl call to the group coordinator.
+        :param mute: mute value [0/1]
+        :return: False, if the speaker has no coordinator or the firmware does not support the call
+        """
+        coordinator = self.zone_coordinator
+        if coordinator is None or not coordinator._group_rendering_control:
+            return False
+        try:
+            coordinator.soco.groupRenderingControl.SetGroupMute([('InstanceID', 0),
+                                                                 ('DesiredMute', '1' if mute else '0')])
+        except SoCoUPnPException as err:
+            logger.debug('GroupRenderingControl not supported by {uid}: {err}'.format(uid=coordinator.uid, err=err))
+            coordinator._group_rendering_control = False
+            return False
+        for speaker in [self] + list(self._zone_members):
+            speaker.set_mute(mute)
+        return True
+
     # UID ##############################################################################################################
 
     @property
@@ -497,8 +669,9 @@ class SonosSpeaker(object):
             return
         if trigger_action:
             if group_command:
-                for speaker in self._zone_members:
-                    speaker.set_mute(mute, trigger_action=True, group_command=False)
+                if not self.set_group_mute(mute):
+                    self.run_group_command(lambda speaker: speaker.set_mute(mute, trigger_action=True))
+                return
             self.soco.mute = mute
         if self._mute == value:
             return
@@ -1064,7 +1237,7 @@ class SonosSpeaker(object):
 
         if force_refresh:
             url = "http://{ip}:1400/status/ifconfig".format(ip=self.ip)
-            wifi_request = requests.get(url, timeout=5)
+            wifi_request = self.soco.http_session.get(url, timeout=5)
             if wifi_request.status_code is not 200:
                 raise Exception("Could not retrieve wifi state from speaker with uid '{uid}'".format(uid=self.uid))
 
@@ -1111,7 +1284,7 @@ class SonosSpeaker(object):
             logger.debug("Unsubscribing events ... ")
             self.event_unsubscribe()
 
-            response = requests.get(url, timeout=5)
+            response = self.soco.http_session.get(url, timeout=5)
 
             if response.status_code is not 200:
                 raise Exception("Could not set wifi state for speaker with uid '{uid}'.\nError: {err}".format(
@@ -1120,7 +1293,7 @@ class SonosSpeaker(object):
             logger.debug("Wifi state set for speker with uid '{uid}'.".format(uid=self.uid))
 
             # re-registering
-            threading.Timer(15, self.event_subscription).start()
+            renewal_scheduler.call_later(15, self.event_subscription)
 
         if self._wifi_state == value:
             return
@@ -1191,10 +1364,19 @@ class SonosSpeaker(object):
         Returns all Sonos playlist as string, delimited by ','
         :return:
         """
-        playlists = ','.join(str(playlist.title) for playlist in self.soco.get_sonos_playlists())
-        if not playlists:
-            playlists = ''
-        return playlists
+        return SonosPlaylistCache.get(self)
+
+    def sonos_playlists_changed(self, update_id):
+        """
+        Called for every ContentDirectory event. If the saved queues of the household have changed, the property
+        'sonos_playlists' is made dirty for all speakers of the household.
+        :param update_id: the current 'SavedQueuesUpdateID'
+        """
+        if not SonosPlaylistCache.update(self.household_id, update_id):
+            return
+        for speaker in list(sonos_speakers.values()):
+            if speaker.household_id == self.household_id:
+                speaker.dirty_property('sonos_playlists')
 
     def dirty_music_metadata(self):
 
@@ -1329,98 +1511,30 @@ class SonosSpeaker(object):
     def play_snippet(self, uri, volume=-1, group_command=False, fade_in=False):
 
         """
-        Plays a audio snippet. This will pause the current audio track , plays the snippet and after that, the previous
-        track will be continued.
+        Queues a audio snippet for the zone coordinator and returns immediately. The announcement scheduler pauses the
+        current audio track, plays the snippet and after that, the previous track will be continued.
         :param fade_in: Fade-In after the snippet was played. Default: false
         :param uri: uri to be played
         :param volume: Snippet volume [-1-100]. After the snippet was played, the previous/original volume is set. If
         volume is '-1', the current volume is used. Default: -1
         :param group_command: Only affects the volume. If True, the snippet volume is set to all zone members. Default:
         False
-        :raise err:
+        :return: the queued AnnouncementJob
         """
-
-        if not self.is_coordinator:
-            logger.debug("forwarding play_snippet command to coordinator with uid {uid}".
-                         format(uid=self.zone_coordinator.uid))
-            self._zone_coordinator.play_snippet(uri, volume, group_command=group_command)
-        else:
-            with self._snippet_queue_lock:
-                try:
-
-                    volumes = {}
-                    # save all volumes from zone_member
-                    for member in self.zone_members:
-                        volumes[member] = member.volume
-
-                    # Take a snapshot of the current sonos device state, we will want
-                    # to roll back to this when we are done
-                    logger.debug("Speech: Taking snapshot")
-
-                    # was GoogleTTS the last track? do not snapshot
-                    last_station = self.radio_station
-                    if last_station.lower() != "google tts":
-                        snap = Snapshot(self.soco)
-                        snap.snapshot()
-
-                    # Get the URI and play it
-                    logger.debug("Speech: Playing URI %s" % uri)
-
-                    self.set_stop(1, trigger_action=True)
-
-                    if volume == -1:
-                        volume = self.volume
-
-                    if self.volume != volume:
-                        self.set_volume(volume, trigger_action=True, group_command=group_command)
-
-                    time.sleep(0.5)
-                    self.soco.play_uri(uri, title="Google TTS")
-                    self.stop_tts.wait(timeout=120)  # wait max 120sec
-                    self.stop_tts.clear()
-                    time.sleep(0.5)
-
-                    # testing play_snippet stop for stereo pair
-                    for speaker in self._zone_members:
-                        try:
-                            logger.debug("tts force stop trigger for speaker {speaker}".format(speaker=speaker.uid))
-                            res = speaker.soco.stop()
-                            logger.debug("{uid}: stop result = {res}".format(uid=speaker.soco.uid, res=res))
-                            speaker.stop_tts.clear()
-                        except Exception as err:
-                            logger.debug("{uid} error: {err}".format(uid=speaker.soco.uid, err=err))
-
-                    logger.debug("Speech: Stopping speech")
-                    # Stop the stream playing
-                    self.soco.stop()
-                    logger.debug("Speech: Restoring snapshot")
-
-                    # Restore the Sonos device back to it's previous state
-                    if last_station.lower() != "google tts":
-                        snap.restore()
-                    else:
-                        self.radio_station = ""
-
-                    for member in self.zone_members:
-                        if member in volumes:
-                            if fade_in:
-                                vol_to_ramp = volumes[member]
-                                member.soco.volume = 0
-                                member.soco.renderingControl.RampToVolume(
-                                    [('InstanceID', 0), ('Channel', 'Master'),
-                                     ('RampType', 'SLEEP_TIMER_RAMP_TYPE'),
-                                     ('DesiredVolume', vol_to_ramp),
-                                     ('ResetVolumeAfter', False), ('ProgramURI', '')])
-                            else:
-                                member.set_volume(volumes[member], trigger_action=True, group_command=False)
-
-                except Exception as err:
-                    print(err)
+        return SonosSpeaker.announcement_scheduler.enqueue(self, uri=uri, volume=volume, group_command=group_command,
+                                                           fade_in=fade_in)
 
     def play_tts(self, tts, volume, language='en', group_command=False, fade_in=False, force_stream_mode=False):
-        # we do not need any code here to get the zone coordinator.
-        # The play_snippet function does the necessary work.
+        """
+        Queues a Google TTS announcement, see play_snippet. The TTS file is fetched by the announcement scheduler.
+        :return: the queued AnnouncementJob
+        """
+        return SonosSpeaker.announcement_scheduler.enqueue(
+            self, resolve=lambda: SonosSpeaker.tts_uri(tts, language, force_stream_mode), volume=volume,
+            group_command=group_command, fade_in=fade_in)
 
+    @staticmethod
+    def tts_uri(tts, language, force_stream_mode=False):
         local_mode = SonosSpeaker.tts_local_mode
         # override if stream is set to True
         if force_stream_mode:
@@ -1428,15 +1542,101 @@ class SonosSpeaker(object):
 
         # default mode: give the prepared url directly to our loudspeaker
         if not local_mode:
-            url = utils.stream_google_tts(tts, language)
-        else:
-            filename = utils.save_google_tts(SonosSpeaker.local_folder, tts, language, SonosSpeaker.quota)
+            return utils.stream_google_tts(tts, language)
+
+        filename = SonosSpeaker.tts_cache.get(tts, language)
+        if SonosSpeaker.local_folder.endswith('/'):
+            SonosSpeaker.local_folder = SonosSpeaker.local_folder[:-1]
+        return '{}/{}'.format(SonosSpeaker.local_url, filename)
+
+    def snapshot_announcement(self):
+        """
+        Saves the state of the zone coordinator before the first announcement is played.
+        :return: state to be passed to restore_announcement
+        """
+        volumes = {}
+        # save all volumes from zone_member
+        for member in self.zone_members:
+            volumes[member] = member.volume
+
+        # Take a snapshot of the current sonos device state, we will want
+        # to roll back to this when we are done
+        logger.debug("Speech: Taking snapshot")
+
+        # was GoogleTTS the last track? do not snapshot
+        snap = None
+        if self.radio_station.lower() != "google tts":
+            snap = Snapshot(self.soco)
+            snap.snapshot()
+        return snap, volumes
+
+    def play_announcement(self, uri, volume, group_command, job=None):
+        """
+        Plays an announcement and waits until it was played (or stopped).
+        :param job: optional AnnouncementJob, the announcement is not started if the job was cancelled meanwhile
+        """
+        logger.debug("Speech: Playing URI %s" % uri)
+
+        self.set_stop(1, trigger_action=True)
+
+        if volume == -1:
+            volume = self.volume
+
+        if self.volume != volume:
+            self.set_volume(volume, trigger_action=True, group_command=group_command)
+
+        time.sleep(0.5)
+        self.stop_tts.clear()
+        # a cancel sets the flag of the job before it sets stop_tts, a cancel during the preparation would be lost
+        # with the clear above
+        if job is not None and job.cancelled:
+            return
+        self.soco.play_uri(uri, title="Google TTS")
+        self.stop_tts.wait(timeout=definitions.ANNOUNCEMENT_MAX_DURATION)
+        self.stop_tts.clear()
+        time.sleep(0.5)
 
-            if SonosSpeaker.local_folder.endswith('/'):
-                SonosSpeaker.local_folder = SonosSpeaker.local_folder[:-1]
-            url = '{}/{}'.format(SonosSpeaker.local_url, filename)
+    def restore_announcement(self, state, fade_in):
+        """
+        Restores the state of the zone coordinator after the last queued announcement was played.
+        :param state: state returned by snapshot_announcement
+        :param fade_in: Fade-In the restored track
+        """
+        snap, volumes = state
 
-        self.play_snippet(url, volume, group_command, fade_in)
+        # testing play_snippet stop for stereo pair
+        for speaker in self._zone_members:
+            try:
+                logger.debug("tts force stop trigger for speaker {speaker}".format(speaker=speaker.uid))
+                res = speaker.soco.stop()
+                logger.debug("{uid}: stop result = {res}".format(uid=speaker.soco.uid, res=res))
+                speaker.stop_tts.clear()
+            except Exception as err:
+                logger.debug("{uid} error: {err}".format(uid=speaker.soco.uid, err=err))
+
+        logger.debug("Speech: Stopping speech")
+        # Stop the stream playing
+        self.soco.stop()
+        logger.debug("Speech: Restoring snapshot")
+
+        # Restore the Sonos device back to it's previous state
+        if snap is not None:
+            snap.restore()
+        else:
+            self.radio_station = ""
+
+        for member in self.zone_members:
+            if member in volumes:
+                if fade_in:
+                    vol_to_ramp = volumes[member]
+                    member.soco.volume = 0
+                    member.soco.renderingControl.RampToVolume(
+                        [('InstanceID', 0), ('Channel', 'Master'),
+                         ('RampType', 'SLEEP_TIMER_RAMP_TYPE'),
+                         ('DesiredVolume', vol_to_ramp),
+                         ('ResetVolumeAfter', False), ('ProgramURI', '')])
+                else:
+                    member.set_volume(volumes[member], trigger_action=True, group_command=False)
 
     def set_add_to_queue(self, uri):
         self.soco.add_to_queue(uri)
@@ -1451,8 +1651,12 @@ class SonosSpeaker(object):
                 speaker._send()
 
     def _send(self):
+        with self._dirty_lock:
+            dirty_properties, self._dirty_properties = self._dirty_properties, set()
+            dirty_since, self._dirty_since = self._dirty_since, None
+            event_time, self._event_time = self._event_time, None
         dirty_values = {}
-        for prop in self._dirty_properties:
+        for prop in dirty_properties:
             value = getattr(self, prop)
             dirty_values[prop] = value
         if len(dirty_values) == 0:
@@ -1463,14 +1667,12 @@ class SonosSpeaker(object):
         '''
         dirty_values['uid'] = self.uid
 
-        data = json.dumps(self, default=lambda o: dirty_values, sort_keys=True, ensure_ascii=False, indent=4,
-                          separators=(',', ': '))
-        udp_broker.UdpBroker.udp_send(data)
+        udp_broker.UdpBroker.udp_send(dirty_values)
 
-        '''
-        empty list
-        '''
-        del self._dirty_properties[:]
+        if SonosSpeaker.flush_scheduler is not None and dirty_since is not None:
+            SonosSpeaker.flush_scheduler.record(len(dirty_properties), time.monotonic() - dirty_since)
+        if event_time is not None:
+            metrics.event_to_udp.observe(time.time() - event_time)
 
     def event_unsubscribe(self):
 
@@ -1489,6 +1691,8 @@ class SonosSpeaker(object):
                 self.sub_av_transport.unsubscribe()
             if self.sub_rendering_control is not None:
                 self.sub_rendering_control.unsubscribe()
+            if self.sub_content_directory is not None:
+                self.sub_content_directory.unsubscribe()
         except ConnectionError:
             logger.warning("Speaker offline. Could not un-subscribe.")
         except Exception as err:
@@ -1499,6 +1703,22 @@ class SonosSpeaker(object):
             self._sub_system_prop = None
             self._sub_av_transport = None
             self._sub_rendering_control = None
+            self._sub_content_directory = None
+
+    @property
+    def subscription_health(self):
+        """
+        State of the event subscriptions of the speaker: time left, next renewal and failed renewals.
+        :return: dict with the health of every subscription by service type, None if not subscribed
+        """
+        subscriptions = (
+            ('ZoneGroupTopology', self._sub_zone_group),
+            ('AVTransport', self._sub_av_transport),
+            ('RenderingControl', self._sub_rendering_control),
+            ('AlarmClock', self._sub_alarm),
+            ('ContentDirectory', self._sub_content_directory),
+        )
+        return {name: sub.health if sub is not None else None for name, sub in subscriptions}
 
     def event_subscription(self):
 
@@ -1573,75 +1793,92 @@ class SonosSpeaker(object):
                     logger.warning(err)
                     pass
 
+            if self.sub_content_directory is not None:
+                if not self.sub_content_directory.time_left:
+                    try:
+                        self.sub_content_directory.unsubscribe()
+                    except Exception as err:
+                        logger.warning(err)
+                    self._sub_content_directory = None
+            if self.sub_content_directory is None:
+                logger.debug('renewing content directory event for {uid}'.format(uid=self.uid))
+                try:
+                    self._sub_content_directory = self.soco.contentDirectory.subscribe(
+                        definitions.SUBSCRIPTION_TIMEOUT, True, SonosSpeaker.event_queue)
+                except Exception as err:
+                    logger.warning(err)
+                    pass
+
         except Exception as err:
             logger.exception(err)
 
-    def get_alarms(self):
+    def get_alarms(self, version=None):
         """
-        Gets all alarms for the speaker
-        :return:
+        Gets all alarms for the speaker from the household alarm index. If the alarm list version has changed, the
+        alarms of all speakers of the household are updated.
+        :param version: the current 'AlarmListVersion' (AlarmClock event), None to use the cached index
         """
         try:
-            values = get_alarms(self.soco)
-        except:
-            return {}
-        alarm_dict = {}
-        for alarm in values:
-            if alarm.zone.uid.lower() != self.uid.lower():
-                continue
-            dict = SonosSpeaker.alarm_to_dict(alarm)
-            alarm_dict[alarm._alarm_id] = dict
-        self.alarms = alarm_dict
-
-    @staticmethod
-    def alarm_to_dict(alarm):
-        return {
-            'Enabled': alarm.enabled,
-            'Duration': str(alarm.duration),
-            'PlayMode': alarm.play_mode,
-            'Volume': alarm.volume,
-            'Recurrence': alarm.recurrence,
-            'StartTime': str(alarm.start_time),
-            'IncludedLinkZones': alarm.include_linked_zones
-            # 'ProgramUri': alarm.program_uri,
-            # 'ProgramMetadata': alarm.program_metadata,
-            # 'Uid': alarm.zone.uid
-        }
+            self.alarms = SonosAlarmCache.get(self, version)
+        except Exception as err:
+            logger.warning('Could not get alarms for speaker {uid}: {err}'.format(uid=self.uid, err=err))
+            return
+        if version is None:
+            return
+        for speaker in list(sonos_speakers.values()):
+            if speaker is not self and speaker.household_id == self.household_id:
+                speaker.alarms = SonosAlarmCache.get(speaker)
 
     def dirty_property(self, *args):
-        for arg in args:
-            if arg not in self._dirty_properties:
-                self._dirty_properties.append(arg)
+        """
+        Marks properties as changed. Several changes of the same property are merged into a single value, which is
+        sent with the next flush.
+        :param args: property names
+        """
+        now = time.monotonic()
+        with self._dirty_lock:
+            self._dirty_properties.update(args)
+            if self._dirty_since is None:
+                self._dirty_since = now
+            dirty_since = self._dirty_since
+        if SonosSpeaker.flush_scheduler is not None:
+            SonosSpeaker.flush_scheduler.schedule(self, dirty_since, now)
+
+    def event_received(self, timestamp):
+        """
+        Remembers the receive time of the oldest event whose changes have not been sent yet, to measure the time until
+        they are sent to the udp clients.
+        :param timestamp: time the event was received (time.time())
+        """
+        with self._dirty_lock:
+            if self._dirty_properties and self._event_time is None:
+                self._event_time = timestamp
 
     def set_zone_coordinator(self):
-        if self.soco.group is None:
+        coordinator_uid = self.soco.topology.coordinator(self.soco.uid)
+        if coordinator_uid is None:
             return
-        soco = next(member for member in self.soco.group.members if member.is_coordinator is True)
-        if not soco:
-            '''
-            current instance is the coordinator
-            '''
-            self._zone_coordinator = None
-
-        self._zone_coordinator = sonos_speakers[soco.uid.lower()]
+        coordinator = sonos_speakers.get(coordinator_uid.lower())
+        if coordinator is None:
+            return
+        self._zone_coordinator = coordinator
         self.dirty_property('is_coordinator')
 
     def set_group_members(self):
         del self.zone_members[:]
 
-        if not self.soco.group:
-            return
-
-        for member in self.soco.group.members:
-            member_uid = member.uid.lower()
-            if member_uid != self.uid:
+        for member_uid in self.soco.topology.group_members(self.soco.uid):
+            member_uid = member_uid.lower()
+            if member_uid != self.uid and member_uid in sonos_speakers:
                 self.zone_members.append(sonos_speakers[member_uid])
 
-    def terminate(self):
+    def terminate(self, close_session=True):
         self.event_unsubscribe()
         self.zone_members[:] = []
         self._zone_members.unregister_callback(self.zone_member_changed)
         self._zone_members = None
+        if close_session:
+            self._soco.http_session.close()
         del self._soco
 
     led = property(get_led, set_led)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import calendar
 import math
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import logging
 import requests
@@ -9,6 +11,31 @@ import re
 
 logger = logging.getLogger('sonos_broker')
 
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def session():
+    """ Returns the keep-alive session shared by all Google requests """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=gTTS.MAX_WORKERS))
+            _session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=gTTS.MAX_WORKERS))
+        return _session
+
+
+def executor():
+    """ Returns the thread pool used to fetch the parts of a text concurrently """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=gTTS.MAX_WORKERS, thread_name_prefix='GoogleTTS')
+        return _executor
+
+
 class Token:
     """ Token (Google Translate Token)
     Generate the current token key and allows generation of tokens (tk) with it
@@ -17,9 +44,11 @@ class Token:
 
     SALT_1 = "+-a^+6"
     SALT_2 = "+-3^+b+-f"
+    TOKEN_URL = "https://translate.google.com/"
 
-    def __init__(self):
-        self.token_key = None
+    # the token key is shared by all instances and valid for the current hour
+    _token_key = None
+    _token_lock = threading.Lock()
 
     def calculate_token(self, text, seed=None):
         """ Calculate the request token (`tk`) of a string
@@ -52,22 +81,23 @@ class Token:
         return str(a) + "." + str(a ^ int(first_seed))
 
     def _get_token_key(self):
-        if self.token_key is not None:
-            return self.token_key
-
         timestamp = calendar.timegm(time.gmtime())
         hours = int(math.floor(timestamp / 3600))
+        prefix = str(hours) + "."
+
+        with Token._token_lock:
+            if Token._token_key is not None and Token._token_key.startswith(prefix):
+                return Token._token_key
 
-        response = requests.get("https://translate.google.com/")
-        line = response.text.split('\n')[-1]
+            response = session().get(self.TOKEN_URL)
+            line = response.text.split('\n')[-1]
 
-        tkk_expr = re.search(".*?(TKK=.*?;)W.*?", line).group(1)
-        a = re.search("a\\\\x3d(-?\d+);", tkk_expr).group(1)
-        b = re.search("b\\\\x3d(-?\d+);", tkk_expr).group(1)
+            tkk_expr = re.search(".*?(TKK=.*?;)W.*?", line).group(1)
+            a = re.search("a\\\\x3d(-?\d+);", tkk_expr).group(1)
+            b = re.search("b\\\\x3d(-?\d+);", tkk_expr).group(1)
 
-        result = str(hours) + "." + str(int(a) + int(b))
-        self.token_key = result
-        return result
+            Token._token_key = prefix + str(int(a) + int(b))
+            return Token._token_key
 
     """ Functions used by the token calculation algorithm """
     def _rshift(self, val, n):
@@ -87,6 +117,7 @@ class gTTS:
 
     GOOGLE_TTS_URL = 'https://translate.google.com/translate_tts'
     MAX_CHARS = 100 # Max characters the Google TTS API takes at a time
+    MAX_WORKERS = 4 # Max parts of a text fetched concurrently
     LANGUAGES = {
         'af' : 'Afrikaans',
         'sq' : 'Albanian',
@@ -174,44 +205,51 @@ class gTTS:
             f.close()
 
     def stream_url(self):
-        req = self._prepare_request()
+        """ Only the first part of the text can be streamed """
+        req = self._prepare_request(0)
         params = req.params
         prep_req = req.prepare()
         prep_req.prepare_url(req.url, params)
         return prep_req.url
 
-    def _prepare_request(self):
-        """ Do the Web request and save to a file-like object """
-        for idx, part in enumerate(self.text_parts):
-            payload = {'ie': 'UTF-8',
-                       'q': part,
-                       'tl': self.lang,
-                       'total': len(self.text_parts),
-                       'idx': idx,
-                       'client': 'tw-ob',
-                       'textlen': len(part),
-                       'tk': self.token.calculate_token(part)}
-            headers = {
-                "Referer": "http://translate.google.com/",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/47.0.2526.106 Safari/537.36"
-            }
-
-            logger.debug("GoogleTTS: headers parameter: {param}".format(param=headers))
-            logger.debug("GoogleTTS: request parameter: {param}".format(param=payload))
-            return requests.Request(method='GET', url=self.GOOGLE_TTS_URL, headers=headers, params=payload)
+    def _prepare_request(self, idx):
+        """ Prepares the Web request for a part of the text """
+        part = self.text_parts[idx]
+        payload = {'ie': 'UTF-8',
+                   'q': part,
+                   'tl': self.lang,
+                   'total': len(self.text_parts),
+                   'idx': idx,
+                   'client': 'tw-ob',
+                   'textlen': len(part),
+                   'tk': self.token.calculate_token(part)}
+        headers = {
+            "Referer": "http://translate.google.com/",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                          "Chrome/47.0.2526.106 Safari/537.36"
+        }
+
+        logger.debug("GoogleTTS: headers parameter: {param}".format(param=headers))
+        logger.debug("GoogleTTS: request parameter: {param}".format(param=payload))
+        return requests.Request(method='GET', url=self.GOOGLE_TTS_URL, headers=headers, params=payload)
+
+    def _fetch(self, idx):
+        """ Fetches the mp3 of a part of the text """
+        r = session().send(self._prepare_request(idx).prepare())
+        logger.debug("Headers: {}".format(r.request.headers))
+        logger.debug("Reponse: {}, Redirects: {}".format(r.status_code, r.history))
+        r.raise_for_status()
+        return r.content
 
     def _write_to_fp(self, fp):
+        """ Fetches all parts of the text concurrently and writes them in order to a file-like object """
         try:
-            prepared_request = self._prepare_request().prepare()
-            s = requests.Session()
-            r = s.send(prepared_request)
-            logger.debug("Headers: {}".format(r.request.headers))
-            logger.debug("Reponse: {}, Redirects: {}".format(r.status_code, r.history))
-
-            r.raise_for_status()
-            for chunk in r.iter_content(chunk_size=1024):
-                fp.write(chunk)
+            if len(self.text_parts) == 1:
+                parts = [self._fetch(0)]
+            else:
+                parts = executor().map(self._fetch, range(len(self.text_parts)))
+            for part in parts:
+                fp.write(part)
         except Exception as err:
             logger.error(err)
             raise err
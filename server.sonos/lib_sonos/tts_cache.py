@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+import requests
+from lib_sonos.tts import gTTS
+
+logger = logging.getLogger('sonos_broker')
+
+# cached tts files are named by the md5 hash of language and text
+TTS_FILE_PATTERN = re.compile(r'^[0-9a-f]{32}\.mp3$')
+
+
+class TtsCache(object):
+    """
+    Cache of the Google TTS mp3 files in the webservice folder. The folder is scanned once at startup, afterwards the
+    size of all cached files is accounted incrementally. If the quota is exceeded, the least recently used files are
+    deleted. Other files in the folder are neither counted nor deleted.
+    """
+
+    def __init__(self, folder, quota):
+        """
+        :param folder: the webservice folder
+        :param quota: maximum size of all cached files in megabytes
+        """
+        self.folder = folder
+        self.quota = quota * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        files = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if TTS_FILE_PATTERN.match(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        # the modification time is updated on every cache hit, oldest first
+        for _, name, size in sorted(files):
+            self._files[name] = size
+            self._size += size
+        logger.debug('TTS cache: {count} files, {size} bytes in {folder}'.format(
+            count=len(self._files), size=self._size, folder=self.folder))
+        self._evict()
+
+    @staticmethod
+    def file_name(tts_string, tts_language):
+        m = hashlib.md5()
+        m.update('{}_{}'.format(tts_language, tts_string).encode('utf-8'))
+        return '{}.mp3'.format(m.hexdigest())
+
+    def get(self, tts_string, tts_language):
+        """
+        Returns the file name of the mp3 for the text. The mp3 is only fetched from Google, if it is not cached.
+        :param tts_string: text
+        :param tts_language: language of the text
+        :return: file name relative to the webservice folder
+        """
+        fname = self.file_name(tts_string, tts_language)
+        abs_fname = os.path.join(self.folder, fname)
+
+        with self._lock:
+            if fname in self._files:
+                try:
+                    os.utime(abs_fname)
+                    self._files.move_to_end(fname)
+                    self.hits += 1
+                    return fname
+                except OSError:
+                    # deleted by someone else
+                    self._size -= self._files.pop(fname)
+            self.misses += 1
+
+        tmp_fname = '{path}.{thread}.tmp'.format(path=abs_fname, thread=threading.get_ident())
+        try:
+            gTTS(text=tts_string, lang=tts_language).save(tmp_fname)
+            os.replace(tmp_fname, abs_fname)
+        except requests.RequestException as err:
+            raise Exception("Couldn't obtain TTS from Google. Error: {}".format(err))
+        finally:
+            if os.path.exists(tmp_fname):
+                os.remove(tmp_fname)
+
+        size = os.path.getsize(abs_fname)
+        with self._lock:
+            self._size += size - self._files.pop(fname, 0)
+            self._files[fname] = size
+            self._evict(keep=fname)
+        return fname
+
+    def _evict(self, keep=None):
+        """
+        Deletes the least recently used files until the cache size is below the quota. Has to be called with the lock
+        held (or from the constructor).
+        :param keep: file name which must not be deleted
+        """
+        while self._size > self.quota and self._files:
+            fname = next(iter(self._files))
+            if fname == keep:
+                if len(self._files) == 1:
+                    break
+                self._files.move_to_end(fname)
+                continue
+            self._size -= self._files.pop(fname)
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.folder, fname))
+            except OSError as err:
+                logger.warning('TTS cache: could not delete {file}: {err}'.format(file=fname, err=err))
+            logger.debug('TTS cache: evicted {file}'.format(file=fname))
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._files), 'size': self._size, 'quota': self.quota, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
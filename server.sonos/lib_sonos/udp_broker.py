@@ -2,70 +2,121 @@
 import logging
 import errno
 import socket
+import threading
+from lib_sonos import definitions
+from lib_sonos import udp_codec
 
 logger = logging.getLogger('sonos_broker')
 
-registered_clients = {}
+
+class UdpClient(object):
+    """
+    A subscribed udp client. The client address is resolved once at subscription time.
+    """
+
+    def __init__(self, ip, port, sockaddr, encoding=udp_codec.ENCODING_JSON):
+        self.ip = ip
+        self.port = port
+        self.sockaddr = sockaddr
+        self.encoding = encoding
+        self.errors = 0
+        self.total_errors = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def __str__(self):
+        return '{ip}:{port}'.format(ip=self.ip, port=self.port)
+
 
 class UdpBroker():
+    _clients = {}
+    _clients_lock = threading.Lock()
+    _sock = None
+    _sock_lock = threading.Lock()
+
     @staticmethod
-    def subscribe_client(ip, port):
-        logger.info('register client for udp messages: {host}:{port}'.format(host=ip, port=port))
-        if ip not in registered_clients:
-            registered_clients.update({ip: [port]})
-        else:
-            ports = registered_clients[ip]
-            if port not in ports:
-                registered_clients[ip].append(port)
+    def _socket():
+        """
+        Returns the (lazily created) non-blocking socket used to send data to all clients.
+        """
+        if UdpBroker._sock is None:
+            with UdpBroker._sock_lock:
+                if UdpBroker._sock is None:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    sock.setblocking(False)
+                    UdpBroker._sock = sock
+        return UdpBroker._sock
 
-        logger.info("registered clients: {clients}".format(clients=", ".join(['{ip}:{port}'.format(ip=key, port=value)
-                                                                              for (key, value) in
-                                                                              registered_clients.items()])))
+    @staticmethod
+    def subscribe_client(ip, port, encoding=udp_codec.ENCODING_JSON):
+        port = int(port)
+        logger.info('register client for udp messages: {host}:{port} [{encoding}]'.format(host=ip, port=port,
+                                                                                          encoding=encoding))
+        sockaddr = socket.getaddrinfo(ip, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        with UdpBroker._clients_lock:
+            client = UdpBroker._clients.get((ip, port))
+            if client is None:
+                UdpBroker._clients[(ip, port)] = UdpClient(ip, port, sockaddr, encoding)
+            else:
+                client.encoding = encoding
+        logger.info("registered clients: {clients}".format(clients=UdpBroker.registered_clients()))
 
     @staticmethod
     def unsubscribe_client(ip, port):
+        port = int(port)
         logger.info('un-register client for udp messages: {host}:{port}'.format(host=ip, port=port))
-        if ip in registered_clients:
-            if port in registered_clients[ip]:
-                registered_clients[ip].remove(port)
+        with UdpBroker._clients_lock:
+            UdpBroker._clients.pop((ip, port), None)
+        logger.info("registered clients: {clients}".format(clients=UdpBroker.registered_clients()))
 
-            if len(registered_clients[ip]) == 0:
-                registered_clients.pop(ip)
+    @staticmethod
+    def registered_clients():
+        with UdpBroker._clients_lock:
+            return ", ".join(str(client) for client in UdpBroker._clients.values())
 
-        logger.info("registered clients: {clients}".format(
-            clients=", ".join(['{ip}:{port}'.format(ip=key, port=value) for (key, value)
-                               in registered_clients.items()])))
+    @staticmethod
+    def client_stats():
+        """
+        Returns the send statistics for all registered clients.
+        """
+        with UdpBroker._clients_lock:
+            return [{'client': str(client), 'encoding': client.encoding, 'messages': client.messages,
+                     'bytes': client.bytes, 'errors': client.total_errors} for client in UdpBroker._clients.values()]
 
     @staticmethod
-    def udp_send(data):
-        logger.info("registered clients: {clients}".format(
-            clients=", ".join(['{ip}:{port}'.format(ip=key, port=value) for (key, value)
-                               in registered_clients.items()])))
-        logger.info("sending sonos speaker data: {}".format(data))
-        for host, ports in registered_clients.items():
-            for port in ports:
-                try:
-                    family, type, proto, canonname, sockaddr = socket.getaddrinfo(host, port)[0]
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                    try:
-                        sock.sendto(data.encode('utf-8'), (sockaddr[0], sockaddr[1]))
-                    except socket.error as e:
-                        if isinstance(e.args, tuple):
-                            if e[0] == errno.EPIPE:
-                                # remote peer disconnected
-                                logger.warning("Detected remote disconnect")
-                            else:
-                                logger.warning(e)
-                                pass
-                        else:
-                            logger.error("socket error {}".format(e))
+    def udp_send(values):
+        """
+        Sends the speaker values to all registered clients. The values are encoded once per client encoding.
+        :param values: dict with property names and values
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("sending sonos speaker data to {clients}: {data}".format(
+                clients=UdpBroker.registered_clients(), data=values))
 
-                        sock.close()
+        with UdpBroker._clients_lock:
+            clients = list(UdpBroker._clients.values())
+        if not clients:
+            return
 
-                    except IOError as e:
-                        logger.error("Got IO error: {}".format(e))
-                except Exception as err:
-                    logger.error(err)
-                    # remove client from the list
-                    UdpBroker.unsubscribe_client(host, port)
-                    pass
\ No newline at end of file
+        payloads = {}
+        sock = UdpBroker._socket()
+        for client in clients:
+            payload = payloads.get(client.encoding)
+            if payload is None:
+                payload = udp_codec.encode(values, client.encoding)
+                payloads[client.encoding] = payload
+            try:
+                sock.sendto(payload, client.sockaddr)
+                client.errors = 0
+                client.messages += 1
+                client.bytes += len(payload)
+            except OSError as err:
+                client.errors += 1
+                client.total_errors += 1
+                if err.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    logger.warning("Send buffer full, dropping message for client {client}".format(client=client))
+                else:
+                    logger.warning("Could not send data to client {client}: {err}".format(client=client, err=err))
+                if client.errors >= definitions.UDP_MAX_CLIENT_ERRORS:
+                    logger.error("Too many errors for client {client}, removing it.".format(client=client))
+                    UdpBroker.unsubscribe_client(client.ip, client.port)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Encodings for the speaker updates sent to the udp clients. The encoding is negotiated per client with the
+'client_subscribe' command:
+
+    json     pretty-printed json (default, compatible with all existing clients)
+    compact  json without any whitespace
+    binary   versioned binary format with small integer keys for all known properties
+
+Binary format (version 1):
+
+    header    2 bytes magic b'SB', 1 byte version
+    field     1 byte key, 1 byte type, value
+              key 0 is followed by the property name (varint length + utf-8) for properties missing in PROPERTY_KEYS
+
+    types     0: None, 1: False, 2: True, 3: zigzag varint integer,
+              4: string (varint length + utf-8), 5: json (varint length + compact json in utf-8)
+
+PROPERTY_KEYS must only be extended at the end, otherwise the version has to be increased.
+"""
+import json
+
+ENCODING_JSON = 'json'
+ENCODING_COMPACT = 'compact'
+ENCODING_BINARY = 'binary'
+ENCODINGS = (ENCODING_JSON, ENCODING_COMPACT, ENCODING_BINARY)
+
+BINARY_MAGIC = b'SB'
+BINARY_VERSION = 1
+
+PROPERTY_KEYS = (
+    'uid',
+    'ip',
+    'model',
+    'model_number',
+    'display_version',
+    'household_id',
+    'zone_name',
+    'zone_icon',
+    'is_coordinator',
+    'serial_number',
+    'software_version',
+    'hardware_version',
+    'mac_address',
+    'playlist_position',
+    'playlist_total_tracks',
+    'volume',
+    'mute',
+    'led',
+    'streamtype',
+    'stop',
+    'play',
+    'pause',
+    'track_title',
+    'track_artist',
+    'track_duration',
+    'track_position',
+    'track_album_art',
+    'track_album',
+    'track_uri',
+    'radio_station',
+    'radio_show',
+    'status',
+    'max_volume',
+    'additional_zone_members',
+    'bass',
+    'treble',
+    'loudness',
+    'playmode',
+    'nightmode',
+    'alarms',
+    'tts_local_mode',
+    'wifi_state',
+    'balance',
+    'sonos_playlists',
+    'transport_actions',
+)
+
+_KEY_IDS = {key: idx + 1 for idx, key in enumerate(PROPERTY_KEYS)}
+
+_TYPE_NONE = 0
+_TYPE_FALSE = 1
+_TYPE_TRUE = 2
+_TYPE_INT = 3
+_TYPE_STR = 4
+_TYPE_JSON = 5
+
+
+def _write_varint(buf, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            buf.append(byte | 0x80)
+        else:
+            buf.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(buf, value):
+    _write_varint(buf, len(value))
+    buf.extend(value)
+
+
+def _read_bytes(data, pos):
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length], pos + length
+
+
+def encode_binary(values):
+    buf = bytearray(BINARY_MAGIC)
+    buf.append(BINARY_VERSION)
+    for key, value in values.items():
+        key_id = _KEY_IDS.get(key, 0)
+        buf.append(key_id)
+        if not key_id:
+            _write_bytes(buf, key.encode('utf-8'))
+
+        if value is None:
+            buf.append(_TYPE_NONE)
+        elif value is True or value is False:
+            buf.append(_TYPE_TRUE if value else _TYPE_FALSE)
+        elif isinstance(value, int):
+            buf.append(_TYPE_INT)
+            _write_varint(buf, (value << 1) if value >= 0 else ((-value) << 1) - 1)
+        elif isinstance(value, str):
+            buf.append(_TYPE_STR)
+            _write_bytes(buf, value.encode('utf-8'))
+        else:
+            buf.append(_TYPE_JSON)
+            _write_bytes(buf, json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return bytes(buf)
+
+
+def decode_binary(data):
+    if data[:2] != BINARY_MAGIC:
+        raise ValueError('No binary Sonos Broker data.')
+    if data[2] != BINARY_VERSION:
+        raise ValueError('Unsupported binary format version {version}.'.format(version=data[2]))
+
+    values = {}
+    pos = 3
+    while pos < len(data):
+        key_id = data[pos]
+        pos += 1
+        if key_id:
+            key = PROPERTY_KEYS[key_id - 1]
+        else:
+            key, pos = _read_bytes(data, pos)
+            key = key.decode('utf-8')
+
+        value_type = data[pos]
+        pos += 1
+        if value_type == _TYPE_NONE:
+            value = None
+        elif value_type == _TYPE_FALSE:
+            value = False
+        elif value_type == _TYPE_TRUE:
+            value = True
+        elif value_type == _TYPE_INT:
+            value, pos = _read_varint(data, pos)
+            value = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        elif value_type == _TYPE_STR:
+            value, pos = _read_bytes(data, pos)
+            value = value.decode('utf-8')
+        elif value_type == _TYPE_JSON:
+            value, pos = _read_bytes(data, pos)
+            value = json.loads(value.decode('utf-8'))
+        else:
+            raise ValueError('Unknown value type {type}.'.format(type=value_type))
+        values[key] = value
+    return values
+
+
+def encode(values, encoding):
+    """
+    Encodes the speaker values for the given client encoding.
+    :param values: dict with property names and values
+    :param encoding: one of ENCODINGS
+    :return: bytes
+    """
+    if encoding == ENCODING_BINARY:
+        return encode_binary(values)
+    if encoding == ENCODING_COMPACT:
+        return json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(values, sort_keys=True, ensure_ascii=False, indent=4, separators=(',', ': ')).encode('utf-8')
+
+
+def decode(data):
+    """
+    Decodes an udp message of any encoding.
+    :param data: bytes received from the Sonos Broker
+    :return: dict with property names and values
+    """
+    if data[:2] == BINARY_MAGIC:
+        return decode_binary(data)
+    return json.loads(data.decode('utf-8').strip())
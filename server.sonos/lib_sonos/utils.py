@@ -3,13 +3,11 @@ from __future__ import unicode_literals
 # -*- coding: utf-8 -*-
 import base64
 import ctypes
-import hashlib
 import json
 import os
 import platform
 import socket
 import weakref
-import requests
 import re
 import urllib
 import urllib.request
@@ -140,48 +138,10 @@ def get_free_space_mb(folder):
         return int(round(st.f_bavail * st.f_frsize / 1024 / 1024, 0))
 
 
-def get_folder_size(folder):
-    total_size = 0
-    for dirpath, dirnames, filenames in os.walk(folder):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            total_size += os.path.getsize(fp)
-    return total_size
-
-
 def stream_google_tts(tts_string, tts_language):
     return gTTS(text=tts_string, lang=tts_language).stream_url()
 
 
-def save_google_tts(local_share, tts_string, tts_language, quota):
-    size = int(get_folder_size(local_share) / 1024 / 1024)
-    if size == 0:
-        size = 1
-
-    if quota < size:
-        # since this is a const value, no more files will be written (only this mp3 onetime)
-        tts_language = 'en'
-        tts_string = 'Cannot save file. File size quota exceeded!'
-
-    m = hashlib.md5()
-    m.update('{}_{}'.format(tts_language, tts_string).encode('utf-8'))
-    file_name = m.hexdigest()
-
-    tts = gTTS(text=tts_string, lang=tts_language)
-
-    fname = '{}.mp3'.format(file_name)
-    abs_fname = os.path.join(local_share, fname)
-
-    # check if file exists, no need to browse google tts
-    if os.path.exists(abs_fname):
-        return fname
-    try:
-        tts.save(abs_fname)
-        return os.path.split(abs_fname)[1]
-    except requests.RequestException as e:
-        raise ("Couldn't obtain TTS from Google.\nError: {}".format(e.errno))
-
-
 def to_json(value):
     return json.dumps(value, default=lambda o: value, ensure_ascii=False, indent=4)
 
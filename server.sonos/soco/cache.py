@@ -4,12 +4,66 @@
 
 from __future__ import unicode_literals
 
+import sys
 import threading
-from time import time
+import weakref
+from collections import OrderedDict
+from time import sleep, time
 
 from . import config
 from .compat import dumps
 
+# All TimedCache instances, for the purger thread and the statistics
+_caches = weakref.WeakSet()
+_caches_lock = threading.Lock()
+_purger = None
+
+
+def _purge_caches():
+    """Purge the expired entries of all caches periodically."""
+    while True:
+        sleep(config.CACHE_PURGE_INTERVAL)
+        with _caches_lock:
+            caches = list(_caches)
+        for cache in caches:
+            cache.purge()
+
+
+def _register(cache):
+    """Register a cache for purging, start the purger thread if necessary."""
+    global _purger  # pylint: disable=global-statement
+    with _caches_lock:
+        _caches.add(cache)
+        if _purger is None:
+            _purger = threading.Thread(target=_purge_caches,
+                                       name='SoCoCachePurger')
+            _purger.daemon = True
+            _purger.start()
+
+
+def stats():
+    """Return the statistics summed up over all caches.
+
+    Returns:
+        dict: the number of caches and the sums of their `TimedCache.stats`.
+    """
+    with _caches_lock:
+        caches = list(_caches)
+    totals = {'caches': len(caches)}
+    for cache in caches:
+        for key, value in cache.stats.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _size(item):
+    """Return the approximate size of a cached item in bytes."""
+    size = sys.getsizeof(item)
+    if isinstance(item, dict):
+        for key, value in item.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
 
 class _BaseCache(object):
 
@@ -38,6 +92,11 @@ class _BaseCache(object):
         """Empty the whole cache."""
         raise NotImplementedError
 
+    @property
+    def stats(self):
+        """`dict`: The statistics of the cache."""
+        return {}
+
 
 class NullCache(_BaseCache):
 
@@ -86,27 +145,35 @@ class TimedCache(_BaseCache):
         >>> sleep(2)
         >>> assert not cache.get('some', kw='args') == "item"
 
-    Warning:
-        At present, the cache can theoretically grow and grow, since entries
-        are not automatically purged, though in practice this is unlikely
-        since there are not that many different combinations of arguments in
-        the places where it is used in SoCo, so not that many different
-        cache entries will be created. If this becomes a problem,
-        use a thread and timer to purge the cache, or rewrite this to use
-        LRU logic!
+    The cache holds at most ``max_entries`` items, the least recently used
+    item is evicted if the cache is full. Expired items are removed when they
+    are read, and by a purger thread shared by all caches every
+    `config.CACHE_PURGE_INTERVAL` seconds.
     """
 
-    def __init__(self, default_timeout=0):
+    def __init__(self, default_timeout=0, max_entries=None):
         """
         Args:
             default_timeout (int): The default number of seconds after
-            which items will be expired.
+                which items will be expired.
+            max_entries (int): The maximum number of items. Defaults to
+                `config.CACHE_MAX_ENTRIES`.
         """
         super(TimedCache, self).__init__()
         #: `int`: The default caching expiry interval in seconds.
         self.default_timeout = default_timeout
+        #: `int`: The maximum number of items.
+        self.max_entries = max_entries or config.CACHE_MAX_ENTRIES
+        # key -> (expiry time, item, size), least recently used first
+        self._cache = OrderedDict()
         # A thread lock for the cache
         self._cache_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._bytes = 0
+        _register(self)
 
     def get(self, *args, **kwargs):
         """Get an item from the cache for this combination of args and kwargs.
@@ -125,17 +192,20 @@ class TimedCache(_BaseCache):
             return None
         # Look in the cache to see if there is an unexpired item. If there is
         # we can just return the cached result.
-        cache_key = self.make_key(args, kwargs)
+        cache_key = self.make_key(*args, **kwargs)
         # Lock and load
         with self._cache_lock:
-            if cache_key in self._cache:
-                expirytime, item = self._cache[cache_key]
-
-                if expirytime >= time():
-                    return item
-                else:
-                    # An expired item is present - delete it
-                    del self._cache[cache_key]
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                if entry[0] >= time():
+                    self._cache.move_to_end(cache_key)
+                    self._hits += 1
+                    return entry[1]
+                # An expired item is present - delete it
+                del self._cache[cache_key]
+                self._bytes -= entry[2]
+                self._expirations += 1
+            self._misses += 1
         # Nothing found
         return None
 
@@ -158,25 +228,59 @@ class TimedCache(_BaseCache):
         timeout = kwargs.pop('timeout', None)
         if timeout is None:
             timeout = self.default_timeout
-        cache_key = self.make_key(args, kwargs)
-        # Store the item, along with the time at which it will expire
+        if timeout <= 0:
+            # not to be cached. A live item is kept, it may have been primed
+            # (e.g. from an event) while this item was requested.
+            return
+        cache_key = self.make_key(*args, **kwargs)
         with self._cache_lock:
-            self._cache[cache_key] = (time() + timeout, item)
+            old = self._cache.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            # Store the item, along with the time at which it will expire
+            size = _size(item)
+            self._cache[cache_key] = (time() + timeout, item, size)
+            self._bytes += size
+            while len(self._cache) > self.max_entries:
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._evictions += 1
 
     def delete(self, *args, **kwargs):
         """Delete an item from the cache for this combination of args and
         kwargs."""
-        cache_key = self.make_key(args, kwargs)
+        cache_key = self.make_key(*args, **kwargs)
         with self._cache_lock:
-            try:
-                del self._cache[cache_key]
-            except KeyError:
-                pass
+            entry = self._cache.pop(cache_key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
 
     def clear(self):
         """Empty the whole cache."""
         with self._cache_lock:
             self._cache.clear()
+            self._bytes = 0
+
+    def purge(self):
+        """Remove all expired items."""
+        now = time()
+        with self._cache_lock:
+            expired = [key for key, entry in self._cache.items()
+                       if entry[0] < now]
+            for key in expired:
+                self._bytes -= self._cache.pop(key)[2]
+            self._expirations += len(expired)
+
+    @property
+    def stats(self):
+        """`dict`: The number of items, their approximate size in bytes, hits,
+        misses, evictions (of the least recently used items) and expirations.
+        """
+        with self._cache_lock:
+            return {'entries': len(self._cache), 'bytes': self._bytes,
+                    'hits': self._hits, 'misses': self._misses,
+                    'evictions': self._evictions,
+                    'expirations': self._expirations}
 
     @staticmethod
     def make_key(*args, **kwargs):
@@ -187,14 +291,21 @@ class TimedCache(_BaseCache):
             **kwargs: any keyword arguments.
 
         Returns:
-            str: the key.
+            The key: a tuple of the args (lists converted to tuples) and the
+            sorted kwargs or, if they contain unhashable items, their pickled
+            representation.
         """
-        # This is not entirely straightforward, since args and kwargs may
-        # contain mutable items and unicode. Possibilities include using
-        # __repr__, frozensets, and code from Py3's LRU cache. But pickle
-        # works, and although it is not as fast as some methods, it is good
-        # enough at the moment
-        cache_key = dumps((args, kwargs))
+        # The args are usually an action name and a list of (name, value)
+        # tuples, which are converted to a tuple faster than they are
+        # pickled. Everything else falls back to pickle.
+        cache_key = tuple([tuple(arg) if type(arg) is list else arg
+                           for arg in args])
+        if kwargs:
+            cache_key += (tuple(sorted(kwargs.items())),)
+        try:
+            hash(cache_key)
+        except TypeError:
+            cache_key = dumps((args, kwargs))
         return cache_key
 
 
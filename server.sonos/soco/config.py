@@ -31,6 +31,51 @@ See also:
 """
 
 
+CACHE_MAX_ENTRIES = 256
+"""The maximum number of entries of a cache.
+
+If a cache is full, the least recently used entry is evicted.
+
+See also:
+    The :mod:`soco.cache` module.
+"""
+
+
+CACHE_PURGE_INTERVAL = 60
+"""The interval in seconds in which expired entries are purged from all
+caches.
+
+See also:
+    The :mod:`soco.cache` module.
+"""
+
+
+EVENT_CACHE_TIMEOUT = 3600
+"""The number of seconds for which results primed from events are cached.
+
+While a service is subscribed, the results of some actions (e.g. the
+volume, mute state or transport state) are put into the service's cache
+whenever they are evented, so reading them does not need a network call.
+The primed results are dropped earlier if the subscription ends, its renewal
+fails or events have been lost.
+
+See also:
+    The :mod:`soco.services` and :mod:`soco.events` modules.
+"""
+
+
+SOAP_REQUEST_CALLBACK = None
+"""A callable which is called after every SOAP request, e.g. to collect
+metrics.
+
+It is called with the `Service`, the name of the action and the duration
+of the request in seconds. If `None` (the default), nothing is called.
+
+See also:
+    The :mod:`soco.services` module.
+"""
+
+
 EVENT_LISTENER_IP = None
 """The IP on which the event listener listens.
 
@@ -50,3 +95,123 @@ The default is 1400. You must set this before subscribing to any events.
 See also:
     The :mod:`soco.events` module.
 """
+
+
+EVENT_LISTENER_WORKERS = 8
+"""The maximum number of ``NOTIFY`` requests handled concurrently by the
+event listener.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_LISTENER_KEEP_ALIVE = 60
+"""The number of seconds after which idle keep-alive connections of the
+event listener are closed.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_DECODER_WORKERS = 2
+"""The number of threads decoding the received events. The events of a
+subscription are always decoded by the same thread.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_REORDER_WINDOW = 0.5
+"""The number of seconds an event received ahead of its sequence number is
+held back, waiting for the missing events.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+REQUESTS_POOL_CONNECTIONS = 1
+"""The number of connection pools each `SoCo` instance keeps.
+
+Each `SoCo` instance talks to a single host, so one pool is enough.
+
+See also:
+    The :mod:`soco.session` module.
+"""
+
+
+REQUESTS_POOL_MAXSIZE = 4
+"""The maximum number of keep-alive connections per speaker.
+
+See also:
+    The :mod:`soco.session` module.
+"""
+
+
+REQUESTS_POOL_BLOCK = False
+"""Whether `REQUESTS_POOL_MAXSIZE` is a hard limit per speaker.
+
+If `True`, a request waits for a free pooled connection instead of opening
+an additional, non-pooled one.
+
+See also:
+    The :mod:`soco.session` module.
+"""
+
+
+REQUESTS_POOL_IDLE_TIMEOUT = 60
+"""The number of seconds after which idle pooled connections are dropped.
+
+Sonos devices close idle connections on their side, so there is no point in
+keeping them longer. Set to 0 to never drop idle connections.
+
+See also:
+    The :mod:`soco.session` module.
+"""
+
+
+EVENT_RENEWAL_FRACTION = 0.85
+"""The fraction of the subscription timeout after which an auto-renewed
+subscription is renewed.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_JITTER = 0.1
+"""The renewals are spread randomly over this fraction of the renewal
+interval (e.g. between 76.5% and 85% of the timeout), so subscriptions made
+at the same time are not renewed at the same time.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_WORKERS = 4
+"""The maximum number of renewals sent concurrently.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_RETRY_MIN = 2
+"""The delay in seconds before the first retry of a failed renewal. The delay
+is doubled for every further failure.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_RETRY_MAX = 60
+"""The maximum delay in seconds between retries of a failed renewal.
+
+See also:
+    The :mod:`soco.events` module.
+"""
@@ -13,8 +13,6 @@ import socket
 from functools import wraps
 import warnings
 
-import requests
-
 from . import config
 from .compat import UnicodeType
 from .data_structures import (
@@ -25,13 +23,15 @@ from .data_structures_entry import from_didl_string
 from .exceptions import (
     SoCoSlaveException, SoCoUPnPException, NotSupportedException,
 )
-from .groups import ZoneGroup
 from .music_library import MusicLibrary
 from .services import (
     DeviceProperties, ContentDirectory, RenderingControl, AVTransport,
     ZoneGroupTopology, AlarmClock, SystemProperties, MusicServices,
+    GroupRenderingControl,
     zone_group_state_shared_cache,
 )
+from .session import HttpSession
+from . import topology
 from .utils import (
     really_utf8, camel_to_underscore, deprecated
 )
@@ -200,6 +200,9 @@ class SoCo(_SocoSingletonBase):
         #: The speaker's ip address
         self.ip_address = ip_address
         self.speaker_info = {}  # Stores information about the current speaker
+        #: `HttpSession`: The pooled keep-alive HTTP session shared by all
+        #: services and subscriptions of this speaker
+        self.http_session = HttpSession()
 
         # The services which we use
         # pylint: disable=invalid-name
@@ -207,6 +210,7 @@ class SoCo(_SocoSingletonBase):
         self.contentDirectory = ContentDirectory(self)
         self.deviceProperties = DeviceProperties(self)
         self.renderingControl = RenderingControl(self)
+        self.groupRenderingControl = GroupRenderingControl(self)
         self.zoneGroupTopology = ZoneGroupTopology(self)
         self.alarmClock = AlarmClock(self)
         self.systemProperties = SystemProperties(self)
@@ -223,7 +227,8 @@ class SoCo(_SocoSingletonBase):
         self._uid = None
         self._household_id = None
         self._visible_zones = set()
-        self._zgs_cache = None
+        self._group_by_uid = {}
+        self._topology = None
 
         _LOG.debug("Created SoCo instance for ip: %s", ip_address)
 
@@ -831,83 +836,41 @@ class SoCo(_SocoSingletonBase):
 # </ZoneGroups>
 #
 
-        def parse_zone_group_member(member_element):
-            """Parse a ZoneGroupMember or Satellite element from Zone Group
-            State, create a SoCo instance for the member, set basic attributes
-            and return it."""
-            # Create a SoCo instance for each member. Because SoCo
-            # instances are singletons, this is cheap if they have already
-            # been created, and useful if they haven't. We can then
-            # update various properties for that instance.
-            member_attribs = member_element.attrib
-            ip_addr = member_attribs['Location'].\
-                split('//')[1].split(':')[0]
-            zone = config.SOCO_CLASS(ip_addr)
-            # uid doesn't change, but it's not harmful to (re)set it, in case
-            # the zone is as yet unseen.
-            zone._uid = member_attribs['UUID']
-            zone._player_name = member_attribs['ZoneName']
-            # add the zone to the set of all members, and to the set
-            # of visible members if appropriate
-            is_visible = False if member_attribs.get(
-                'Invisible') == '1' else True
-            if is_visible:
-                self._visible_zones.add(zone)
-            self._all_zones.add(zone)
-            return zone
-
         # This is called quite frequently, so it is worth optimising it.
-        # Maintain a private cache. If the zgt has not changed, there is no
-        # need to repeat all the XML parsing. In addition, switch on network
-        # caching for a short interval (5 secs).
-        zgs = self.zoneGroupTopology.GetZoneGroupState(
-            cache_timeout=5)['ZoneGroupState']
-        if zgs == self._zgs_cache:
+        # The zone group state is parsed only once per change into a
+        # topology model shared by all SoCo instances (see soco.topology).
+        # A topology received by a ZoneGroupTopology event is used without
+        # any request, otherwise network caching is switched on for a short
+        # interval (5 secs).
+        model = topology.evented(self._uid) if self._uid else None
+        if model is None:
+            zgs = self.zoneGroupTopology.GetZoneGroupState(
+                cache_timeout=5)['ZoneGroupState']
+            if self._topology is not None and \
+                    zgs == self._topology.zone_group_state:
+                return
+            model = topology.parse(zgs)
+        if model is self._topology:
             return
-        self._zgs_cache = zgs
-        tree = XML.fromstring(zgs.encode('utf-8'))
-        # Empty the set of all zone_groups
-        self._groups.clear()
-        # and the set of all members
-        self._all_zones.clear()
-        self._visible_zones.clear()
-        # Loop over each ZoneGroup Element
-        for group_element in tree.findall('ZoneGroup'):
-            coordinator_uid = group_element.attrib['Coordinator']
-            group_uid = group_element.attrib['ID']
-            group_coordinator = None
-            members = set()
-            for member_element in group_element.findall('ZoneGroupMember'):
-                zone = parse_zone_group_member(member_element)
-                # Perform extra processing relevant to direct zone group
-                # members
-                #
-                # If this element has the same UUID as the coordinator, it is
-                # the coordinator
-                if zone._uid == coordinator_uid:
-                    group_coordinator = zone
-                    zone._is_coordinator = True
-                else:
-                    zone._is_coordinator = False
-                # is_bridge doesn't change, but it does no real harm to
-                # set/reset it here, just in case the zone has not been seen
-                # before
-                zone._is_bridge = True if member_element.attrib.get(
-                    'IsZoneBridge') == '1' else False
-                # add the zone to the members for this group
-                members.add(zone)
-                # Loop over Satellite elements if present, and process as for
-                # ZoneGroup elements
-                for satellite_element in member_element.findall('Satellite'):
-                    zone = parse_zone_group_member(satellite_element)
-                    # Assume a satellite can't be a bridge or coordinator, so
-                    # no need to check.
-                    #
-                    # Add the zone to the members for this group.
-                    members.add(zone)
-                # Now create a ZoneGroup with this info and add it to the list
-                # of groups
-            self._groups.add(ZoneGroup(group_uid, group_coordinator, members))
+        self._topology = model
+        self._groups, self._all_zones, self._visible_zones, \
+            self._group_by_uid = model.zone_groups()
+        member = model.member(uid=self._uid, ip_address=self.ip_address)
+        if member is not None:
+            self._uid = member.uid
+            self._player_name = member.player_name
+            self._is_bridge = member.is_bridge
+            self._is_coordinator = member.is_coordinator
+
+    @property
+    def topology(self):
+        """`soco.topology.Topology`: The zone group topology of the household.
+
+        Provides lookups of the coordinator, group members and visibility of
+        all zones by uid.
+        """
+        self._parse_zone_group_state()
+        return self._topology
 
     @property
     def all_groups(self):
@@ -922,10 +885,8 @@ class SoCo(_SocoSingletonBase):
         group will be None if this zone is a slave in a stereo pair.
         """
 
-        for group in self.all_groups:
-            if self in group:
-                return group
-        return None
+        self._parse_zone_group_state()
+        return self._group_by_uid.get(self._uid)
 
         # To get the group directly from the network, try the code below
         # though it is probably slower than that above
@@ -978,6 +939,7 @@ class SoCo(_SocoSingletonBase):
             ('CurrentURIMetaData', '')
         ])
         zone_group_state_shared_cache.clear()
+        topology.clear()
         self._parse_zone_group_state()
 
     def unjoin(self):
@@ -997,6 +959,7 @@ class SoCo(_SocoSingletonBase):
             ('InstanceID', 0)
         ])
         zone_group_state_shared_cache.clear()
+        topology.clear()
         self._parse_zone_group_state()
 
     def switch_to_line_in(self):
@@ -1198,9 +1161,9 @@ class SoCo(_SocoSingletonBase):
         if self.speaker_info and refresh is False:
             return self.speaker_info
         else:
-            response = requests.get('http://' + self.ip_address +
-                                    ':1400/xml/device_description.xml',
-                                    timeout=timeout)
+            response = self.http_session.get(
+                'http://' + self.ip_address +
+                ':1400/xml/device_description.xml', timeout=timeout)
             dom = XML.fromstring(response.content)
 
         device = dom.find('{urn:schemas-upnp-org:device-1-0}device')
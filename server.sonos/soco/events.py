@@ -5,11 +5,18 @@
 from __future__ import unicode_literals
 
 import atexit
+import heapq
+import itertools
 import logging
+import random
+import selectors
 import socket
 import threading
 import time
 import weakref
+from collections import deque
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
@@ -33,15 +40,16 @@ def parse_event_xml(xml_event):
             with utf-8.
 
     Returns:
-        dict: A dict with keys representing the evented variables. The
-            relevant value will usually be a string representation of the
+        EventVariables: A dict with keys representing the evented variables.
+            The relevant value will usually be a string representation of the
             variable's value, but may on occasion be:
 
             * a dict (eg when the volume changes, the value will itself be a
               dict containing the volume for each channel:
               :code:`{'Volume': {'LF': '100', 'RF': '100', 'Master': '36'}}`)
             * an instance of a `DidlObject` subclass (eg if it represents
-              track metadata).
+              track metadata). The DIDL metadata is converted on first
+              access, see `EventVariables`.
 
     Example:
 
@@ -81,19 +89,20 @@ def parse_event_xml(xml_event):
                     break
     """
 
-    result = {}
+    result = EventVariables()
     tree = XML.fromstring(xml_event)
     # property values are just under the propertyset, which
     # uses this namespace
-    properties = tree.findall(
-        '{urn:schemas-upnp-org:event-1-0}property')
-    for prop in properties:
+    for prop in tree:
+        if prop.tag != _PROPERTY_TAG:
+            continue
         for variable in prop:
             # Special handling for a LastChange event specially. For details on
             # LastChange events, see
             # http://upnp.org/specs/av/UPnP-av-RenderingControl-v1-Service.pdf
             # and http://upnp.org/specs/av/UPnP-av-AVTransport-v1-Service.pdf
             if variable.tag == "LastChange":
+                # The LastChange value is an escaped XML document of its own
                 last_change_tree = XML.fromstring(
                     variable.text.encode('utf-8'))
                 # We assume there is only one InstanceID tag. This is true for
@@ -108,12 +117,8 @@ def parse_event_xml(xml_event):
                         "{urn:schemas-upnp-org:metadata-1-0/RCS/}InstanceID")
                 # Look at each variable within the LastChange event
                 for last_change_var in instance:
-                    tag = last_change_var.tag
-                    # Remove any namespaces from the tags
-                    if tag.startswith('{'):
-                        tag = tag.split('}', 1)[1]
-                    # Un-camel case it
-                    tag = camel_to_underscore(tag)
+                    # Remove any namespaces from the tags and un-camel case it
+                    tag = _variable_name(last_change_var.tag)
                     # Now extract the relevant value for the variable.
                     # The UPnP specs suggest that the value of any variable
                     # evented via a LastChange Event will be in the 'val'
@@ -124,10 +129,10 @@ def parse_event_xml(xml_event):
                     value = last_change_var.get('val')
                     if value is None:
                         value = last_change_var.text
-                    # If DIDL metadata is returned, convert it to a music
-                    # library data structure
+                    # If DIDL metadata is returned, it is converted to a music
+                    # library data structure on first access
                     if value.startswith('<DIDL-Lite'):
-                        value = from_didl_string(value)[0]
+                        value = LazyDidl(value)
                     channel = last_change_var.get('channel')
                     if channel is not None:
                         if result.get(tag) is None:
@@ -136,10 +141,73 @@ def parse_event_xml(xml_event):
                     else:
                         result[tag] = value
             else:
-                result[camel_to_underscore(variable.tag)] = variable.text
+                result[_variable_name(variable.tag)] = variable.text
     return result
 
 
+_PROPERTY_TAG = '{urn:schemas-upnp-org:event-1-0}property'
+
+
+def _variable_name(tag):
+    """Return the un-camel cased variable name of a tag without namespace."""
+    if tag.startswith('{'):
+        tag = tag.split('}', 1)[1]
+    return camel_to_underscore(tag)
+
+
+class LazyDidl(object):
+    """The undecoded DIDL metadata of an evented variable.
+
+    Converting DIDL metadata into a `DidlObject` is expensive and most of the
+    metadata is never looked at, so it is only converted when the variable is
+    accessed through `EventVariables`.
+    """
+
+    __slots__ = ('didl_string',)
+
+    def __init__(self, didl_string):
+        #: `str`: the DIDL-Lite metadata
+        self.didl_string = didl_string
+
+    def decode(self):
+        """Return the first `DidlObject` of the metadata."""
+        return from_didl_string(self.didl_string)[0]
+
+    def __repr__(self):
+        return '<LazyDidl %.40s (CUT)>' % self.didl_string
+
+
+class EventVariables(dict):
+    """A dict of evented variables.
+
+    `LazyDidl` values are converted into `DidlObject` instances (and stored)
+    on first access, so the dict behaves as if they had been converted while
+    parsing the event.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyDidl):
+            value = value.decode()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def copy(self):
+        return EventVariables(self)
+
+
 class Event(object):
     """A read-only object representing a received event.
 
@@ -195,13 +263,179 @@ class Event(object):
         raise TypeError('Event object does not support attribute assignment')
 
 
-class EventServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    """A TCP server which handles each new request in a new thread."""
+class EventServer(socketserver.TCPServer):
+    """A TCP server which handles the requests on a bounded thread pool.
+
+    Connections are kept alive (HTTP/1.1). Between two requests, a connection
+    does not occupy a worker: idle connections are watched by a selector and
+    only handed to the pool when the next request arrives. Idle connections
+    are closed after `config.EVENT_LISTENER_KEEP_ALIVE` seconds.
+    """
     allow_reuse_address = True
+    # all speakers of a household may connect at once
+    request_queue_size = 64
+
+    def __init__(self, server_address, RequestHandlerClass, workers=None):
+        socketserver.TCPServer.__init__(self, server_address,
+                                        RequestHandlerClass)
+        self.workers = workers or config.EVENT_LISTENER_WORKERS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='EventServer')
+        self._selector = selectors.DefaultSelector()
+        # idle connection -> (handler, client address, idle since)
+        self._idle = {}
+        self._returned = deque()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._stats_lock = threading.Lock()
+        self._connections = 0
+        self._closed = 0
+        self._requests = 0
+        self._busy = 0
+        self._queue_delay = 0.0
+        self._max_queue_delay = 0.0
+        self._handler_time = 0.0
+        self._max_handler_time = 0.0
+
+    def serve(self, stop_flag):
+        """Handle requests until ``stop_flag`` is set."""
+        selector = self._selector
+        selector.register(self.socket, selectors.EVENT_READ)
+        selector.register(self._wakeup_r, selectors.EVENT_READ)
+        try:
+            while not stop_flag.is_set():
+                for key, _ in selector.select(timeout=1):
+                    sock = key.fileobj
+                    if sock is self.socket:
+                        try:
+                            conn, client_address = self.get_request()
+                        except OSError:
+                            continue
+                        with self._stats_lock:
+                            self._connections += 1
+                        self._dispatch(conn, client_address, None)
+                    elif sock is self._wakeup_r:
+                        self._wakeup_r.recv(4096)
+                    else:
+                        selector.unregister(sock)
+                        handler, client_address, _ = self._idle.pop(sock)
+                        self._dispatch(sock, client_address, handler)
+
+                now = time.monotonic()
+                while self._returned:
+                    conn, client_address, handler = self._returned.popleft()
+                    self._idle[conn] = (handler, client_address, now)
+                    selector.register(conn, selectors.EVENT_READ)
+                for conn, (handler, _, since) in list(self._idle.items()):
+                    if now - since > config.EVENT_LISTENER_KEEP_ALIVE:
+                        selector.unregister(conn)
+                        del self._idle[conn]
+                        self._close(conn, handler)
+        finally:
+            for conn, (handler, _, _) in self._idle.items():
+                self._close(conn, handler)
+            self._idle.clear()
+            selector.close()
+            self._executor.shutdown(wait=False)
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+            self.server_close()
+
+    def _dispatch(self, conn, client_address, handler):
+        with self._stats_lock:
+            self._busy += 1
+        try:
+            self._executor.submit(self._process, conn, client_address,
+                                  handler, time.monotonic())
+        except RuntimeError:
+            # the pool has been shut down at interpreter exit
+            with self._stats_lock:
+                self._busy -= 1
+            self._close(conn, handler)
+
+    def _process(self, conn, client_address, handler, ready):
+        start = time.monotonic()
+        try:
+            if handler is None:
+                # handles the first request of the connection
+                handler = self.RequestHandlerClass(conn, client_address, self)
+            else:
+                handler.handle_one_request()
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(conn, client_address)
+            handler = None
+        end = time.monotonic()
+
+        with self._stats_lock:
+            self._busy -= 1
+            self._requests += 1
+            self._queue_delay += start - ready
+            self._handler_time += end - start
+            self._max_queue_delay = max(self._max_queue_delay, start - ready)
+            self._max_handler_time = max(self._max_handler_time, end - start)
+
+        if handler is None or handler.close_connection:
+            self._close(conn, handler)
+        else:
+            # wait for the next request of the connection
+            self._returned.append((conn, client_address, handler))
+            try:
+                self._wakeup_w.send(b'x')
+            except OSError:
+                self._close(conn, handler)
+
+    def _close(self, conn, handler):
+        with self._stats_lock:
+            self._closed += 1
+        if handler is not None:
+            try:
+                socketserver.StreamRequestHandler.finish(handler)
+            except OSError:
+                pass
+        self.shutdown_request(conn)
+
+    @property
+    def stats(self):
+        """`dict`: connection and request counters, queueing delay (time
+        from the arrival of a request until a worker picks it up) and handler
+        time in seconds. ``connections`` counts the accepted connections,
+        ``open_connections`` the connections not closed yet."""
+        with self._stats_lock:
+            requests = self._requests
+            return {
+                'workers': self.workers,
+                'connections': self._connections,
+                'open_connections': self._connections - self._closed,
+                'idle_connections': len(self._idle),
+                'requests': requests,
+                'busy': self._busy,
+                'queue_delay': self._queue_delay,
+                'handler_time': self._handler_time,
+                'avg_queue_delay': self._queue_delay / requests
+                if requests else 0,
+                'max_queue_delay': self._max_queue_delay,
+                'avg_handler_time': self._handler_time / requests
+                if requests else 0,
+                'max_handler_time': self._max_handler_time,
+            }
 
 
 class EventNotifyHandler(BaseHTTPRequestHandler):
-    """Handles HTTP ``NOTIFY`` Verbs sent to the listener server."""
+    """Handles HTTP ``NOTIFY`` Verbs sent to the listener server.
+
+    Every call of `handle` serves a single request, the `EventServer` waits
+    for the next request of a keep-alive connection.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    # a request must not block a worker of the event server forever
+    timeout = 10
+
+    def handle(self):
+        self.handle_one_request()
+
+    def finish(self):
+        # the connection is closed by the event server
+        pass
 
     def do_NOTIFY(self):  # pylint: disable=invalid-name
         """Serve a ``NOTIFY`` request.
@@ -211,37 +445,21 @@ class EventNotifyHandler(BaseHTTPRequestHandler):
         <http://upnp.org/specs/arch/UPnP-arch
         -DeviceArchitecture-v1.1.pdf>`_  for details.
         """
+        start = time.monotonic()
         timestamp = time.time()
         headers = requests.structures.CaseInsensitiveDict(self.headers)
         seq = headers['seq']  # Event sequence number
         sid = headers['sid']  # Event Subscription Identifier
         content_length = int(headers['content-length'])
         content = self.rfile.read(content_length)
-        # find the relevant service from the sid
-        with _sid_to_service_lock:
-            service = _sid_to_service.get(sid)
-        # It might have been removed by another thread
-        if service:
-            log.info(
-                "Event %s received for %s service on thread %s at %s", seq,
-                service.service_id, threading.current_thread(), timestamp)
-            log.debug("Event content: %s", content)
-            variables = parse_event_xml(content)
-            # Build the Event object
-            event = Event(sid, seq, service, timestamp, variables)
-            # pass the event details on to the service so it can update its
-            # cache.
-            # pylint: disable=protected-access
-            service._update_cache_on_event(event)
-            # Find the right queue, and put the event on it
-            with _sid_to_event_queue_lock:
-                try:
-                    _sid_to_event_queue[sid].put(event)
-                except KeyError:  # The key have been deleted in another thread
-                    pass
-        else:
-            log.info("No service registered for %s", sid)
+        # Sonos devices wait for the response before they send the next
+        # event, which may be served by another worker. Queue the event
+        # before the reply, so the next one is always queued behind it, and
+        # leave the decoding to the event decoder.
+        event_decoder.submit(sid, seq, content, timestamp,
+                             time.monotonic() - start)
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
     def log_message(self, fmt, *args):
@@ -249,6 +467,210 @@ class EventNotifyHandler(BaseHTTPRequestHandler):
         log.debug(fmt, *args)
 
 
+class EventDecoder(object):
+    """Decodes the received events outside of the event server.
+
+    The events are sharded by subscription over a few decoder threads (see
+    `config.EVENT_DECODER_WORKERS`), so the events of a subscription are
+    decoded in order. An event arriving ahead of its sequence number is held
+    back until the missing events arrive, at most for
+    `config.EVENT_REORDER_WINDOW` seconds. An event arriving behind its
+    sequence number, e.g. after its gap has been given up, is outdated and
+    dropped.
+    """
+
+    def __init__(self):
+        self._shards = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._received = 0
+        self._decoded = 0
+        self._held = 0
+        self._gaps = 0
+        self._stale = 0
+        self._receive_time = 0.0
+        self._max_receive_time = 0.0
+        self._decode_delay = 0.0
+        self._max_decode_delay = 0.0
+        self._decode_time = 0.0
+        self._max_decode_time = 0.0
+
+    def submit(self, sid, seq, content, timestamp, receive_time):
+        """Queue a received event for decoding.
+
+        Args:
+            sid (str): the subscription id
+            seq (str): the event sequence number
+            content (bytes): the body of the ``NOTIFY`` request
+            timestamp (float): the time the event was received
+            receive_time (float): seconds spent to receive the event
+        """
+        if self._shards is None:
+            with self._lock:
+                if self._shards is None:
+                    shards = []
+                    for index in range(config.EVENT_DECODER_WORKERS):
+                        shard = Queue()
+                        thread = threading.Thread(
+                            target=self._run, args=(shard,),
+                            name='EventDecoder_{0}'.format(index))
+                        thread.daemon = True
+                        thread.start()
+                        shards.append(shard)
+                    self._shards = shards
+        with self._stats_lock:
+            self._received += 1
+            self._receive_time += receive_time
+            self._max_receive_time = max(self._max_receive_time,
+                                         receive_time)
+        self._shards[hash(sid) % len(self._shards)].put(
+            (sid, seq, content, timestamp, time.monotonic()))
+
+    def _run(self, shard):
+        # next expected sequence number by sid
+        expected = {}
+        # events held back by sid, heap of (sequence number, event)
+        held = {}
+        deadlines = {}
+        while True:
+            timeout = None
+            if deadlines:
+                timeout = max(0, min(deadlines.values()) - time.monotonic())
+            try:
+                item = shard.get(timeout=timeout)
+            except Empty:
+                item = None
+
+            if item is not None:
+                sid = item[0]
+                try:
+                    number = int(item[1])
+                except (TypeError, ValueError):
+                    number = None
+                next_number = expected.get(sid)
+                if number is not None and next_number is not None and \
+                        number > next_number:
+                    heapq.heappush(held.setdefault(sid, []), (number, item))
+                    deadlines.setdefault(
+                        sid, time.monotonic() + config.EVENT_REORDER_WINDOW)
+                    with self._stats_lock:
+                        self._held += 1
+                    continue
+                if number is not None and next_number is not None and \
+                        number < next_number:
+                    log.debug("Dropping outdated event %s of %s", number, sid)
+                    with self._stats_lock:
+                        self._stale += 1
+                    continue
+                self._decode(*item)
+                if number is not None:
+                    expected[sid] = number + 1
+                else:
+                    expected.pop(sid, None)
+                if sid in held:
+                    self._release(sid, expected, held, deadlines, False)
+                if len(expected) > 1024:
+                    # forget subscriptions which have been unsubscribed
+                    with _sid_to_service_lock:
+                        for old_sid in list(expected):
+                            if old_sid not in _sid_to_service and \
+                                    old_sid not in held:
+                                del expected[old_sid]
+
+            now = time.monotonic()
+            for sid, deadline in list(deadlines.items()):
+                if deadline <= now:
+                    self._release(sid, expected, held, deadlines, True)
+
+    def _release(self, sid, expected, held, deadlines, expired):
+        """Decode the held events of a subscription which are next in
+        sequence, or all of them if the reorder window has expired."""
+        events = held[sid]
+        if expired and events:
+            with self._stats_lock:
+                self._gaps += 1
+            # the lost events may have changed primed results
+            with _sid_to_service_lock:
+                service = _sid_to_service.get(sid)
+            if service is not None:
+                # pylint: disable=protected-access
+                service._invalidate_event_cache()
+        while events and (expired or events[0][0] <= expected[sid]):
+            number, item = heapq.heappop(events)
+            self._decode(*item)
+            expected[sid] = max(expected[sid], number + 1)
+        if not events:
+            del held[sid]
+            deadlines.pop(sid, None)
+
+    def _decode(self, sid, seq, content, timestamp, queued):
+        start = time.monotonic()
+        try:
+            # find the relevant service from the sid
+            with _sid_to_service_lock:
+                service = _sid_to_service.get(sid)
+            # It might have been removed by another thread
+            if service:
+                log.info(
+                    "Event %s received for %s service at %s", seq,
+                    service.service_id, timestamp)
+                log.debug("Event content: %s", content)
+                variables = parse_event_xml(content)
+                # Build the Event object
+                event = Event(sid, seq, service, timestamp, variables)
+                # pass the event details on to the service so it can update
+                # its cache.
+                # pylint: disable=protected-access
+                service._update_cache_on_event(event)
+                # Find the right queue, and put the event on it
+                with _sid_to_event_queue_lock:
+                    try:
+                        _sid_to_event_queue[sid].put(event)
+                    except KeyError:  # The key have been deleted
+                        pass
+            else:
+                log.info("No service registered for %s", sid)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Could not decode event %s of %s", seq, sid)
+        end = time.monotonic()
+        with self._stats_lock:
+            self._decoded += 1
+            self._decode_delay += start - queued
+            self._decode_time += end - start
+            self._max_decode_delay = max(self._max_decode_delay,
+                                         start - queued)
+            self._max_decode_time = max(self._max_decode_time, end - start)
+
+    @property
+    def stats(self):
+        """`dict`: event counters, the time to receive and acknowledge an
+        event, the delay until its decoding starts and the decode time in
+        seconds. ``held`` counts events received ahead of their sequence
+        number, ``gaps`` the missing sequence numbers given up after
+        `config.EVENT_REORDER_WINDOW` and ``stale`` the events dropped
+        because they arrived behind their sequence number."""
+        shards = self._shards or []
+        with self._stats_lock:
+            received, decoded = self._received, self._decoded
+            return {
+                'received': received,
+                'decoded': decoded,
+                'queued': sum(shard.qsize() for shard in shards),
+                'held': self._held,
+                'gaps': self._gaps,
+                'stale': self._stale,
+                'avg_receive_time': self._receive_time / received
+                if received else 0,
+                'max_receive_time': self._max_receive_time,
+                'avg_decode_delay': self._decode_delay / decoded
+                if decoded else 0,
+                'max_decode_delay': self._max_decode_delay,
+                'avg_decode_time': self._decode_time / decoded
+                if decoded else 0,
+                'max_decode_time': self._max_decode_time,
+            }
+
+
 class EventServerThread(threading.Thread):
     """The thread in which the event listener server will run."""
 
@@ -264,6 +686,7 @@ class EventServerThread(threading.Thread):
         #: `tuple`: The (ip, port) address on which the server is
         #: configured to listen.
         self.address = address
+        self.server = None
 
     def run(self):
         """Start the server on the local IP at port 1400 (default).
@@ -272,10 +695,11 @@ class EventServerThread(threading.Thread):
         `EventNotifyHandler` class.
         """
         listener = EventServer(self.address, EventNotifyHandler)
+        #: `EventServer`: the running server
+        self.server = listener
         log.info("Event listener running on %s", listener.server_address)
         # Listen for events until told to stop
-        while not self.stop_flag.is_set():
-            listener.handle_request()
+        listener.serve(self.stop_flag)
 
 
 class EventListener(object):
@@ -337,6 +761,15 @@ class EventListener(object):
                 self.is_running = True
                 log.info("Event listener started")
 
+    @property
+    def stats(self):
+        """`dict`: The counters of the event server, see `EventServer.stats`.
+        """
+        thread = self._listener_thread
+        if thread is None or thread.server is None:
+            return {}
+        return thread.server.stats
+
     def stop(self):
         """Stop the event listener."""
         # Signal the thread to stop before handling the next request
@@ -355,6 +788,138 @@ class EventListener(object):
         log.info("Event listener stopped")
 
 
+class RenewalScheduler(object):
+    """Renews all auto-renewed subscriptions from a single timer thread.
+
+    Due renewals are kept in a heap ordered by their due time. The renewal
+    requests are sent by a small thread pool (see
+    `config.EVENT_RENEWAL_WORKERS`), so a slow speaker does not delay the
+    renewals of other speakers. Failed renewals are retried with an
+    exponential backoff until the subscription expires.
+
+    Other delayed calls can be scheduled with `call_later`.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._random = random.Random()
+        #: `int`: The number of successful renewals
+        self.renewals = 0
+        #: `int`: The number of failed renewals
+        self.failures = 0
+
+    def call_later(self, delay, callback, *args):
+        """Call ``callback(*args)`` after ``delay`` seconds on the renewal
+        thread pool."""
+        due = time.monotonic() + delay
+        with self._cond:
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=config.EVENT_RENEWAL_WORKERS,
+                    thread_name_prefix='EventRenewal')
+                self._thread = threading.Thread(
+                    target=self._run, name='EventRenewalScheduler')
+                self._thread.daemon = True
+                self._thread.start()
+            heapq.heappush(self._heap, (due, next(self._counter), callback,
+                                        args))
+            if self._heap[0][0] == due:
+                self._cond.notify()
+        return due
+
+    def schedule(self, subscription, delay=None):
+        """Schedule the renewal of a subscription.
+
+        Args:
+            subscription (Subscription): the subscription to be renewed
+            delay (float, optional): seconds until the renewal. If `None`,
+                the renewal is due shortly before the subscription expires,
+                spread randomly by `config.EVENT_RENEWAL_JITTER`.
+        """
+        if subscription.timeout is None:
+            # infinite subscriptions are never renewed
+            return
+        if delay is None:
+            interval = subscription.timeout * config.EVENT_RENEWAL_FRACTION
+            delay = interval * (
+                1 - self._random.uniform(0, config.EVENT_RENEWAL_JITTER))
+        token = object()
+        subscription._renewal_token = token
+        subscription._renewal_due = self.call_later(
+            delay, self._renew, subscription, token)
+
+    def _renew(self, subscription, token):
+        # pylint: disable=protected-access
+        if subscription._renewal_token is not token:
+            # cancelled or rescheduled
+            return
+        log.info("Autorenewing subscription %s", subscription.sid)
+        try:
+            subscription.renew()
+        except Exception as exc:  # pylint: disable=broad-except
+            with self._cond:
+                self.failures += 1
+            subscription.renew_failures += 1
+            subscription.last_error = str(exc)
+            # events may not arrive any more
+            subscription.service._invalidate_event_cache()
+            if subscription._renewal_token is not token:
+                return
+            time_left = subscription.time_left
+            if not time_left:
+                log.warning("Subscription %s expired, renewal failed: %s",
+                            subscription.sid, exc)
+                subscription._renewal_due = None
+                return
+            delay = min(config.EVENT_RENEWAL_RETRY_MAX,
+                        config.EVENT_RENEWAL_RETRY_MIN * 2 ** (
+                            subscription.renew_failures - 1),
+                        max(1, time_left / 2))
+            log.warning("Renewal of subscription %s failed (%s), retry in "
+                        "%.0f seconds", subscription.sid, exc, delay)
+            self.schedule(subscription, delay)
+            return
+        with self._cond:
+            self.renewals += 1
+        subscription.renew_failures = 0
+        subscription.last_error = None
+        if subscription._renewal_token is token:
+            self.schedule(subscription)
+
+    @staticmethod
+    def cancel(subscription):
+        """Cancel the scheduled renewal of a subscription."""
+        # pylint: disable=protected-access
+        subscription._renewal_token = None
+        subscription._renewal_due = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or \
+                        self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() \
+                        if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, callback, args = heapq.heappop(self._heap)
+            try:
+                self._executor.submit(callback, *args)
+            except RuntimeError:
+                # interpreter shutdown
+                return
+
+    @property
+    def stats(self):
+        """`dict`: pending calls, renewals and failures."""
+        with self._cond:
+            return {'scheduled': len(self._heap), 'renewals': self.renewals,
+                    'failures': self.failures}
+
+
 class Subscription(object):
     """A class representing the subscription to a UPnP event."""
     # pylint: disable=too-many-instance-attributes
@@ -386,9 +951,13 @@ class Subscription(object):
         self._has_been_unsubscribed = False
         # The time when the subscription was made
         self._timestamp = None
-        # Used to keep track of the auto_renew thread
-        self._auto_renew_thread = None
-        self._auto_renew_thread_flag = threading.Event()
+        #: `int`: The number of consecutive failed renewals
+        self.renew_failures = 0
+        #: `str`: The error of the last failed renewal
+        self.last_error = None
+        # Used by the renewal scheduler
+        self._renewal_token = None
+        self._renewal_due = None
 
     def subscribe(self, requested_timeout=None, auto_renew=False):
         """Subscribe to the service.
@@ -410,27 +979,6 @@ class Subscription(object):
                 automatically shortly before timeout. Default `False`.
         """
 
-        class AutoRenewThread(threading.Thread):
-            """Used by the auto_renew code to renew a subscription from within
-            a thread.
-
-            """
-
-            def __init__(self, interval, stop_flag, sub, *args, **kwargs):
-                super(AutoRenewThread, self).__init__(*args, **kwargs)
-                self.interval = interval
-                self.sub = sub
-                self.stop_flag = stop_flag
-                self.daemon = True
-
-            def run(self):
-                sub = self.sub
-                stop_flag = self.stop_flag
-                interval = self.interval
-                while not stop_flag.wait(interval):
-                    log.info("Autorenewing subscription %s", sub.sid)
-                    sub.renew()
-
         # TIMEOUT is provided for in the UPnP spec, but it is not clear if
         # Sonos pays any attention to it. A timeout of 86400 secs always seems
         # to be allocated
@@ -457,7 +1005,7 @@ class Subscription(object):
         }
         if requested_timeout is not None:
             headers["TIMEOUT"] = "Second-{0}".format(requested_timeout)
-        response = requests.request(
+        response = service.soco.http_session.request(
             'SUBSCRIBE', service.base_url + service.event_subscription_url,
             headers=headers)
         response.raise_for_status()
@@ -487,14 +1035,9 @@ class Subscription(object):
         # signal or fatal interpreter error - see the docs for `atexit`).
         atexit.register(self.unsubscribe)
 
-        # Set up auto_renew
-        if not auto_renew:
-            return
-        # Autorenew just before expiry, say at 85% of self.timeout seconds
-        interval = self.timeout * 85 / 100
-        auto_renew_thread = AutoRenewThread(
-            interval, self._auto_renew_thread_flag, self)
-        auto_renew_thread.start()
+        # Set up auto_renew, the renewal is due just before expiry
+        if auto_renew:
+            renewal_scheduler.schedule(self)
 
     def renew(self, requested_timeout=None):
         """Renew the event subscription.
@@ -531,7 +1074,7 @@ class Subscription(object):
             requested_timeout = self.requested_timeout
         if requested_timeout is not None:
             headers["TIMEOUT"] = "Second-{0}".format(requested_timeout)
-        response = requests.request(
+        response = self.service.soco.http_session.request(
             'SUBSCRIBE',
             self.service.base_url + self.service.event_subscription_url,
             headers=headers)
@@ -562,7 +1105,9 @@ class Subscription(object):
             return
 
         # Cancel any auto renew
-        self._auto_renew_thread_flag.set()
+        renewal_scheduler.cancel(self)
+        # pylint: disable=protected-access
+        self.service._invalidate_event_cache()
         # Send an unsubscribe request like this:
         # UNSUBSCRIBE publisher path HTTP/1.1
         # HOST: publisher host:publisher port
@@ -570,7 +1115,7 @@ class Subscription(object):
         headers = {
             'SID': self.sid
         }
-        response = requests.request(
+        response = self.service.soco.http_session.request(
             'UNSUBSCRIBE',
             self.service.base_url + self.service.event_subscription_url,
             headers=headers)
@@ -608,9 +1153,29 @@ class Subscription(object):
             time_left = self.timeout - (time.time() - self._timestamp)
             return time_left if time_left > 0 else 0
 
+    @property
+    def health(self):
+        """`dict`: The state of the subscription and its renewals.
+
+        ``next_renewal`` is the number of seconds until the next scheduled
+        renewal, `None` if no renewal is scheduled.
+        """
+        due = self._renewal_due
+        return {
+            'sid': self.sid,
+            'is_subscribed': self.is_subscribed,
+            'time_left': self.time_left if self.timeout is not None else None,
+            'next_renewal': max(0, due - time.monotonic())
+            if due is not None else None,
+            'renew_failures': self.renew_failures,
+            'last_error': self.last_error,
+        }
+
 
 # pylint: disable=C0103
 event_listener = EventListener()
+event_decoder = EventDecoder()
+renewal_scheduler = RenewalScheduler()
 
 # Thread safe mappings.
 # Used to store a mapping of sids to event queues
@@ -34,13 +34,14 @@ from __future__ import (
 )
 
 import logging
+import threading
+import time
 from collections import namedtuple
 from xml.sax.saxutils import escape
 
-import requests
-
+from . import config
 from .cache import Cache
-from .events import Subscription
+from .events import LazyDidl, Subscription
 from .exceptions import (
     SoCoUPnPException, UnknownSoCoException
 )
@@ -98,6 +99,13 @@ class Service(object):
             '</s:Body>'
         '</s:Envelope>')  # noqa PEP8
 
+    #: tuple: The actions whose results are primed from events, see
+    #: `_prime_cache`. Each item is a tuple of the action name, its
+    #: arguments, a dict mapping the result names to the evented variables
+    #: (as ``(variable, channel)`` tuples) and the names of the actions which
+    #: change the result.
+    evented_results = ()
+
     def __init__(self, soco):
         """
         Args:
@@ -130,6 +138,10 @@ class Service(object):
         #: A cache for storing the result of network calls. By default, this is
         #: a `TimedCache` with a default timeout=0.
         self.cache = Cache(default_timeout=0)
+        # The values of the variables in `evented_results`, as known from
+        # the events received so far
+        self._evented_values = {}
+        self._evented_lock = threading.Lock()
 
         # From table 3.3 in
         # http://upnp.org/specs/arch/UPnP-arch-DeviceArchitecture-v1.1.pdf
@@ -381,11 +393,15 @@ class Service(object):
         log.info("Sending %s %s to %s", action, args, self.soco.ip_address)
         log.debug("Sending %s, %s", headers, prettify(body))
         # Convert the body to bytes, and send it.
-        response = requests.post(
+        start = time.monotonic()
+        response = self.soco.http_session.post(
             self.base_url + self.control_url,
             headers=headers,
             data=body.encode('utf-8')
         )
+        if config.SOAP_REQUEST_CALLBACK is not None:
+            config.SOAP_REQUEST_CALLBACK(
+                self, action, time.monotonic() - start)
         log.debug("Received %s, %s", response.headers, response.text)
         status = response.status_code
         log.info(
@@ -399,6 +415,7 @@ class Service(object):
             # Store in the cache. There is no need to do this if there was an
             # error, since we would want to try a network call again.
             cache.put(result, action, args, timeout=cache_timeout)
+            self._update_cache_on_action(action, args)
             return result
         elif status == 500:
             # Internal server error. UPnP requires this to be returned if the
@@ -521,6 +538,79 @@ class Service(object):
         """
         pass
 
+    def _update_cache_on_action(self, action, args):
+        """Update the cache when an action has been sent successfully.
+
+        Actions which change the state of the Sonos device outdate the primed
+        results of the actions in `evented_results`, e.g. ``SetVolume``
+        outdates ``GetVolume``. They are dropped until the change is evented.
+        Actions which are not known to change only some of the results drop
+        all of them.
+
+        The evented values are kept: events only carry the changed variables,
+        so the values of the other variables are still needed to prime the
+        results again.
+
+        Args:
+            action (str): the name of the action.
+            args (list): the arguments of the action.
+        """
+        if not self.evented_results or action.startswith('Get'):
+            return
+        outdated = [item for item in self.evented_results
+                    if action in item[3]]
+        with self._evented_lock:
+            for outdated_action, outdated_args, _, _ in \
+                    outdated or self.evented_results:
+                self.cache.delete(outdated_action, outdated_args)
+
+    def _prime_cache(self, event):
+        """Put the results of the actions in `evented_results` into the
+        cache, as far as they are known from this and previous events.
+
+        The results are cached for `config.EVENT_CACHE_TIMEOUT` seconds.
+
+        Args:
+            event (Event): the received event.
+        """
+        variables = event.variables
+        with self._evented_lock:
+            values = self._evented_values
+            for action, args, results, _ in self.evented_results:
+                evented = False
+                for variable, channel in results.values():
+                    # dict.get does not convert DIDL metadata
+                    value = dict.get(variables, variable)
+                    if channel is not None and isinstance(value, dict):
+                        value = value.get(channel)
+                    if value is None or isinstance(value, dict):
+                        continue
+                    if isinstance(value, LazyDidl):
+                        value = value.didl_string
+                    values[(variable, channel)] = value
+                    evented = True
+                if not evented:
+                    continue
+                try:
+                    result = {name: values[variable]
+                              for name, variable in results.items()}
+                except KeyError:
+                    # not all results have been evented yet
+                    continue
+                self.cache.put(result, action, args,
+                               timeout=config.EVENT_CACHE_TIMEOUT)
+
+    def _invalidate_event_cache(self):
+        """Drop the results primed from events and the evented values.
+
+        Called when they may be outdated, e.g. if the subscription has ended
+        or events have been lost.
+        """
+        with self._evented_lock:
+            for action, args, _, _ in self.evented_results:
+                self.cache.delete(action, args)
+            self._evented_values.clear()
+
     def iter_actions(self):
         """Yield the service's actions with their arguments.
 
@@ -547,7 +637,8 @@ class Service(object):
         ns = '{urn:schemas-upnp-org:service-1-0}'
         # get the scpd body as bytes, and feed directly to elementtree
         # which likes to receive bytes
-        scpd_body = requests.get(self.base_url + self.scpd_url).content
+        scpd_body = self.soco.http_session.get(
+            self.base_url + self.scpd_url).content
         tree = XML.fromstring(scpd_body)
         # parse the state variables to get the relevant variable types
         vartypes = {}
@@ -589,7 +680,8 @@ class Service(object):
 
         # pylint: disable=invalid-name
         ns = '{urn:schemas-upnp-org:service-1-0}'
-        scpd_body = requests.get(self.base_url + self.scpd_url).text
+        scpd_body = self.soco.http_session.get(
+            self.base_url + self.scpd_url).text
         tree = XML.fromstring(scpd_body.encode('utf-8'))
         # parse the state variables to get the relevant variable types
         statevars = tree.findall('{0}stateVariable'.format(ns))
@@ -631,6 +723,23 @@ class DeviceProperties(Service):
     def __init__(self, soco):
         super(DeviceProperties, self).__init__(soco)
 
+    evented_results = (
+        ('GetZoneAttributes', None,
+         {'CurrentZoneName': ('zone_name', None),
+          'CurrentIcon': ('icon', None),
+          'CurrentConfiguration': ('configuration', None)},
+         ('SetZoneAttributes',)),
+        ('GetInvisible', None,
+         {'CurrentInvisible': ('invisible', None)}, ()),
+        ('GetLEDState', None,
+         {'CurrentLEDState': ('led_state', None)}, ('SetLEDState',)),
+    )
+
+    def _update_cache_on_event(self, event):
+        """Prime the cache with the evented zone attributes, visibility and
+        LED state."""
+        self._prime_cache(event)
+
 
 class SystemProperties(Service):
 
@@ -727,6 +836,32 @@ class RenderingControl(Service):
         self.control_url = "/MediaRenderer/RenderingControl/Control"
         self.event_subscription_url = "/MediaRenderer/RenderingControl/Event"
 
+    evented_results = (
+        ('GetVolume', [('InstanceID', 0), ('Channel', 'Master')],
+         {'CurrentVolume': ('volume', 'Master')},
+         ('SetVolume', 'SetRelativeVolume', 'SetVolumeDB', 'RampToVolume',
+          'RestoreVolumePriorToRamp')),
+        ('GetMute', [('InstanceID', 0), ('Channel', 'Master')],
+         {'CurrentMute': ('mute', 'Master')}, ('SetMute',)),
+        ('GetBass', [('InstanceID', 0), ('Channel', 'Master')],
+         {'CurrentBass': ('bass', None)}, ('SetBass',)),
+        ('GetTreble', [('InstanceID', 0), ('Channel', 'Master')],
+         {'CurrentTreble': ('treble', None)}, ('SetTreble',)),
+        ('GetLoudness', [('InstanceID', 0), ('Channel', 'Master')],
+         {'CurrentLoudness': ('loudness', 'Master')}, ('SetLoudness',)),
+        ('GetEQ', [('InstanceID', 0), ('EQType', 'NightMode')],
+         {'CurrentValue': ('night_mode', None)}, ('SetEQ',)),
+        ('GetEQ', [('InstanceID', 0), ('EQType', 'DialogLevel')],
+         {'CurrentValue': ('dialog_level', None)}, ('SetEQ',)),
+        ('GetOutputFixed', [('InstanceID', 0)],
+         {'CurrentFixed': ('output_fixed', None)}, ('SetOutputFixed',)),
+    )
+
+    def _update_cache_on_event(self, event):
+        """Prime the cache with the evented volume, mute state and EQ
+        settings."""
+        self._prime_cache(event)
+
 
 class MR_ConnectionManager(Service):  # pylint: disable=invalid-name
 
@@ -774,6 +909,35 @@ class AVTransport(Service):
             739: 'Server Error',
         })
 
+    evented_results = (
+        ('GetTransportInfo', [('InstanceID', 0)],
+         {'CurrentTransportState': ('transport_state', None),
+          'CurrentTransportStatus': ('transport_status', None),
+          'CurrentSpeed': ('transport_play_speed', None)}, ()),
+        ('GetTransportSettings', [('InstanceID', 0)],
+         {'PlayMode': ('current_play_mode', None),
+          'RecQualityMode': ('current_record_quality_mode', None)},
+         ('SetPlayMode',)),
+        ('GetCrossfadeMode', [('InstanceID', 0)],
+         {'CrossfadeMode': ('current_crossfade_mode', None)},
+         ('SetCrossfadeMode',)),
+        ('GetMediaInfo', [('InstanceID', 0)],
+         {'NrTracks': ('number_of_tracks', None),
+          'MediaDuration': ('current_media_duration', None),
+          'CurrentURI': ('av_transport_uri', None),
+          'CurrentURIMetaData': ('av_transport_uri_meta_data', None),
+          'NextURI': ('next_av_transport_uri', None),
+          'NextURIMetaData': ('next_av_transport_uri_meta_data', None),
+          'PlayMedium': ('playback_storage_medium', None),
+          'RecordMedium': ('record_storage_medium', None),
+          'WriteStatus': ('record_medium_write_status', None)}, ()),
+    )
+
+    def _update_cache_on_event(self, event):
+        """Prime the cache with the evented transport state, play mode, cross
+        fade mode and media info."""
+        self._prime_cache(event)
+
 
 class Queue(Service):
 
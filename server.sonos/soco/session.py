@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""Pooled keep-alive HTTP sessions for talking to Sonos devices.
+
+Every `SoCo` instance owns one `HttpSession`, which is shared by all of its
+`Service` instances and event `Subscription`s. Connections to port 1400 of
+the speaker are therefore kept alive and reused between UPnP calls instead
+of being opened and torn down for every single request.
+
+The pool can be tuned with the following variables in :mod:`soco.config`:
+
+* `config.REQUESTS_POOL_CONNECTIONS`
+* `config.REQUESTS_POOL_MAXSIZE`
+* `config.REQUESTS_POOL_BLOCK`
+* `config.REQUESTS_POOL_IDLE_TIMEOUT`
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import threading
+from time import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config
+
+log = logging.getLogger(__name__)  # pylint: disable=C0103
+
+
+class HttpSession(object):
+
+    """A thread-safe, pooled HTTP session for a single Sonos device.
+
+    The underlying `requests.Session` keeps its connections alive. If the
+    session has not been used for more than ``idle_timeout`` seconds, the
+    pooled connections are dropped before the next request is sent, since
+    Sonos devices close idle connections on their side anyway.
+
+    Example:
+
+        >>> session = HttpSession()
+        >>> response = session.get(
+        ...     'http://192.168.1.101:1400/xml/device_description.xml')
+        >>> session.close()
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None,
+                 pool_block=None, idle_timeout=None):
+        """
+        Args:
+            pool_connections (int, optional): The number of host pools to
+                keep. Defaults to `config.REQUESTS_POOL_CONNECTIONS`.
+            pool_maxsize (int, optional): The maximum number of connections
+                kept per host. Defaults to `config.REQUESTS_POOL_MAXSIZE`.
+            pool_block (bool, optional): If `True`, never open more than
+                ``pool_maxsize`` concurrent connections per host, but wait
+                for a free one. Defaults to `config.REQUESTS_POOL_BLOCK`.
+            idle_timeout (float, optional): Seconds after which idle pooled
+                connections are discarded. Defaults to
+                `config.REQUESTS_POOL_IDLE_TIMEOUT`.
+        """
+        super(HttpSession, self).__init__()
+        #: `int`: The number of host pools
+        self.pool_connections = pool_connections \
+            if pool_connections is not None \
+            else config.REQUESTS_POOL_CONNECTIONS
+        #: `int`: The maximum number of pooled connections per host
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None \
+            else config.REQUESTS_POOL_MAXSIZE
+        #: `bool`: Whether to block instead of exceeding the per host limit
+        self.pool_block = pool_block if pool_block is not None \
+            else config.REQUESTS_POOL_BLOCK
+        #: `float`: Seconds after which idle connections are discarded
+        self.idle_timeout = idle_timeout if idle_timeout is not None \
+            else config.REQUESTS_POOL_IDLE_TIMEOUT
+        self._lock = threading.Lock()
+        self._session = None
+        self._last_used = 0
+
+    def _new_session(self):
+        """Create a new `requests.Session` with a configured adapter."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _get_session(self):
+        """Return the current session, dropping idle connections first."""
+        now = time()
+        with self._lock:
+            if self._session is None:
+                self._session = self._new_session()
+            elif self.idle_timeout and \
+                    now - self._last_used > self.idle_timeout:
+                log.debug("Dropping idle connections after %.1fs",
+                          now - self._last_used)
+                for adapter in self._session.adapters.values():
+                    adapter.close()
+            self._last_used = now
+            return self._session
+
+    def request(self, method, url, **kwargs):
+        """Send a request using a pooled connection.
+
+        Args:
+            method (str): The HTTP method, eg ``'POST'`` or ``'SUBSCRIBE'``.
+            url (str): The URL.
+            **kwargs: Any further keyword arguments accepted by
+                `requests.Session.request`.
+
+        Returns:
+            `requests.Response`: The response.
+        """
+        return self._get_session().request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a ``GET`` request. See `request`."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a ``POST`` request. See `request`."""
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
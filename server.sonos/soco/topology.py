@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the shared model of the zone group topology.
+
+The zone group state of a household is the same for all of its speakers. A
+`Topology` is parsed only once per distinct zone group state string and shared
+by all `SoCo` instances, which look up their coordinator, group members and
+visibility in constant time.
+
+A topology received with a ZoneGroupTopology event (see `update`) is used by
+the `SoCo` instances of its members without any further GetZoneGroupState
+request, until `clear` is called.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+from collections import OrderedDict
+
+from . import config
+from .groups import ZoneGroup
+from .xml import XML
+
+#: The maximum number of parsed zone group states kept in memory
+MAX_MODELS = 8
+
+_lock = threading.Lock()
+_models = OrderedDict()
+_evented = {}
+
+
+class Member(object):
+
+    """A ZoneGroupMember or Satellite element of the zone group state."""
+
+    __slots__ = ('uid', 'ip_address', 'player_name', 'is_visible', 'is_bridge',
+                 'group_uid', 'coordinator_uid')
+
+    def __init__(self, element, group_uid, coordinator_uid):
+        attribs = element.attrib
+        self.uid = attribs['UUID']
+        self.ip_address = attribs['Location'].split('//')[1].split(':')[0]
+        self.player_name = attribs['ZoneName']
+        self.is_visible = attribs.get('Invisible') != '1'
+        self.is_bridge = attribs.get('IsZoneBridge') == '1'
+        self.group_uid = group_uid
+        self.coordinator_uid = coordinator_uid
+
+    @property
+    def is_coordinator(self):
+        """bool: True if the member is the coordinator of its group."""
+        return self.uid == self.coordinator_uid
+
+
+class Topology(object):
+
+    """The parsed zone group state of a household.
+
+    Instances are never changed after creation, a new zone group state results
+    in a new instance.
+    """
+
+    def __init__(self, zone_group_state):
+        """
+        Args:
+            zone_group_state (str): the ZoneGroupState of the
+                ZoneGroupTopology service.
+        """
+        self.zone_group_state = zone_group_state
+        #: dict of all members (including satellites) by uid
+        self.members = {}
+        #: dict of the member uids of every group by group uid
+        self.groups = OrderedDict()
+        self._by_ip = {}
+        self._zone_groups = None
+        self._zone_groups_lock = threading.Lock()
+
+        tree = XML.fromstring(zone_group_state.encode('utf-8'))
+        for group_element in tree.findall('ZoneGroup'):
+            group_uid = group_element.attrib['ID']
+            coordinator_uid = group_element.attrib['Coordinator']
+            uids = []
+            for member_element in group_element.findall('ZoneGroupMember'):
+                elements = [member_element]
+                elements.extend(member_element.findall('Satellite'))
+                for element in elements:
+                    member = Member(element, group_uid, coordinator_uid)
+                    # satellites are never bridges
+                    if element is not member_element:
+                        member.is_bridge = False
+                    self.members[member.uid] = member
+                    self._by_ip[member.ip_address] = member
+                    uids.append(member.uid)
+            self.groups[group_uid] = tuple(uids)
+
+    def member(self, uid=None, ip_address=None):
+        """Return the `Member` with the given uid or ip address, or `None`."""
+        if uid is not None:
+            return self.members.get(uid)
+        return self._by_ip.get(ip_address)
+
+    def coordinator(self, uid):
+        """Return the uid of the coordinator of the member's group."""
+        member = self.members.get(uid)
+        return member.coordinator_uid if member is not None else None
+
+    def group_members(self, uid):
+        """Return the uids of all members of the member's group."""
+        member = self.members.get(uid)
+        return self.groups[member.group_uid] if member is not None else ()
+
+    def is_visible(self, uid):
+        """Return True if the member is visible."""
+        member = self.members.get(uid)
+        return member is not None and member.is_visible
+
+    def zone_groups(self):
+        """Return the `SoCo` view of the topology.
+
+        The `SoCo` instances and `ZoneGroup` objects are only created once per
+        topology.
+
+        Returns:
+            tuple: (groups, all zones, visible zones, group by member uid)
+        """
+        with self._zone_groups_lock:
+            if self._zone_groups is None:
+                zones = {}
+                for member in self.members.values():
+                    # SoCo instances are singletons, this is cheap if they
+                    # have already been created
+                    zone = config.SOCO_CLASS(member.ip_address)
+                    zone._uid = member.uid
+                    zone._player_name = member.player_name
+                    zone._is_bridge = member.is_bridge
+                    zone._is_coordinator = member.is_coordinator
+                    zones[member.uid] = zone
+
+                groups = set()
+                group_by_uid = {}
+                for group_uid, uids in self.groups.items():
+                    coordinator = None
+                    for uid in uids:
+                        if self.members[uid].is_coordinator:
+                            coordinator = zones[uid]
+                    group = ZoneGroup(group_uid, coordinator,
+                                      [zones[uid] for uid in uids])
+                    groups.add(group)
+                    for uid in uids:
+                        group_by_uid[uid] = group
+
+                all_zones = frozenset(zones.values())
+                visible_zones = frozenset(
+                    zones[uid] for uid, member in self.members.items()
+                    if member.is_visible)
+                self._zone_groups = (frozenset(groups), all_zones,
+                                     visible_zones, group_by_uid)
+            return self._zone_groups
+
+
+def parse(zone_group_state):
+    """Return the `Topology` of a zone group state.
+
+    The zone group state is only parsed if it differs from the recently seen
+    states.
+    """
+    with _lock:
+        model = _models.get(zone_group_state)
+        if model is not None:
+            _models.move_to_end(zone_group_state)
+            return model
+    model = Topology(zone_group_state)
+    with _lock:
+        _models[zone_group_state] = model
+        while len(_models) > MAX_MODELS:
+            _models.popitem(last=False)
+    return model
+
+
+def update(zone_group_state):
+    """Register the zone group state of a ZoneGroupTopology event.
+
+    The `SoCo` instances of all members use this topology without sending a
+    GetZoneGroupState request.
+
+    Returns:
+        Topology: the parsed zone group state
+    """
+    model = parse(zone_group_state)
+    with _lock:
+        for uid in model.members:
+            _evented[uid] = model
+    return model
+
+
+def evented(uid):
+    """Return the topology received by an event for the uid, or `None`."""
+    return _evented.get(uid)
+
+
+def clear():
+    """Forget all topologies received by events."""
+    with _lock:
+        _evented.clear()
@@ -66,20 +66,33 @@ def really_utf8(in_string):
 FIRST_CAP_RE = re.compile('(.)([A-Z][a-z]+)')
 ALL_CAP_RE = re.compile('([a-z0-9])([A-Z])')
 
+# The set of evented variable names is small, so the conversions are memoised
+_CAMEL_TO_UNDERSCORE_CACHE = {}
+_CAMEL_TO_UNDERSCORE_CACHE_SIZE = 1024
+
 
 def camel_to_underscore(string):
     """Convert camelcase to lowercase and underscore.
 
     Recipe from http://stackoverflow.com/a/1176023
 
+    The results are memoised.
+
     Args:
         string (str): The string to convert.
 
     Returns:
         str: The converted string.
     """
-    string = FIRST_CAP_RE.sub(r'\1_\2', string)
-    return ALL_CAP_RE.sub(r'\1_\2', string).lower()
+    try:
+        return _CAMEL_TO_UNDERSCORE_CACHE[string]
+    except KeyError:
+        pass
+    result = FIRST_CAP_RE.sub(r'\1_\2', string)
+    result = ALL_CAP_RE.sub(r'\1_\2', result).lower()
+    if len(_CAMEL_TO_UNDERSCORE_CACHE) < _CAMEL_TO_UNDERSCORE_CACHE_SIZE:
+        _CAMEL_TO_UNDERSCORE_CACHE[string] = result
+    return result
 
 
 def prettify(unicode_text):